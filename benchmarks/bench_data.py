@@ -0,0 +1,142 @@
+"""
+Benchmarks of the SPIF data tools.
+
+A synthetic file is generated and the time taken by validation, random image
+access, time-window queries, and writing is reported, eg
+
+.. code-block:: shell
+
+    ~/spif$ python benchmarks/bench_data.py -n 1000000 --json results.json
+
+Each benchmark is repeated and the best time reported, so that results can
+be compared between changes to the validators in ``standard/v0/models`` or
+to the data tools in ``standard/v0/data``.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Callable
+
+import netCDF4  # type: ignore
+import numpy as np
+
+# Make the standard importable when run from anywhere
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from standard.v0.data import (  # noqa: E402
+    ImageReader, TimeIndex, check_header, check_file, make_spif,
+)
+
+
+def timeit(func: Callable, repeat: int = 3) -> float:
+    """Return the best wall time of ``repeat`` calls of ``func``"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_write(tmpdir: str, n_images: int) -> dict:
+    filename = os.path.join(tmpdir, 'write.nc')
+    return {'write': timeit(lambda: make_spif(filename, n_images, seed=0),
+                            repeat=1)}
+
+
+def bench_validate(filename: str) -> dict:
+    return {
+        'validate_header': timeit(lambda: check_header(filename)),
+        'validate_data': timeit(lambda: check_file(filename, check_data=True),
+                                repeat=1),
+    }
+
+
+def bench_imager_groups(tmpdir: str, n_images: int,
+                        n_imagers: int = 4) -> dict:
+    """Compare serial and concurrent data checks of several imager groups"""
+    filename = os.path.join(tmpdir, 'imagers.nc')
+    make_spif(filename, n_images, n_imagers=n_imagers, seed=0)
+    return {
+        'validate_data_serial': timeit(
+            lambda: check_file(filename, check_data=True, max_workers=1),
+            repeat=1),
+        'validate_data_parallel': timeit(
+            lambda: check_file(filename, check_data=True, max_workers=None),
+            repeat=1),
+    }
+
+
+def bench_random_access(filename: str, n_reads: int = 1000) -> dict:
+    with netCDF4.Dataset(filename) as nc:
+        reader = ImageReader(nc['imager_1'])
+        rng = np.random.default_rng(0)
+        index = rng.integers(0, len(reader), n_reads)
+        return {
+            'random_get': timeit(lambda: [reader.get(int(i))
+                                          for i in index[:100]]) / 100,
+            'random_get_many': timeit(lambda: reader.get_many(index)) / n_reads,
+            'slice_1000': timeit(lambda: reader[:1000]),
+        }
+
+
+def bench_time_window(filename: str, n_windows: int = 100) -> dict:
+    results = {}
+    with netCDF4.Dataset(filename) as nc:
+        for cache in (True, False):
+            index = TimeIndex(nc['imager_1'], cache=cache)
+            times = nc['imager_1/core/timestamp']
+            first, last = int(times[0]), int(times[-1])
+            starts = np.linspace(first, last, n_windows, dtype=np.uint64)
+            width = (last - first) // (10 * n_windows)
+            name = 'cached' if cache else 'sampled'
+            results[f'time_window_{name}'] = timeit(
+                lambda: [index.window(int(s), int(s) + width) for s in starts]
+            ) / n_windows
+    return results
+
+
+def run(n_images: int) -> dict:
+    results = {'n_images': n_images}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        results.update(bench_write(tmpdir, n_images))
+        filename = os.path.join(tmpdir, 'write.nc')
+        results.update(bench_validate(filename))
+        results.update(bench_random_access(filename))
+        results.update(bench_time_window(filename))
+        results.update(bench_imager_groups(tmpdir, n_images))
+    return results
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == '__main__':
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark SPIF data tools.')
+    parser.add_argument('-n', '--images',
+                        dest='n_images',
+                        type=int,
+                        default=100_000,
+                        help='Number of images in the synthetic file.')
+    parser.add_argument('--json',
+                        dest='json_file',
+                        default=None,
+                        help='Write the results to this JSON file.')
+
+    args = parser.parse_args()
+    results = run(args.n_images)
+
+    for name, value in results.items():
+        print(f'{name:>24}: {value:.6g}' if isinstance(value, float)
+              else f'{name:>24}: {value}')
+
+    if args.json_file:
+        with open(args.json_file, 'w') as f:
+            json.dump(results, f, indent=2)
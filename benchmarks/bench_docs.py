@@ -0,0 +1,129 @@
+"""
+Benchmarks of the documentation preprocessor.
+
+A product definition with many variables, spread over several sibling
+groups, is generated and the time taken to render it to rst is reported,
+eg
+
+.. code-block:: shell
+
+    ~/spif$ python benchmarks/bench_docs.py -n 10000 -j 4
+
+Rendering is timed in a single process and with the groups rendered in a
+pool of worker processes, as for ``preproc.py --jobs``. The time of a
+second, incremental, run where nothing has changed is also reported.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Make the preprocessor importable when run from anywhere
+docs_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..',
+                                        'docs', 'source'))
+if docs_dir not in sys.path:
+    sys.path.insert(0, docs_dir)
+
+import preproc  # noqa: E402
+
+
+def make_definition(n_variables: int, n_groups: int = 8) -> dict:
+    """Return a product definition with ``n_variables`` over sibling groups"""
+    def variable(i):
+        return {
+            'meta': {'name': f'variable_{i}', 'datatype': '<float32>',
+                     'required': i % 2 == 0,
+                     'description': f'Description of variable {i}'},
+            'dimensions': ['image_num'],
+            'attributes': {'long_name': f'Variable {i}', 'units': 'm',
+                           'comment': 'Synthetic variable'},
+        }
+
+    per_group = -(-n_variables // n_groups)
+    groups = [
+        {'meta': {'name': f'group_{g}'},
+         'attributes': {'group_type': 'other'},
+         'dimensions': [],
+         'variables': [variable(i) for i in
+                       range(g * per_group,
+                             min((g + 1) * per_group, n_variables))]}
+        for g in range(n_groups)
+    ]
+    return {
+        'meta': {'file_pattern': 'synthetic.nc',
+                 'description': 'Synthetic definition'},
+        'attributes': {'Conventions': 'SPIF-1.0'},
+        'dimensions': [],
+        'variables': [],
+        'groups': [{'meta': {'name': 'imager_1'},
+                    'attributes': {'group_type': 'imager'},
+                    'dimensions': [],
+                    'variables': [],
+                    'groups': groups}],
+    }
+
+
+def run(n_variables: int, jobs: int) -> dict:
+    results = {'n_variables': n_variables, 'jobs': jobs}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        definition = os.path.join(tmpdir, 'synthetic.json')
+        with open(definition, 'w') as f:
+            json.dump(make_definition(n_variables), f)
+        preproc.dynamic_dir = tmpdir
+
+        start = time.perf_counter()
+        preproc.populate_vocab_rst(definition, incl_optional=True)
+        results['render_serial'] = time.perf_counter() - start
+
+        with ProcessPoolExecutor(jobs) as executor:
+            start = time.perf_counter()
+            preproc.populate_vocab_rst(definition, incl_optional=True,
+                                       executor=executor)
+            results['render_parallel'] = time.perf_counter() - start
+
+        manifest = preproc.Manifest(os.path.join(tmpdir, 'manifest.json'))
+        preproc.populate_vocab_rst(definition, incl_optional=True,
+                                   manifest=manifest)
+        start = time.perf_counter()
+        preproc.populate_vocab_rst(definition, incl_optional=True,
+                                   manifest=manifest)
+        results['render_unchanged'] = time.perf_counter() - start
+    return results
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == '__main__':
+
+    import argparse
+
+    parser = argparse.ArgumentParser(
+            description='Benchmark the documentation preprocessor.')
+    parser.add_argument('-n', '--variables',
+                        dest='n_variables',
+                        type=int,
+                        default=10_000,
+                        help='Number of variables in the definition.')
+    parser.add_argument('-j', '--jobs',
+                        dest='jobs',
+                        type=int,
+                        default=os.cpu_count(),
+                        help='Number of worker processes.')
+    parser.add_argument('--json',
+                        dest='json_file',
+                        default=None,
+                        help='Write the results to this JSON file.')
+
+    args = parser.parse_args()
+    results = run(args.n_variables, args.jobs)
+
+    for name, value in results.items():
+        print(f'{name:>24}: {value:.6g}' if isinstance(value, float)
+              else f'{name:>24}: {value}')
+
+    if args.json_file:
+        with open(args.json_file, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,74 @@
+"""
+Import-time budget of the standard package.
+
+Each module is imported in a fresh interpreter, the best wall time of a few
+runs is compared with its budget, and the modules that must not be loaded
+by the import are checked, eg
+
+.. code-block:: shell
+
+    ~/spif$ python benchmarks/bench_import.py
+
+The script exits with a non-zero status if any budget is exceeded, so it
+can be used as a check in CI.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Module imported, budget in seconds, and modules it must not load. The
+# models take about 0.13 s, nearly all of it pydantic and vocal, so their
+# budget leaves a margin of about 2x for slower machines but is exceeded if
+# a heavy dependency, eg cfunits and UDUNITS2, is loaded again
+BUDGETS = [
+    ('standard.v0', 0.05, ['cfunits', 'netCDF4', 'pydantic']),
+    ('standard.v0.data', 0.05, ['cfunits', 'netCDF4', 'numpy']),
+    ('standard.v0.models', 0.25, ['cfunits', 'netCDF4']),
+]
+
+# Script run in a fresh interpreter for each module
+SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'time': elapsed,
+                  'loaded': [m for m in {forbidden!r} if m in sys.modules]}}))
+'''
+
+
+def measure(module: str, forbidden: list[str], repeat: int = 3) -> dict:
+    """Return the best import time of a module and any forbidden imports"""
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c',
+             SCRIPT.format(module=module, forbidden=forbidden)],
+            cwd=root_dir, check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output)
+        if best is None or result['time'] < best['time']:
+            best = result
+    return best
+
+
+def run() -> bool:
+    ok = True
+    for module, budget, forbidden in BUDGETS:
+        result = measure(module, forbidden)
+        passed = result['time'] <= budget and not result['loaded']
+        ok &= passed
+        loaded = f', loaded {", ".join(result["loaded"])}' if result['loaded'] else ''
+        print(f'{module:>20}: {result["time"]:.4f} s '
+              f'(budget {budget} s{loaded}) {"OK" if passed else "FAILED"}')
+    return ok
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == '__main__':
+    sys.exit(0 if run() else 1)
@@ -19,6 +19,13 @@ Instructions for compiling documentation:
     (vocal) ~/spif$ vocal release standard/v0 -v 0.1 -o .
   ```
 
+  or, to only release when the standard has changed since the last release,
+
+  ```shell
+    (vocal) ~/spif$ cd docs
+    (vocal) ~/spif/docs$ make products RELVER=0.1
+  ```
+
 - Run sphinx to create documentation in spif/docs/build. (I have sphinx in
   my spif environment.)
 
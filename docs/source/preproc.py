@@ -5,12 +5,24 @@ __main__ is called by Makefile with appropriate arguments
 
 Creates rst source files based on the spif products
 
+Generated files are only rewritten when their content changes, so that sphinx
+only rebuilds the pages that depend on them. A manifest of the generated
+files, their content hashes, and the hashes of the product files they were
+rendered from, is kept in ``dynamic_content``. A product whose file, and the
+rendering code, have not changed since the last run is not rendered again.
+
 """
 
+from concurrent.futures import (
+    Executor, ProcessPoolExecutor, ThreadPoolExecutor
+)
+import functools
 import glob
+import hashlib
+import itertools
 import json
-import shutil
-from typing import Mapping
+import threading
+from typing import Callable, Iterable, Mapping, Union
 import os
 import sys
 
@@ -44,12 +56,161 @@ dynamic_dir = os.path.abspath(
         os.path.join(os.path.dirname(__file__), 'dynamic_content')
         )
 
+# Name of the manifest of generated files in dynamic_dir
+MANIFEST_FILENAME = '.manifest.json'
 
-def populate_group_rst(data: dict,
-                       filename: str,
-                       level: int=0,
-                       **kwargs) -> None:
-    """Creates rst file describing vocabulary of group"""
+# Files whose changes mean every product must be rendered again
+RENDERER_FILES = [
+    __file__,
+    os.path.join(os.path.dirname(__file__), 'rstproc.py'),
+    os.path.join(template_dir, 'vocabulary_template.rst'),
+]
+
+
+def _sha256(data: Union[str, bytes]) -> str:
+    """Return the hex sha256 digest of a string or bytes"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def _renderer_hash() -> str:
+    """Return a hash of the code and templates used to render products"""
+    h = hashlib.sha256()
+    for filename in RENDERER_FILES:
+        with open(filename, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+class Manifest:
+    """Record of the files generated in dynamic_dir
+
+    The manifest holds the sha256 hash of each generated file and, for each
+    rendered product, the hash of its source and the files rendered from it.
+    Files are only written when their content differs from that recorded.
+    The record is guarded by a lock, so that definitions may be handled in
+    concurrent threads sharing one manifest.
+    """
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        try:
+            with open(filename, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.files = data.get('files', {})
+        self.sources = data.get('sources', {})
+        self.used = set()
+        self._lock = threading.Lock()
+
+    def _key(self, filename: str) -> str:
+        return os.path.relpath(filename, os.path.dirname(self.filename))
+
+    def is_current(self, filename: str) -> bool:
+        """Whether a file exists with the content recorded in the manifest"""
+        try:
+            with open(filename, 'rb') as f:
+                sha = _sha256(f.read())
+            with self._lock:
+                return self.files.get(self._key(filename)) == sha
+        except FileNotFoundError:
+            return False
+
+    def write(self, filename: str, chunks: Union[str, Iterable[str]]) -> bool:
+        """Write a file if its content has changed, returns True if written
+
+        The content may be given as a string or as an iterable of chunks, eg
+        a generator, which are hashed and written to a temporary file in a
+        single pass. The temporary file replaces the file only if the hash
+        differs from that recorded.
+        """
+        if isinstance(chunks, str):
+            chunks = [chunks]
+        key = self._key(filename)
+        with self._lock:
+            self.used.add(key)
+        h = hashlib.sha256()
+        tmp = filename + '.tmp'
+        try:
+            with open(tmp, 'w') as f:
+                for chunk in chunks:
+                    h.update(chunk.encode('utf-8'))
+                    f.write(chunk)
+            sha = h.hexdigest()
+            with self._lock:
+                recorded = self.files.get(key)
+            if recorded == sha and os.path.exists(filename):
+                return False
+            os.replace(tmp, filename)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        with self._lock:
+            self.files[key] = sha
+        return True
+
+    def source(self, name: str) -> dict:
+        """Return the recorded source hash and files of a rendered product"""
+        with self._lock:
+            return self.sources.get(name, {})
+
+    def set_source(self, name: str, sha: str, filenames: list) -> None:
+        with self._lock:
+            self.sources[name] = {'sha256': sha,
+                                  'files': [self._key(f) for f in filenames]}
+
+    def keep(self, filenames: list) -> None:
+        """Mark files as still generated without writing them"""
+        with self._lock:
+            self.used.update(self._key(f) for f in filenames)
+
+    def remove_unused(self) -> list:
+        """Delete files generated by earlier runs but not by this one
+
+        Files in the manifest directory that are not in the manifest, eg
+        left by a build from before the manifest was kept, are also deleted.
+        Must only be called once all files have been written.
+        """
+        removed = []
+        for key in sorted(set(self.files) - self.used):
+            try:
+                os.remove(os.path.join(os.path.dirname(self.filename), key))
+            except FileNotFoundError:
+                pass
+            del self.files[key]
+            removed.append(key)
+        self.sources = {k: v for k, v in self.sources.items()
+                        if set(v['files']).issubset(self.used)}
+
+        directory = os.path.dirname(self.filename)
+        known = set(self.files) | {os.path.basename(self.filename)}
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if name not in known and os.path.isfile(path):
+                os.remove(path)
+                removed.append(name)
+        return removed
+
+    def save(self) -> None:
+        tmp = self.filename + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'files': self.files, 'sources': self.sources}, f,
+                      indent=1, sort_keys=True)
+        os.replace(tmp, self.filename)
+
+
+def plan_group_rst(data: dict, filename: str) -> list:
+    """Return the rst files describing a group and its sub-groups
+
+    Each group is described in its own file, which includes the files of
+    its sub-groups.
+
+    Returns:
+        List of (filename, group, included filenames) for each group, where
+        the group excludes its sub-groups.
+    """
 
     # Create a filename for each group
     if data['meta']['path'] in ['/', 'root']:
@@ -59,39 +220,88 @@ def populate_group_rst(data: dict,
     else:
         grp_filename = filename.replace(".rst", f'.{data["meta"]["name"]}.rst')
 
-    # Include reference to the new file in the main rst file
-    with open(filename, 'a') as f:
-        f.write(f'\n\n.. include:: {os.path.basename(grp_filename)}')
+    group = {k: v for k, v in data.items() if k != 'groups'}
+    includes = []
+    plan = [(grp_filename, group, includes)]
 
-    # Write the new file
-    with open(grp_filename, 'w') as f:
-        f.write(rst_grp(data, level=level, **kwargs))
+    for sub_group in data.get('groups', None) or []:
+        sub_group['meta']['path'] = os.path.join(data['meta']['path'],
+                                                 sub_group['meta']['name'])
+        sub_plan = plan_group_rst(sub_group, grp_filename)
+        includes.append(sub_plan[0][0])
+        plan.extend(sub_plan)
 
-    try:
-        groups = data['groups']
-    except KeyError as err:
-        # No sub-groups
-        return
+    return plan
 
-    for group in groups:
-        group['meta']['path'] = os.path.join(data['meta']['path'],
-                                             group['meta']['name'])
-        populate_group_rst(group, grp_filename, level, **kwargs)
 
-    return
+def _includes(filenames: list) -> list:
+    """Return the rst include statements of files"""
+    return [f'\n\n.. include:: {os.path.basename(f)}' for f in filenames]
+
+
+def populate_group_rst(data: dict,
+                       filename: str,
+                       write: Callable=None,
+                       level: int=0,
+                       executor: Executor=None,
+                       **kwargs) -> list:
+    """Creates rst files describing vocabulary of group and its sub-groups
+
+    The text of each group is rendered in chunks and streamed to its file by
+    a single call of ``write``. Groups are rendered in parallel if an
+    executor is given, and written in order. Their chunks must then be
+    returned from the workers as lists, so are only streamed without one.
+
+    Args:
+        data: The group.
+        filename: The rst file that will include the group file.
+        write: Called with the filename and chunks of each file. Default is
+            to write the file.
+        level: Indent level.
+        executor: Executor in which the groups are rendered.
+
+    Returns:
+        List of the filenames written.
+    """
+
+    plan = plan_group_rst(data, filename)
+    groups = [group for _, group, _ in plan]
+    if executor is None:
+        render = functools.partial(iter_grp, level=level, **kwargs)
+        rendered = map(render, groups)
+    else:
+        render = functools.partial(rst_grp_chunks, level=level, **kwargs)
+        rendered = executor.map(render, groups)
+
+    if write is None:
+        write = _write_chunks
+    for (grp_filename, _, includes), chunks in zip(plan, rendered):
+        write(grp_filename, itertools.chain(chunks, _includes(includes)))
+
+    return [grp_filename for grp_filename, _, _ in plan]
+
+
+def _write_chunks(filename: str, chunks: Iterable[str]) -> None:
+    with open(filename, 'w') as f:
+        f.writelines(chunks)
 
 
 def populate_vocab_rst(definition,
                        vocab_example_filename: str=None,
                        incl_required: bool=True,
-                       incl_optional: bool=False) -> str:
-    """Create vocabulary description rst file"""
-
-    with open(definition, 'r') as f:
-        data = json.load(f)
+                       incl_optional: bool=False,
+                       manifest: Manifest=None,
+                       executor: Executor=None) -> str:
+    """Create vocabulary description rst file
+
+    If a manifest is given, files are only written if their content has
+    changed, and nothing is rendered if neither the definition nor the
+    rendering code has changed since the files were last generated. Groups
+    are rendered in parallel if an executor is given.
+    """
 
-    # Add a path meta key to data
-    data['meta']['path'] = '/'
+    with open(definition, 'rb') as f:
+        source = f.read()
 
     # Create a filename to save the rst text into
     # Filenames will be created for each group based on the group name/s
@@ -100,6 +310,24 @@ def populate_vocab_rst(definition,
     else:
         basename = os.path.splitext(os.path.basename(definition))[0]
 
+    rst_file = os.path.join(dynamic_dir, basename + '.rst')
+
+    source_sha = _sha256(source + json.dumps(
+        [incl_required, incl_optional, _renderer_hash()]).encode('utf-8'))
+    if manifest is not None:
+        previous = manifest.source(basename)
+        filenames = [os.path.join(dynamic_dir, f)
+                     for f in previous.get('files', [])]
+        if (previous.get('sha256') == source_sha
+                and all(manifest.is_current(f) for f in filenames)):
+            manifest.keep(filenames)
+            return rst_file
+
+    data = json.loads(source)
+
+    # Add a path meta key to data
+    data['meta']['path'] = '/'
+
     with open(os.path.join(template_dir, 'vocabulary_template.rst'), 'r') as f:
         rst = f.read()
 
@@ -112,14 +340,17 @@ def populate_vocab_rst(definition,
     rst = rst.replace('TAG_VOCAB_TYPES', vocab_types)
     rst += '\n\n'
 
-    rst_file = os.path.join(dynamic_dir, basename + '.rst')
+    write = _write_chunks if manifest is None else manifest.write
+    root_filename = f'{os.path.splitext(rst_file)[0]}.root.rst'
+    write(rst_file, [rst] + _includes([root_filename]))
 
-    with open(rst_file, 'w') as f:
-        f.write(rst)
+    filenames = populate_group_rst(data, rst_file, write,
+                                   executor=executor,
+                                   incl_required=incl_required,
+                                   incl_optional=incl_optional)
 
-    populate_group_rst(data, rst_file,
-                       incl_required=incl_required,
-                       incl_optional=incl_optional)
+    if manifest is not None:
+        manifest.set_source(basename, source_sha, [rst_file] + filenames)
 
     return rst_file
 
@@ -127,10 +358,10 @@ def populate_vocab_rst(definition,
 def call(args_dict: dict) -> None:
     """Main script call
 
-    Function loops through each definition file given. The first is used as
-    the primary to create documentation that covers only the mandatory
-    vocabulary. Each subsequent file is used to illustrate extended/optional
-    vocabulary.
+    Function creates documentation for each definition file given,
+    concurrently. The first is used as the primary to create documentation
+    that covers only the mandatory vocabulary. Each subsequent file is used
+    to illustrate extended/optional vocabulary.
 
     A substitutions file is created to be used in index.rst and spif-doc.rst
     so that links to the dynamically generated docs work correctly.
@@ -138,32 +369,45 @@ def call(args_dict: dict) -> None:
 
     if not os.path.exists(dynamic_dir):
         os.makedirs(dynamic_dir)
-    else:
-        for f in os.listdir(dynamic_dir):
-            try:
-                os.remove(os.path.join(dynamic_dir, f))
-            except OSError as err:
-                shutil.rmtree(os.path.join(dynamic_dir, f))
 
-    example_files = []
+    # Files from earlier runs are kept, and only rewritten if changed
+    manifest = Manifest(os.path.join(dynamic_dir, MANIFEST_FILENAME))
 
     _args_dict = args_dict.copy()
     _ = _args_dict.pop('definition_filenames', None)
+    jobs = _args_dict.pop('jobs', None) or 1
 
-    # Create minimal example doc first, ie Mandatory vocab only
-    minimal = True
-
-    for file in args_dict['definition_filenames']:
-        _args_dict['definition_filename'] = file
-        def_dict = prep.get_definition(spif_dir, **_args_dict)
+    def render(file: str, minimal: bool) -> tuple:
+        """Find the product of a definition and create its rst files"""
+        def_dict = prep.get_definition(spif_dir, definition_filename=file,
+                                       **_args_dict)
         definition = def_dict['product']['path']
-        incl_optional = not(minimal)
-        example_files.append(populate_vocab_rst(definition,
-                                                file,
-                                                incl_optional=not(minimal)
-                                                )
-                            )
-        minimal = False
+        rst_file = populate_vocab_rst(definition,
+                                      file,
+                                      incl_optional=not(minimal),
+                                      manifest=manifest,
+                                      executor=executor
+                                      )
+        return def_dict, rst_file
+
+    # Render groups in worker processes if requested
+    executor = ProcessPoolExecutor(jobs) if jobs > 1 else None
+
+    # Create minimal example doc from the first file, ie Mandatory vocab
+    # only. Definitions are handled concurrently, their groups being rendered
+    # in the shared worker processes, and results are kept in the order given
+    files = args_dict['definition_filenames']
+    minimal = [True] + [False] * (len(files) - 1)
+
+    try:
+        with ThreadPoolExecutor(max(1, len(files))) as pool:
+            results = list(pool.map(render, files, minimal))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    def_dict = results[-1][0]
+    example_files = [rst_file for _, rst_file in results]
 
     req_example_file = os.path.relpath(example_files[0], dynamic_dir)
     opt_example_files = [os.path.relpath(f, dynamic_dir)
@@ -187,9 +431,7 @@ def call(args_dict: dict) -> None:
     rst += '\n\n'
 
     subst_file = os.path.join(dynamic_dir, 'substitutions.rst')
-
-    with open(subst_file, 'w') as f:
-        f.write(rst)
+    manifest.write(subst_file, rst)
 
     # Write versions used to create docs into documentation_versions.py
     with open(os.path.join(template_dir,
@@ -201,8 +443,11 @@ def call(args_dict: dict) -> None:
     text = text.replace('STD_VERSION_NUM', std_ver)
     text = text.replace('PROD_VERSION_NUM', prod_ver)
 
-    with open(os.path.join(dynamic_dir, 'versions.py'), 'w') as f:
-        f.write(text)
+    manifest.write(os.path.join(dynamic_dir, 'versions.py'), text)
+
+    # Remove files of products that are no longer documented
+    manifest.remove_unused()
+    manifest.save()
 
     return
 
@@ -281,6 +526,16 @@ if __name__ == '__main__':
                               "Default is 'all' so both required and optional "
                               "vocabulary are included in documentation."))
 
+    parser.add_argument('-j', '--jobs',
+                        action='store',
+                        dest='jobs',
+                        default=1,
+                        type=int,
+                        help=("Number of worker processes used to render "
+                              "the groups of the definitions, which are "
+                              "handled concurrently. Default is 1, ie render "
+                              "in this process."))
+
     args_dict = vars(parser.parse_args())
     #args, unknown = parser.parse_known_args()
 
@@ -1,6 +1,7 @@
 
 from .docsource_options import *
 from .substitutions import *
+from .release import *
 
 
 __all__ = ['__version__']
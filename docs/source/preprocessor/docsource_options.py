@@ -1,4 +1,5 @@
 
+import functools
 import glob
 import json
 import shutil
@@ -13,7 +14,8 @@ import pdb
 __all__ = ['get_std',
            'get_product',
            'get_vocab',
-           'get_definition']
+           'get_definition',
+           'clear_index']
 
 
 
@@ -37,6 +39,52 @@ def _pathnotfound(v: str, p: str) -> None:
 
 
 
+class _FileIndex:
+    """Index of the files and directories below a directory
+
+    Built with a single walk of the directory tree, in the same order as a
+    recursive glob and likewise ignoring hidden names, so that repeated
+    searches do not walk the tree again.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.paths = []
+        self.stems = {}
+        for dirpath, dirnames, filenames in os.walk(root, followlinks=True):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+            for name in sorted(dirnames + filenames):
+                if name.startswith('.'):
+                    continue
+                path = os.path.join(dirpath, name)
+                self.paths.append(path)
+                # Index by each leading part of the name, ie everything
+                # before each '.', to match 'name.*' patterns
+                parts = name.split('.')
+                for i in range(1, len(parts)):
+                    self.stems.setdefault('.'.join(parts[:i]), []).append(path)
+
+    def startswith(self, prefix: str) -> list:
+        """Return the paths whose names start with ``prefix``"""
+        return [p for p in self.paths
+                if os.path.basename(p).startswith(prefix)]
+
+    def stem(self, stem: str) -> list:
+        """Return the paths whose names match ``stem.*``"""
+        return self.stems.get(stem, [])
+
+
+@functools.lru_cache(maxsize=None)
+def _index(root: str) -> _FileIndex:
+    """Return the index of a directory, scanning it once per run"""
+    return _FileIndex(root)
+
+
+def clear_index() -> None:
+    """Forget all directory indices, eg after files have been created"""
+    _index.cache_clear()
+
+
 def get_std(std_path: str='.',std_version: str=None) -> tuple:
     """Determine spif standard version.
 
@@ -103,9 +151,7 @@ def get_product(product_path: str='.',
     while len(product_dir) == 0 and loop_cnt < 3:
         # Limit walk as don't want to searchin entire drive!
         search_path = os.path.abspath(os.path.join(search_path, '..'))
-        product_dir = glob.glob(os.path.join(search_path, '**', PRODUCT_DIR),
-                                recursive=True
-                                )
+        product_dir = _index(search_path).startswith(PRODUCT_DIR.rstrip('*'))
         loop_cnt += 1
 
     try:
@@ -199,9 +245,7 @@ def get_definition(
     def_basename, _ = os.path.splitext(definition_filename)
     files = []
     for _path in [def_dict['standard']['path'], def_dict['product']['path']]:
-        files.extend(glob.glob(os.path.join(_path, '**', def_basename+'.*'),
-                               recursive=True)
-                    )
+        files.extend(_index(os.path.abspath(_path)).stem(def_basename))
 
     if len(files) != 2:
         raise FileNotFoundError('Definition and/or Product files not found '
@@ -0,0 +1,172 @@
+"""
+Cached creation of the product and JSON schema files with vocal.
+
+``vocal release`` converts the pydantic models and definitions of a version
+of the standard into JSON schema and product files. This repeats the
+expensive schema generation even when nothing has changed, so here it is
+only run when a hash of the sources has changed since the last release, or
+the files it created have been changed or removed.
+
+The hash covers the source files of the standard version (.py, .yaml, .yml,
+and .json, including the definitions), the release version, and the version
+of vocal. It is kept, with hashes of the created files, in a cache file in
+the output directory.
+
+Called by the Makefile ``products`` target, or directly, eg
+
+.. code-block:: shell
+
+    ~/spif$ python docs/source/preprocessor/release.py standard/v0 -v 0.1 -o .
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+# Make the standard importable when run from anywhere
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                        '..', '..', '..'))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from standard.v0.data.sources import (  # noqa: E402
+    SOURCE_SUFFIXES, file_hash, walk, tree_hash,
+)
+
+__all__ = ['source_hash', 'release']
+
+
+# Default name of the cache file in the output directory
+RELEASE_CACHE = '.release_cache.json'
+
+# Directories in the output directory that vocal creates products in
+PRODUCT_DIR = 'product'
+
+
+def _vocal_version() -> str:
+    """Return the installed version of vocal, if known"""
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+        return version('vocal')
+    except (ImportError, PackageNotFoundError) as err:
+        return 'unknown'
+
+
+def source_hash(std_path: str, version: str) -> str:
+    """Return a hash of everything that the released products depend on
+
+    Args:
+        std_path: Path of the standard version, eg 'standard/v0'.
+        version: Version of the release.
+    """
+
+    return tree_hash(std_path, SOURCE_SUFFIXES,
+                     prefix=f'{version}\n{_vocal_version()}\n')
+
+
+def _outputs(output_dir: str) -> dict:
+    """Return the hashes of the product files in the output directory"""
+    outputs = {}
+    for name in sorted(os.listdir(output_dir)):
+        path = os.path.join(output_dir, name)
+        if name.startswith(PRODUCT_DIR) and os.path.isdir(path):
+            for filename in walk(path):
+                outputs[os.path.relpath(filename, output_dir)] = (
+                    file_hash(filename))
+    return outputs
+
+
+def _load(cache_file: str) -> dict:
+    try:
+        with open(cache_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as err:
+        return {}
+
+
+def release(std_path: str,
+            version: str,
+            output_dir: str='.',
+            cache_file: str=None,
+            force: bool=False) -> bool:
+    """Run ``vocal release`` if the standard has changed since the last run
+
+    Args:
+        std_path: Path of the standard version, eg 'standard/v0'.
+        version: Version of the release.
+        output_dir: Directory the products are created in.
+        cache_file: Name of the cache file. Default is `RELEASE_CACHE` in
+            ``output_dir``.
+        force: Always run ``vocal release``.
+
+    Returns:
+        True if ``vocal release`` was run, False if the products were up to
+        date.
+    """
+
+    if cache_file is None:
+        cache_file = os.path.join(output_dir, RELEASE_CACHE)
+
+    key = source_hash(std_path, version)
+    cache = _load(cache_file)
+    entry = cache.get(os.path.abspath(std_path), {})
+    if (not force and entry.get('sha256') == key and entry.get('outputs')
+            and _outputs(output_dir) == entry['outputs']):
+        return False
+
+    subprocess.run(['vocal', 'release', std_path, '-v', version,
+                    '-o', output_dir], check=True)
+
+    cache[os.path.abspath(std_path)] = {'sha256': key,
+                                        'version': version,
+                                        'outputs': _outputs(output_dir)}
+    tmp = cache_file + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(tmp, cache_file)
+
+    return True
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == '__main__':
+
+    import argparse
+
+    parser = argparse.ArgumentParser(
+            description=('Create product and schema files with vocal '
+                         'release, only if the standard has changed.'))
+    parser.add_argument('std_path',
+                        type=str,
+                        help="Path of the standard version, eg 'standard/v0'.")
+    parser.add_argument('-v', '--version',
+                        dest='version',
+                        required=True,
+                        type=str,
+                        help='Version of the release.')
+    parser.add_argument('-o', '--output',
+                        dest='output_dir',
+                        default='.',
+                        type=str,
+                        help='Directory the products are created in.')
+    parser.add_argument('--cache',
+                        dest='cache_file',
+                        default=None,
+                        type=str,
+                        help=('Cache file. Default is '
+                              f'{RELEASE_CACHE} in the output directory.'))
+    parser.add_argument('--force',
+                        dest='force',
+                        action='store_true',
+                        help='Run vocal release even if nothing has changed.')
+
+    args = parser.parse_args()
+
+    if release(args.std_path, args.version, args.output_dir,
+               args.cache_file, args.force):
+        print(f'Released {args.std_path} version {args.version}')
+    else:
+        print(f'Products of {args.std_path} version {args.version} '
+              'are up to date')
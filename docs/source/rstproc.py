@@ -1,11 +1,14 @@
 """
 Functions to create restructured text strings from netCDF descriptions
 
+Each ``rst_*`` function has an ``iter_*`` counterpart that yields the text in
+chunks, eg one per variable, so that large groups can be streamed to a file
+without building the whole string.
 
 """
 
 import re
-from typing import Mapping
+from typing import Iterator, Mapping
 
 import pdb
 
@@ -15,6 +18,10 @@ import preprocessor as prep
 __all__ = ['rst_grp',
            'rst_attrs',
            'rst_vars',
+           'iter_grp',
+           'iter_attrs',
+           'iter_vars',
+           'rst_grp_chunks',
            ]
 
 
@@ -36,8 +43,17 @@ def rst_grp(group: dict=None, level: int=0, **kwargs) -> str:
         String describing group suitable for sphinx build
     """
 
+    return ''.join(iter_grp(group, level=level, **kwargs))
+
+
+def iter_grp(group: dict=None, level: int=0, **kwargs) -> Iterator[str]:
+    """Yield the restructured text of a group in chunks
+
+    Sub-groups are not included. See ``rst_grp``.
+    """
+
     if not group:
-        return ''
+        return
 
     name = group["meta"].get("name", 'unknown')
     path = group["meta"]["path"] if group["meta"].get("path") else name
@@ -48,46 +64,51 @@ def rst_grp(group: dict=None, level: int=0, **kwargs) -> str:
         grp_type = group["attributes"].get("group_type", 'other')
 
     # Initialise a rst file for this group
-    text = f'..\n  File describing contents of {name} group\n\n'
-#    text += prep.rst_substitutions(level=level)
+    yield f'..\n  File describing contents of {name} group\n\n'
+#    yield prep.rst_substitutions(level=level)
 
     # Include a section target
-#    text += f'.. _{grp_type} group section:\n'
-    text += f'\n{_esc(path)}\n{"-" * len(_esc(path))}\n\n'
-    text += (f':Description: {_esc(group["meta"]["description"])}\n'
-             if group["meta"].get("description") else ''
-             )
-    text += (f':File Pattern: {_esc(group["meta"]["file_pattern"])}\n'
-             if group["meta"].get("file_pattern") else ''
-             )
+#    yield f'.. _{grp_type} group section:\n'
+    yield f'\n{_esc(path)}\n{"-" * len(_esc(path))}\n\n'
+    if group["meta"].get("description"):
+        yield f':Description: {_esc(group["meta"]["description"])}\n'
+    if group["meta"].get("file_pattern"):
+        yield f':File Pattern: {_esc(group["meta"]["file_pattern"])}\n'
     references = group['meta'].get('references', '')
     references = ' | '.join([f'`{i[0]} <{i[1]}>`_' for i in references])
-    text += (f':References: {references}\n'
-             if references else ''
-             )
-    text += '\n\n'
+    if references:
+        yield f':References: {references}\n'
+    yield '\n\n'
 
     # Add group attributes if required
     # Add stop/start markers (eg ".. root_AttrsStart") for include statements
     # in spif-doc.rst and elsewhere
     if group['attributes']:
-        text += f'Group Attributes:\n{"^"*17}\n'
-        text += f'.. {grp_type}_AttrsStart\n\n'
-        text += rst_attrs(group['attributes'], level=level, **kwargs)
-        text += f'.. {grp_type}_AttrsStop\n\n'
+        yield f'Group Attributes:\n{"^"*17}\n'
+        yield f'.. {grp_type}_AttrsStart\n\n'
+        yield from iter_attrs(group['attributes'], level=level, **kwargs)
+        yield f'.. {grp_type}_AttrsStop\n\n'
     else:
-        text += '\n'
+        yield '\n'
 
     # Add group variables if required
     if group['variables']:
-        text += f'Group Variables:\n{"^"*16}\n\n'
-        text += f'.. {grp_type}_VarsStart\n\n'
-        text += rst_vars(group['variables'], level=level, **kwargs)
-        text += f'.. {grp_type}_VarsStop\n\n'
+        yield f'Group Variables:\n{"^"*16}\n\n'
+        yield f'.. {grp_type}_VarsStart\n\n'
+        yield from iter_vars(group['variables'], level=level, **kwargs)
+        yield f'.. {grp_type}_VarsStop\n\n'
     else:
-        text += '\n'
+        yield '\n'
+
+
+def rst_grp_chunks(group: dict, level: int=0, **kwargs) -> list:
+    """Return the restructured text chunks of a group
+
+    A picklable wrapper of ``iter_grp`` so that groups may be rendered in
+    worker processes.
+    """
 
-    return text
+    return list(iter_grp(group, level=level, **kwargs))
 
 
 def rst_attrs(attributes: dict=None, level: int=0, **kwargs) -> str:
@@ -101,17 +122,20 @@ def rst_attrs(attributes: dict=None, level: int=0, **kwargs) -> str:
         String describing attributes suitable for sphinx build
     """
 
-    text = ''
+    return ''.join(iter_attrs(attributes, level=level, **kwargs))
+
+
+def iter_attrs(attributes: dict=None, level: int=0,
+               **kwargs) -> Iterator[str]:
+    """Yield the restructured text of attributes. See ``rst_attrs``."""
 
     if not attributes:
-        return text
+        return
 
     indent = "\t" * level
     for attr_key, attr_value in attributes.items():
-            text += f'{indent}* ``{attr_key}``\ : {str(attr_value)}\n'
-    text += '\n'
-
-    return text
+            yield f'{indent}* ``{attr_key}``\ : {str(attr_value)}\n'
+    yield '\n'
 
 
 def rst_vars(variables: dict=None,
@@ -155,10 +179,20 @@ def rst_vars(variables: dict=None,
         String describing a variable suitable for sphinx build
     """
 
-    text = ''
+    return ''.join(iter_vars(variables, level=level,
+                             incl_required=incl_required,
+                             incl_optional=incl_optional, **kwargs))
+
+
+def iter_vars(variables: dict=None,
+              level: int=0,
+              incl_required: bool=True,
+              incl_optional: bool=False,
+              **kwargs) -> Iterator[str]:
+    """Yield the restructured text of variables. See ``rst_vars``."""
 
     if not variables:
-        return text
+        return
 
     for var in variables:
 
@@ -171,28 +205,27 @@ def rst_vars(variables: dict=None,
         else:
             continue
 
-        name = var["meta"].get("name", 'unknown')
-
-        text += f'.. dropdown:: {_esc(name)}\n'
-        text += f'\t:name: {_esc(name)}\n'
-        text += '\t:icon: rows\n'
-        text += '\t:color: light\n'
-        text += '\t:animate: fade-in-slide-down\n'
-        text += '\t:margin: 0\n\n'
-        text += '\t:bdg-danger:`REQUIRED`\n\n' if var["meta"].get("required") else '\n'
-        text += f'\t:Datatype:\n\t\t`{var["meta"]["datatype"]}`\n\n'
-        text += f'\t:Dimensions:\n\t\t{", ".join(var["dimensions"])}\n\n'
-        text += (f'\t:Description:\n\t\t{var["meta"]["description"]}\n\n'
-                 if var["meta"].get("description")
-                 else '')
+        name = _esc(var["meta"].get("name", 'unknown'))
+        required = ('\t:bdg-danger:`REQUIRED`\n\n'
+                    if var["meta"].get("required") else '\n')
+        description = (f'\t:Description:\n\t\t{var["meta"]["description"]}\n\n'
+                       if var["meta"].get("description")
+                       else '')
 
         # Add variable attributes with increased indent
         var_attrs = rst_attrs(var.get('attributes', None),
                               level=level+2,
                               **kwargs)
-        text += f'\t:Attributes:\n{var_attrs}\n' if var_attrs else '\n'
-
-    return text
-
-
-
+        var_attrs = f'\t:Attributes:\n{var_attrs}\n' if var_attrs else '\n'
+
+        yield (f'.. dropdown:: {name}\n'
+               f'\t:name: {name}\n'
+               '\t:icon: rows\n'
+               '\t:color: light\n'
+               '\t:animate: fade-in-slide-down\n'
+               '\t:margin: 0\n\n'
+               f'{required}'
+               f'\t:Datatype:\n\t\t`{var["meta"]["datatype"]}`\n\n'
+               f'\t:Dimensions:\n\t\t{", ".join(var["dimensions"])}\n\n'
+               f'{description}'
+               f'{var_attrs}')
@@ -110,6 +110,88 @@ Mandatory Variables:
         Flag indicating an imager overload condition for each image.
 
 
+Optional Variables:
+^^^^^^^^^^^^^^^^^^^
+
+    ``uint8`` or ``uint32`` **image_packed**\ (packed_pixel):
+        Binary image pixels in a compact encoding, in which case **image** is
+        empty. Only allowed when the size of `pixel_colors` is 2.
+
+        :encoding: "bitpack", 8 pixels per ``uint8``, or "rle", lengths of
+            alternating runs of 0 and 1 pixels, starting with 0
+        :unpacked_length: Number of pixels encoded
+
+
+/*Imager*/Particle Statistics Group (optional)
+----------------------------------------------
+
+Statistics of each image in the 'core' group, computed once so that they
+need not be derived from the image data by every user. Conventionally named
+'particle_stats'.
+
+Mandatory Attributes:
+^^^^^^^^^^^^^^^^^^^^^
+
+    :group_type: Must be "particle_stats"
+
+
+Mandatory Dimensions:
+^^^^^^^^^^^^^^^^^^^^^
+
+    :image_num: Number of images, the same as in the 'core' group
+
+
+Mandatory Variables:
+^^^^^^^^^^^^^^^^^^^^
+
+    ``uint32`` **shaded_pixels**\ (image_num):
+        Number of pixels of an image that are not background (color 0).
+
+    ``uint16`` **x_extent**\ (image_num):
+        Number of pixels across the shaded region of an image.
+
+    ``uint16`` **y_extent**\ (image_num):
+        Number of slices/lines of the shaded region of an image.
+
+    ``float32`` **max_dimension**\ (image_num):
+        Largest of the x and y extents scaled by `resolution`.
+
+    ``byte`` **edge_touch**\ (image_num):
+        Flags of an image with shaded pixels in its first (1) or last (2)
+        pixel across.
+
+
+/*Imager*/Ancillary Group (optional)
+------------------------------------
+
+Flags and other values of each image in the 'core' group that help users
+screen the images, eg repeated images, which are kept in the **image**
+variable. Conventionally named 'ancillary'.
+
+Mandatory Attributes:
+^^^^^^^^^^^^^^^^^^^^^
+
+    :group_type: Must be "ancillary"
+
+
+Mandatory Dimensions:
+^^^^^^^^^^^^^^^^^^^^^
+
+    :image_num: Number of images, the same as in the 'core' group
+
+
+Optional Variables:
+^^^^^^^^^^^^^^^^^^^
+
+    ``uint64`` **image_hash**\ (image_num):
+        Hash of the width, height, and pixels of an image. Images with equal
+        hashes are identical with very high probability.
+
+    ``byte`` **duplicate**\ (image_num):
+        Flags of an image identical to the previous image (1) or to any
+        earlier image (2) of the imager group.
+
+
 /Platform Group (optional)
 --------------------------
 
@@ -144,9 +226,18 @@ Mandatory Attributes:
 """
 
 
-from . import models
-from . import attributes
-from . import defaults
+import importlib
+
+# The models, attributes, and defaults are imported when first used so that
+# importing the standard, eg for its version, is cheap
+_submodules = ('models', 'attributes', 'defaults')
+
+
+def __getattr__(name):
+    if name in _submodules:
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
 
 # Use semantic-version package?
 __version_definition__ = 0
@@ -3,5 +3,6 @@ from .global_attributes import GlobalAttributes
 from .variable_attributes import VariableAttributes
 from .group_attributes import (
     CoreGroupAttributes, PlatformGroupAttributes, GenericGroupAttributes,
-    ImagerGroupAttributes
+    ImagerGroupAttributes, ParticleStatsGroupAttributes,
+    AncillaryGroupAttributes
 )
@@ -52,6 +52,26 @@ class GenericGroupAttributes(BaseModel):
     group_type: Literal['other']
 
 
+class ParticleStatsGroupAttributes(BaseModel):
+    model_config = ConfigDict(
+        # Configuration options here
+        title='Particle Statistics Group Attributes',
+        extra='allow'
+    )
+
+    group_type: Literal['particle_stats']
+
+
+class AncillaryGroupAttributes(BaseModel):
+    model_config = ConfigDict(
+        # Configuration options here
+        title='Ancillary Group Attributes',
+        extra='allow'
+    )
+
+    group_type: Literal['ancillary']
+
+
 class ImagerGroupAttributes(BaseModel):
     model_config = ConfigDict(
         # Configuration options here
@@ -0,0 +1,96 @@
+"""
+Tools for working with the image data held in SPIF files.
+
+The models in ``standard/v0/models`` only check the structure of a file, ie
+the names, dimensions, and types of its groups and variables. The modules
+in this package work with the data itself, reading variables in bounded
+chunks so that files with very many images can be handled in constant
+memory.
+
+Modules are only imported when one of their names is first used, so that
+importing the package does not load netCDF4, numpy, or the models. The
+optional xarray backend and Parquet export likewise only need xarray and
+pyarrow once they are used.
+"""
+
+import importlib
+
+# Public names and the modules they are defined in
+_exports = dict.fromkeys([
+    'CORE_GROUP',
+    'IMAGE', 'TIMESTAMP', 'STARTPIXEL', 'WIDTH', 'HEIGHT', 'OVERLOAD',
+    'IMAGE_NUM_DIM', 'PIXEL_DIM', 'ARRAY_DIMENSIONS_DIM',
+    'DEFAULT_CHUNK_SIZE', 'DEFAULT_PIXEL_BLOCK',
+    'imager_group_names', 'core_group', 'array_dimensions',
+    'image_lengths', 'chunk_size_for', 'iter_chunks', 'pixel_blocks', 'raw',
+], 'layout')
+_exports.update({
+    'check_core_data': 'consistency',
+    'check_derived_lengths': 'consistency',
+    'check_data': 'consistency',
+    'check_file_data': 'consistency',
+    'map_imagers': 'parallel',
+    'ImageReader': 'images',
+    'TimeIndex': 'timewindow',
+    'TimeWindow': 'timewindow',
+    'SpifWriter': 'writer',
+    'ImagerWriter': 'writer',
+    'read_structure': 'header',
+    'read_header': 'header',
+    'validate_structure': 'compliance',
+    'check_header': 'compliance',
+    'check_file': 'compliance',
+    'make_spif': 'synthetic',
+})
+_exports.update(dict.fromkeys([
+    'PACKED_IMAGE', 'PACKED_PIXEL_DIM', 'ENCODINGS',
+    'pack_bits', 'unpack_bits', 'encode_rle', 'decode_rle',
+    'PackedPixels', 'pixel_source', 'pixel_count',
+], 'packing'))
+_exports.update(dict.fromkeys([
+    'STATS_GROUP', 'image_stats', 'iter_particle_stats', 'particle_stats',
+    'write_particle_stats',
+], 'stats'))
+_exports.update(dict.fromkeys([
+    'ANCILLARY_GROUP', 'DUPLICATE_PREVIOUS', 'DUPLICATE_EARLIER',
+    'hash_images', 'iter_image_hashes', 'image_hashes', 'duplicate_flags',
+    'write_duplicate_flags',
+], 'duplicates'))
+_exports.update(dict.fromkeys([
+    'write_png', 'grey_levels', 'window_length', 'plan_pages', 'render_page',
+    'write_mosaics',
+], 'mosaic'))
+_exports.update(dict.fromkeys([
+    'CORE_COLUMNS', 'to_arrow', 'imager_metadata', 'core_schema',
+    'iter_core_batches', 'write_imager_parquet', 'write_parquet',
+], 'parquet'))
+_exports.update(dict.fromkeys([
+    'SpifBackendEntrypoint', 'open_spif',
+], 'xarray_backend'))
+_exports.update(dict.fromkeys([
+    'copy_attributes', 'copy_variable', 'copy_dimensions', 'copy_group',
+    'image_variables', 'copy_imager', 'append_images',
+], 'copying'))
+_exports.update(dict.fromkeys([
+    'MATCHING_VARIABLES', 'check_compatible', 'merge_files',
+], 'merge'))
+_exports.update(dict.fromkeys([
+    'subset_images', 'subset_file',
+], 'subset'))
+
+# Modules with optional dependencies, whose names are left out of
+# ``from ... import *`` but are still available as attributes
+_optional = ('parquet', 'xarray_backend')
+
+__all__ = [name for name, module in _exports.items()
+           if module not in _optional]
+
+
+def __getattr__(name: str):
+    try:
+        module = _exports[name]
+    except KeyError:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,232 @@
+"""
+Compliance checking of many SPIF files in parallel.
+
+Files are spread across a pool of worker processes. Results can be kept in
+a cache file, keyed by the path, size, and modification time of each file
+and by a hash of the sources of the standard, so that unchanged files are not
+checked again when an archive is re-validated, but all are when the models or
+attributes change. Unless the data-level checks are
+asked for, only the header of each file is read, eg
+
+.. code-block:: shell
+
+    $ python -m standard.v0.data.batch /data/archive -j 8 --cache checks.json
+"""
+
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from .. import __version__
+from ..models.profiling import Profiler
+from .compliance import check_file
+from .sources import tree_hash
+
+__all__ = ['source_hash', 'ResultCache', 'find_files', 'check_files']
+
+# Default filename pattern of SPIF files when given a directory
+FILE_PATTERN = '*.nc'
+
+@lru_cache(maxsize=1)
+def source_hash() -> str:
+    """Return a hash of the sources of this version of the standard
+
+    This covers the models, attributes, and data checks, so any edit to them
+    changes the hash.
+    """
+    return tree_hash(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
+
+
+class ResultCache:
+    """Persistent cache of compliance check results
+
+    Args:
+        filename: JSON file the cache is kept in. Created if it does not
+            exist.
+    """
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self.entries: dict[str, dict] = {}
+        try:
+            with open(filename, 'r') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            # A missing, truncated, or corrupt cache is started afresh
+            pass
+
+    @staticmethod
+    def key(path: str, **options) -> Optional[dict]:
+        """Return what a cached result of ``path`` must match to be reused"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return {'size': stat.st_size,
+                'mtime': stat.st_mtime_ns,
+                'version': __version__,
+                'source': source_hash(),
+                'options': options}
+
+    def get(self, path: str, **options) -> Optional[dict]:
+        """Return the cached result of a file if it is still valid"""
+        entry = self.entries.get(os.path.abspath(path))
+        if entry is None or entry['key'] != self.key(path, **options):
+            return None
+        return entry['result']
+
+    def put(self, path: str, result: dict, **options) -> None:
+        key = self.key(path, **options)
+        if key is not None:
+            self.entries[os.path.abspath(path)] = {'key': key,
+                                                   'result': result}
+
+    def save(self) -> None:
+        """Write the cache, replacing the file only once it is complete"""
+        tmp = f'{self.filename}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.filename)
+
+
+def find_files(paths: Iterable[str], pattern: str = FILE_PATTERN) -> list[str]:
+    """Return the files given, searching any directories recursively"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '**', pattern),
+                                          recursive=True)))
+        else:
+            files.append(path)
+    return files
+
+
+def check_files(paths: Iterable[str],
+                max_workers: Optional[int] = None,
+                cache: Optional[ResultCache] = None,
+                check_data: bool = False,
+                profile: bool = False) -> list[dict]:
+    """Check files for compliance in a pool of worker processes
+
+    A single file to be checked is instead split by imager group, see
+    ``compliance.check_file``.
+
+    Args:
+        paths: Files to check.
+        max_workers: Number of worker processes. Default is the number of
+            processors.
+        cache: Results of files that have not changed are taken from here,
+            and new results are added to it.
+        check_data: Also run the data-level checks of the core groups.
+        profile: Time the validators of each file.
+
+    Returns:
+        List of results, see ``compliance.check_file``, in the order of
+        ``paths``.
+    """
+    paths = list(paths)
+    results: list[Optional[dict]] = [None] * len(paths)
+    options = {'check_data': check_data, 'profile': profile}
+
+    todo = []
+    for i, path in enumerate(paths):
+        cached = cache.get(path, **options) if cache is not None else None
+        if cached is not None:
+            results[i] = cached
+        else:
+            todo.append(i)
+
+    try:
+        if len(todo) == 1:
+            # A single file is checked here, with its imager groups in
+            # parallel
+            i = todo[0]
+            results[i] = check_file(paths[i], check_data, profile,
+                                    max_workers=max_workers)
+            if cache is not None:
+                cache.put(paths[i], results[i], **options)
+        elif todo:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                checked = pool.map(check_file,
+                                   [paths[i] for i in todo],
+                                   [check_data] * len(todo),
+                                   [profile] * len(todo),
+                                   chunksize=max(1, len(todo) // 64))
+                for i, result in zip(todo, checked):
+                    results[i] = result
+                    if cache is not None:
+                        cache.put(paths[i], result, **options)
+    finally:
+        # Keep the results found so far, even if the batch was interrupted
+        if cache is not None:
+            cache.save()
+
+    return results
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == '__main__':
+
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(
+            description=('Check SPIF files for compliance with the v'
+                         f'{__version__} standard in parallel.'))
+    parser.add_argument('paths',
+                        nargs='+',
+                        help=('Files to check. Directories are searched '
+                              f'recursively for files matching {FILE_PATTERN}.'))
+    parser.add_argument('-j', '--jobs',
+                        dest='max_workers',
+                        type=int,
+                        default=None,
+                        help='Number of worker processes. Default is the '
+                             'number of processors.')
+    parser.add_argument('--cache',
+                        dest='cache',
+                        default=None,
+                        help='JSON file used to cache results between runs.')
+    parser.add_argument('--data',
+                        dest='check_data',
+                        action='store_true',
+                        help='Also check the consistency of the core data.')
+    parser.add_argument('--profile',
+                        dest='profile',
+                        default=None,
+                        help=('Time the validators and write the combined '
+                              'report to this JSON file, or print it as a '
+                              'table if "-".'))
+
+    args = parser.parse_args()
+
+    results = check_files(find_files(args.paths),
+                          max_workers=args.max_workers,
+                          cache=ResultCache(args.cache) if args.cache else None,
+                          check_data=args.check_data,
+                          profile=args.profile is not None)
+
+    n_failed = 0
+    for result in results:
+        print(f'{result["path"]}: {"OK" if result["ok"] else "FAILED"}')
+        for error in result['errors']:
+            print(f'    {error}')
+        n_failed += not result['ok']
+
+    print(f'\n{len(results) - n_failed} of {len(results)} files compliant.')
+
+    if args.profile is not None:
+        profiler = Profiler()
+        for result in results:
+            profiler.merge(result.get('profile', []))
+        if args.profile == '-':
+            print(f'\n{profiler.table()}')
+        else:
+            with open(args.profile, 'w') as f:
+                f.write(profiler.to_json(indent=2))
+    sys.exit(1 if n_failed else 0)
@@ -0,0 +1,92 @@
+"""
+Compliance checking of a SPIF file against the ``Dataset`` model.
+
+The structure of a netCDF file is read into the nested dictionary that the
+models expect, ie ``meta``, ``attributes``, ``dimensions``, ``variables``, and
+``groups`` for the root and every group, and validated with ``Dataset``.
+By default only the header of the file is read, see ``header``.
+"""
+
+from typing import Optional
+
+from pydantic import ValidationError
+
+from ..models import Dataset
+from ..models.profiling import profile as _profile
+from .consistency import check_file_data
+from .header import read_header
+
+__all__ = ['validate_structure', 'check_header', 'check_file']
+
+
+def _location(loc: tuple) -> str:
+    """Return the location of a validation error, without validator names"""
+    return '.'.join(str(i) for i in loc if not str(i).startswith('function-'))
+
+
+def validate_structure(structure: dict) -> list[str]:
+    """Validate a file structure with the ``Dataset`` model
+
+    Returns:
+        A list of error messages, empty if the structure is compliant.
+    """
+    try:
+        Dataset.model_validate(structure)
+    except ValidationError as err:
+        return [f'{_location(e["loc"])}: {e["msg"]}' for e in err.errors()]
+    return []
+
+
+def check_header(path: str) -> dict:
+    """Check a file for compliance using its header only
+
+    No variable data is read, so this is fast enough to use as an ingest
+    gate regardless of the size of the file.
+    """
+    return check_file(path, check_data=False)
+
+
+
+def check_file(path: str, check_data: bool = False,
+               profile: bool = False,
+               max_workers: Optional[int] = 1) -> dict:
+    """Check a file for compliance with the standard
+
+    Args:
+        path: Name of the file to check.
+        check_data: Also run the data-level checks of the core groups, see
+            ``consistency.check_data``. Otherwise only the header is read.
+        profile: Time the validators, see ``models.profiling``.
+        max_workers: Largest number of worker processes used to check the
+            data of the imager groups concurrently, see
+            ``consistency.check_file_data``. ``None`` is one per imager
+            group.
+
+    Returns:
+        Dictionary with the ``path`` of the file, whether it is ``ok``, and
+        a list of ``errors``. If ``profile`` is True the validator timings
+        are given as ``profile``.
+    """
+    result = {'path': path}
+    try:
+        structure = read_header(path)
+        if profile:
+            with _profile() as profiler:
+                errors = validate_structure(structure)
+            result['profile'] = profiler.report()
+        else:
+            errors = validate_structure(structure)
+        if check_data:
+            data_errors = check_file_data(path, max_workers=max_workers)
+            for group_errors in data_errors.values():
+                errors.extend(group_errors)
+    except OSError as err:
+        errors = [f'{path} - could not be read ({err})']
+    except Exception as err:
+        # A malformed file can raise from deep within netCDF4 or numpy. It
+        # fails its check rather than aborting a batch of files
+        errors = [f'{path} - could not be checked '
+                  f'({type(err).__name__}: {err})']
+
+    result.update(ok=not errors, errors=errors)
+    return result
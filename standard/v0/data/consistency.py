@@ -0,0 +1,203 @@
+"""
+Data-level consistency checks of the imager 'core' group.
+
+The ``CoreGroup`` model only checks the names, dimensions, and types of the
+core variables. The checks here read the values of ``startpixel``, ``width``
+and ``height`` to make sure they describe the ``image`` variable correctly;
+
+    * the first image starts at pixel 0,
+    * ``startpixel`` never decreases,
+    * each image starts where the previous one ended, ie
+      ``startpixel[n+1] == startpixel[n] + width[n] * height[n] * array_dimensions``,
+    * every image lies within the ``image`` variable, and
+    * there are no pixels in ``image`` after the end of the last image.
+
+The index variables are streamed in chunks and only the length of ``image``
+is used, so memory use is bounded regardless of the size of the file. When
+the pixels are held in ``image_packed`` its ``unpacked_length`` is used
+instead, see ``packing``. Groups derived from the core data, eg
+'particle_stats', must also have an entry for every image.
+
+These checks are opt-in as they must read data from the file, eg
+
+.. code-block:: python
+
+    with netCDF4.Dataset('spif_example.nc') as nc:
+        errors = check_data(nc)
+
+    # or with the imager groups checked in parallel
+    errors = check_file_data('spif_example.nc')
+"""
+
+from typing import Optional
+
+import netCDF4  # type: ignore
+import numpy as np
+
+from .layout import (
+    CORE_GROUP, STARTPIXEL, WIDTH, HEIGHT, IMAGE_NUM_DIM, DEFAULT_CHUNK_SIZE,
+    imager_group_names, core_group, array_dimensions, image_lengths,
+    chunk_size_for, iter_chunks, raw,
+)
+from .packing import pixel_count
+from .parallel import map_imagers
+
+__all__ = ['check_core_data', 'check_derived_lengths', 'check_data',
+           'check_file_data']
+
+# Maximum number of offending image numbers listed in each error message
+MAX_REPORTED = 5
+
+
+def _report(name: str, msg: str, index: np.ndarray, count: int) -> str:
+    """Create an error message listing the first few offending images"""
+    shown = ', '.join(str(i) for i in index[:MAX_REPORTED])
+    more = f' (and {count - MAX_REPORTED} more)' if count > MAX_REPORTED else ''
+    return f'{name} - {msg} for image_num {shown}{more}'
+
+
+def check_core_data(imager: netCDF4.Group,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> list[str]:
+    """Check that the core index variables of an imager group are consistent
+
+    Args:
+        imager: The imager group to check.
+        chunk_size: Approximate number of images read in each chunk. This is
+            aligned to the chunking of ``startpixel``.
+
+    Returns:
+        A list of error messages, empty if the data is consistent.
+    """
+    core = core_group(imager)
+    name = core.path
+    n_dims = array_dimensions(imager)
+    n_pixels = pixel_count(core)
+
+    startpixel = raw(core.variables[STARTPIXEL])
+    width = raw(core.variables[WIDTH])
+    height = raw(core.variables[HEIGHT])
+    n_images = startpixel.shape[0]
+
+    checks = {
+        'first': 'first image does not start at pixel 0',
+        'monotonic': 'startpixel decreases',
+        'contiguous': 'image does not start at the end of the previous image',
+        'bounds': 'image extends beyond the end of the \'image\' variable',
+    }
+    found = {k: [] for k in checks}
+    counts = {k: 0 for k in checks}
+
+    def _flag(check, mask, offset):
+        n = int(np.count_nonzero(mask))
+        if n:
+            if counts[check] < MAX_REPORTED:
+                found[check].extend(
+                    (np.flatnonzero(mask)[:MAX_REPORTED] + offset).tolist())
+            counts[check] += n
+
+    prev_start = None
+    prev_end = np.uint64(0)
+    for sl in iter_chunks(n_images, chunk_size_for(startpixel, chunk_size)):
+        start = startpixel[sl].astype(np.uint64)
+        end = start + image_lengths(width[sl], height[sl], n_dims)
+
+        if prev_start is None:
+            _flag('first', start[:1] != 0, sl.start)
+            expected = end[:-1]
+            _flag('monotonic', start[1:] < start[:-1], sl.start + 1)
+            _flag('contiguous', start[1:] != expected, sl.start + 1)
+        else:
+            previous = np.concatenate(([prev_start], start[:-1]))
+            expected = np.concatenate(([prev_end], end[:-1]))
+            _flag('monotonic', start < previous, sl.start)
+            _flag('contiguous', start != expected, sl.start)
+        _flag('bounds', end > n_pixels, sl.start)
+
+        prev_start = start[-1]
+        prev_end = end[-1]
+
+    errors = [_report(name, checks[k], np.asarray(found[k]), counts[k])
+              for k in checks if counts[k]]
+
+    if n_images and prev_end < n_pixels:
+        errors.append(f'{name} - {n_pixels - int(prev_end)} pixels after the '
+                      'end of the last image')
+    elif not n_images and n_pixels:
+        errors.append(f'{name} - {n_pixels} pixels but no images')
+
+    return errors
+
+
+def check_derived_lengths(imager: netCDF4.Group) -> list[str]:
+    """Check that groups derived from the core data have one entry per image
+
+    Any sub-group of the imager group, other than 'core', with its own
+    ``image_num`` dimension, eg 'particle_stats', must have as many entries
+    as the 'core' group has images.
+    """
+    n_images = core_group(imager).dimensions[IMAGE_NUM_DIM].size
+    errors = []
+    for group in imager.groups.values():
+        if group.name == CORE_GROUP or IMAGE_NUM_DIM not in group.dimensions:
+            continue
+        size = group.dimensions[IMAGE_NUM_DIM].size
+        if size != n_images:
+            errors.append(f'{group.path} - {size} entries for {n_images} '
+                          'images')
+    return errors
+
+
+def _check_imager(imager: netCDF4.Group, chunk_size: int) -> list[str]:
+    """Run all data-level checks of an imager group"""
+    try:
+        return (check_core_data(imager, chunk_size)
+                + check_derived_lengths(imager))
+    except KeyError as err:
+        return [f'{imager.name} - {err} not found']
+    except ValueError as err:
+        return [str(err)]
+
+
+def check_data(nc: netCDF4.Dataset,
+               chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict[str, list[str]]:
+    """Check the core data of every imager group given in ``imager_groups``
+
+    Args:
+        nc: Open SPIF file.
+        chunk_size: Approximate number of images read in each chunk.
+
+    Returns:
+        Dictionary of error messages keyed by imager group name.
+    """
+    errors = {}
+    for name in imager_group_names(nc):
+        try:
+            imager = nc.groups[name]
+        except KeyError:
+            errors[name] = [f'{name} - imager group not found']
+            continue
+        errors[name] = _check_imager(imager, chunk_size)
+    return errors
+
+
+def check_file_data(path: str,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    max_workers: Optional[int] = None) -> dict[str, list[str]]:
+    """Check the core data of the imager groups of a file concurrently
+
+    Like ``check_data``, but each imager group is checked in its own worker
+    process, see ``parallel.map_imagers``.
+
+    Args:
+        path: Name of the SPIF file.
+        chunk_size: Approximate number of images read in each chunk.
+        max_workers: Largest number of worker processes. Default is one per
+            imager group.
+
+    Returns:
+        Dictionary of error messages keyed by imager group name.
+    """
+    results = map_imagers(path, _check_imager, chunk_size,
+                          max_workers=max_workers)
+    return {name: [str(result)] if isinstance(result, Exception) else result
+            for name, result in results.items()}
@@ -0,0 +1,256 @@
+"""
+Copying the groups and images of SPIF files into new files.
+
+The functions here are shared by the tools that build new files from
+existing ones, eg ``merge`` and ``subset``. Variables are created with the
+same datatype, dimensions, chunking, compression, and attributes as the
+source, and data is copied in blocks aligned to the source chunks, so memory
+use is bounded whatever the size of the files.
+
+The images of an imager group are appended through an ``ImagerWriter``,
+which rewrites ``startpixel`` relative to the new file and re-encodes packed
+pixels. Groups derived from the core data, ie sub-groups of the imager group
+with their own ``image_num`` dimension, are copied along with the images.
+"""
+
+from typing import Any, Optional
+
+import netCDF4  # type: ignore
+import numpy as np
+
+from .layout import (
+    CORE_GROUP, IMAGE, TIMESTAMP, STARTPIXEL, WIDTH, HEIGHT, OVERLOAD,
+    IMAGE_NUM_DIM, DEFAULT_CHUNK_SIZE, DEFAULT_PIXEL_BLOCK,
+    core_group, array_dimensions, image_lengths, chunk_size_for,
+    iter_chunks, pixel_blocks, raw,
+)
+from .packing import PACKED_IMAGE, pixel_source
+from .writer import ImagerWriter, IMAGE_CHUNK, PIXEL_CHUNK
+
+__all__ = ['copy_attributes', 'copy_variable', 'copy_dimensions',
+           'copy_group', 'image_variables', 'copy_imager', 'append_images']
+
+# Variables of the core group written by an ``ImagerWriter``
+WRITER_VARIABLES = (IMAGE, PACKED_IMAGE, TIMESTAMP, STARTPIXEL, WIDTH, HEIGHT,
+                    OVERLOAD)
+
+# Filter settings of a variable passed on to ``createVariable``
+FILTERS = ('zlib', 'complevel', 'shuffle', 'fletcher32')
+
+
+def copy_attributes(src: Any, dst: Any) -> None:
+    """Copy the attributes of a group or variable, except ``_FillValue``"""
+    dst.setncatts({k: src.getncattr(k) for k in src.ncattrs()
+                   if k != '_FillValue'})
+
+
+def copy_variable(var: netCDF4.Variable, group: netCDF4.Group,
+                  data: bool = True,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> netCDF4.Variable:
+    """Create a copy of a variable in a group
+
+    Args:
+        var: The variable to copy.
+        group: The group to create the copy in. Its dimensions must exist.
+        data: Also copy the data, in blocks along the first dimension.
+        chunk_size: Approximate number of elements copied at once.
+
+    Returns:
+        The new variable.
+    """
+    opts: dict[str, Any] = {}
+    if var.dtype is not str:
+        filters = var.filters() or {}
+        opts.update((k, filters[k]) for k in FILTERS if k in filters)
+        chunking = var.chunking()
+        if chunking not in (None, 'contiguous') and chunking:
+            opts['chunksizes'] = tuple(chunking)
+        if '_FillValue' in var.ncattrs():
+            opts['fill_value'] = var.getncattr('_FillValue')
+
+    new = group.createVariable(var.name, var.datatype, var.dimensions,
+                               **opts)
+    copy_attributes(var, new)
+
+    if data:
+        raw(var)
+        raw(new)
+        if not var.dimensions:
+            new[...] = var[...]
+        else:
+            rows = max(1, chunk_size // max(1, int(np.prod(var.shape[1:]))))
+            for chunk in iter_chunks(var.shape[0], chunk_size_for(var, rows)):
+                new[chunk] = var[chunk]
+    return new
+
+
+def copy_dimensions(src: netCDF4.Group, dst: netCDF4.Group) -> None:
+    """Create the dimensions of a group in another group"""
+    for dim in src.dimensions.values():
+        dst.createDimension(dim.name,
+                            None if dim.isunlimited() else dim.size)
+
+
+def copy_group(src: netCDF4.Group, parent: netCDF4.Group,
+               data: bool = True,
+               chunk_size: int = DEFAULT_CHUNK_SIZE) -> netCDF4.Group:
+    """Copy a group, with its sub-groups, into a parent group
+
+    Args:
+        src: The group to copy.
+        parent: The group, or dataset, to create the copy in.
+        data: Also copy the variable data.
+        chunk_size: Approximate number of elements copied at once.
+
+    Returns:
+        The new group.
+    """
+    dst = parent.createGroup(src.name)
+    copy_attributes(src, dst)
+    copy_dimensions(src, dst)
+    for var in src.variables.values():
+        copy_variable(var, dst, data, chunk_size)
+    for group in src.groups.values():
+        copy_group(group, dst, data, chunk_size)
+    return dst
+
+
+def _derived_groups(imager: netCDF4.Group) -> list[netCDF4.Group]:
+    """Return the sub-groups of an imager group with one entry per image"""
+    return [g for g in imager.groups.values()
+            if g.name != CORE_GROUP and IMAGE_NUM_DIM in g.dimensions]
+
+
+def image_variables(imager: netCDF4.Group) -> dict[str, tuple]:
+    """Return the variables copied along with the images of an imager group
+
+    These are the variables on ``image_num`` of the core group other than
+    those written by an ``ImagerWriter``, and those of groups derived from
+    the core data, eg 'particle_stats'. Imager groups whose images are
+    copied into the same group must have the same of these.
+
+    Returns:
+        The datatype and dimensions of each variable, keyed by its path
+        relative to the imager group, eg 'particle_stats/x_extent'.
+    """
+    core = core_group(imager)
+    variables = [var for name, var in core.variables.items()
+                 if name not in WRITER_VARIABLES
+                 and var.dimensions[:1] == (IMAGE_NUM_DIM,)]
+    for group in _derived_groups(imager):
+        variables.extend(var for var in group.variables.values()
+                         if var.dimensions[:1] == (IMAGE_NUM_DIM,))
+    return {f'{var.group().name}/{var.name}':
+            (str(np.dtype(var.dtype)) if var.dtype is not str else 'str',
+             var.dimensions)
+            for var in variables}
+
+
+def copy_imager(src: netCDF4.Group, parent: netCDF4.Group,
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> ImagerWriter:
+    """Copy an imager group without its images
+
+    All content of the imager group is copied, except for the data of the
+    core group and of groups derived from it, which are created empty.
+
+    Args:
+        src: The imager group to copy.
+        parent: The dataset to create the copy in.
+        chunk_size: Approximate number of elements copied at once.
+
+    Returns:
+        A writer to add images to the new imager group, see
+        ``append_images``.
+    """
+    dst = parent.createGroup(src.name)
+    copy_attributes(src, dst)
+    copy_dimensions(src, dst)
+    for var in src.variables.values():
+        copy_variable(var, dst, True, chunk_size)
+
+    derived = {g.name for g in _derived_groups(src)}
+    for group in src.groups.values():
+        empty = group.name == CORE_GROUP or group.name in derived
+        copy_group(group, dst, data=not empty, chunk_size=chunk_size)
+
+    core = core_group(dst)
+    encoding = None
+    if PACKED_IMAGE in core.variables:
+        packed = core.variables[PACKED_IMAGE]
+        encoding = packed.getncattr('encoding')
+        packed.unpacked_length = np.uint64(0)
+
+    def chunk(name: str, default: int) -> int:
+        chunking = core.variables[name].chunking()
+        if chunking in (None, 'contiguous') or not chunking:
+            return default
+        return int(chunking[0])
+
+    return ImagerWriter(core, array_dimensions(dst),
+                        chunk(STARTPIXEL, IMAGE_CHUNK),
+                        chunk(IMAGE, PIXEL_CHUNK),
+                        encoding)
+
+
+def append_images(writer: ImagerWriter, src: netCDF4.Group,
+                  images: Optional[slice] = None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  max_pixels: int = DEFAULT_PIXEL_BLOCK) -> None:
+    """Append a range of images from an imager group
+
+    The index variables are read in blocks aligned to the source chunks, and
+    the pixels of each block in one contiguous read. Further variables on
+    ``image_num`` in the core group, and in groups derived from it, are
+    copied for the same images.
+
+    Args:
+        writer: Writer of the imager group to append to, see ``copy_imager``.
+        src: The imager group to copy images from.
+        images: The images to copy. Default is all of them.
+        chunk_size: Approximate number of images read at once.
+        max_pixels: Largest number of pixels read at once.
+    """
+    core = core_group(src)
+    n_dims = array_dimensions(src)
+    pixels = pixel_source(core)
+    index = {name: raw(core.variables[name])
+             for name in (TIMESTAMP, STARTPIXEL, WIDTH, HEIGHT, OVERLOAD)}
+
+    # Variables on image_num not written by the writer, and their copies
+    dst_imager = writer.core.parent
+    extra = [(raw(var), raw(writer.core.variables[name]))
+             for name, var in core.variables.items()
+             if name not in WRITER_VARIABLES
+             and var.dimensions[:1] == (IMAGE_NUM_DIM,)]
+    for group in _derived_groups(src):
+        dst_group = dst_imager.groups[group.name]
+        extra.extend((raw(var), raw(dst_group.variables[name]))
+                     for name, var in group.variables.items()
+                     if var.dimensions[:1] == (IMAGE_NUM_DIM,))
+
+    n_images = index[STARTPIXEL].shape[0]
+    start, stop, _ = (images or slice(None)).indices(n_images)
+    aligned = chunk_size_for(index[STARTPIXEL], chunk_size)
+
+    # Align the first block to the source chunks
+    first_stop = min(stop, (start // aligned + 1) * aligned)
+    chunks = [slice(start, first_stop)] if start < first_stop else []
+    chunks.extend(iter_chunks(stop, aligned, first_stop))
+
+    for chunk in chunks:
+        startpixel = index[STARTPIXEL][chunk].astype(np.uint64)
+        width = index[WIDTH][chunk]
+        height = index[HEIGHT][chunk]
+        timestamp = index[TIMESTAMP][chunk]
+        overload = index[OVERLOAD][chunk]
+        lengths = image_lengths(width, height, n_dims)
+
+        for block in pixel_blocks(lengths, max_pixels):
+            first = int(startpixel[block.start])
+            last = int(startpixel[block.stop - 1] + lengths[block.stop - 1])
+            offset = writer.n_images
+            rows = slice(chunk.start + block.start, chunk.start + block.stop)
+            for var, new in extra:
+                new[offset:offset + block.stop - block.start] = var[rows]
+            writer.extend(pixels[first:last], width[block], height[block],
+                          timestamp[block], overload[block])
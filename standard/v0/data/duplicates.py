@@ -0,0 +1,352 @@
+"""
+Detection of repeated images.
+
+Repeated images are kept in the ``image`` variable, so that it remains an
+accurate copy of the raw data. The functions here find them by hashing the
+width, height, and pixels of every image of an imager group, and flag each
+image that is identical to an earlier one;
+
+    :image_hash: A 64-bit hash of the image.
+    :duplicate: Flags of an image identical to the previous image (1) or to
+        any earlier image (2). An image repeating the previous one has both
+        flags.
+
+The hash is a sum over the shaded pixels of an image of the pixel color
+times a pseudo-random weight of its position in the image, computed with
+segment reductions over blocks of images as for ``stats``, so background
+pixels cost nothing beyond finding them and there is no per-image Python
+loop. The weights are fixed, so hashes may be compared between files. Equal
+hashes of different images are possible but very unlikely, about one pair in
+``2**64``.
+
+The results may be written to an optional 'ancillary' group of the imager
+group, which is validated by the ``AncillaryGroup`` model, eg
+
+.. code-block:: python
+
+    with netCDF4.Dataset('flight.nc', 'a') as nc:
+        for name in imager_group_names(nc):
+            write_duplicate_flags(nc[name])
+
+or, with the imager groups hashed in parallel processes,
+
+.. code-block:: shell
+
+    ~/spif$ python -m standard.v0.data.duplicates flight.nc
+
+Each process writes the hashes and flags of its imager group to a scratch
+file, and these are then copied into the file one at a time.
+"""
+
+import os
+import tempfile
+from functools import lru_cache
+from typing import Any, Iterator, Optional
+
+import netCDF4  # type: ignore
+import numpy as np
+
+from .layout import (
+    IMAGE_NUM_DIM, STARTPIXEL, WIDTH, HEIGHT, DEFAULT_CHUNK_SIZE,
+    DEFAULT_PIXEL_BLOCK, core_group, array_dimensions, image_lengths,
+    chunk_size_for, iter_chunks, pixel_blocks, raw,
+)
+from .packing import pixel_source
+from .parallel import map_imagers
+
+__all__ = ['ANCILLARY_GROUP', 'DUPLICATE_PREVIOUS', 'DUPLICATE_EARLIER',
+           'hash_images', 'iter_image_hashes', 'image_hashes',
+           'duplicate_flags', 'write_duplicate_flags']
+
+ANCILLARY_GROUP = 'ancillary'
+
+# Flags of 'duplicate'
+DUPLICATE_PREVIOUS = 1
+DUPLICATE_EARLIER = 2
+
+# Seed of the position weights. Changing it changes every hash
+HASH_SEED = 0x5350_4946
+
+# Pixel positions are split into two halves of this many bits, each with its
+# own table of weights
+_POSITION_BITS = 16
+
+
+@lru_cache(maxsize=1)
+def _weights() -> tuple[np.ndarray, np.ndarray]:
+    """Return the tables of weights of the low and high position bits"""
+    rng = np.random.default_rng(HASH_SEED)
+    low, high = rng.integers(0, 2 ** 64, size=(2, 2 ** _POSITION_BITS),
+                             dtype=np.uint64, endpoint=False)
+    # Odd weights, so that no pixel color difference can vanish. The first
+    # high weight is 1 so that it need not be applied to small images
+    low |= np.uint64(1)
+    high |= np.uint64(1)
+    high[0] = 1
+    return low, high
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """Scramble 64-bit values, the finalizer of splitmix64"""
+    values = values ^ (values >> np.uint64(30))
+    values *= np.uint64(0xbf58476d1ce4e5b9)
+    values ^= values >> np.uint64(27)
+    values *= np.uint64(0x94d049bb133111eb)
+    values ^= values >> np.uint64(31)
+    return values
+
+
+def hash_images(pixels: np.ndarray,
+                startpixel: np.ndarray,
+                width: np.ndarray,
+                height: np.ndarray) -> np.ndarray:
+    """Return the hashes of a contiguous block of images
+
+    Args:
+        pixels: The pixels of the images, starting at the first pixel of the
+            first image.
+        startpixel: The first pixel of each image.
+        width: The width of each image.
+        height: The height of each image.
+
+    Returns:
+        The ``uint64`` hash of each image.
+    """
+    n = len(startpixel)
+    starts = np.asarray(startpixel, dtype=np.int64)
+    if n:
+        starts = starts - starts[0]
+
+    # Only shaded pixels add to the sums, so find the image and position of
+    # each
+    shaded = np.flatnonzero(pixels)
+    image = np.searchsorted(starts, shaded, side='right') - 1
+    position = (shaded - starts[image]).astype(np.uint64)
+
+    low, high = _weights()
+    mask = np.uint64(2 ** _POSITION_BITS - 1)
+    terms = low[position & mask]
+    if shaded.size and position.max() > mask:
+        terms *= high[(position >> np.uint64(_POSITION_BITS)) & mask]
+    terms *= pixels[shaded].astype(np.uint64)
+
+    sums = np.zeros(n, dtype=np.uint64)
+    if shaded.size:
+        # Shaded pixels are in image order, so each image is one segment
+        first = np.flatnonzero(np.diff(image, prepend=-1))
+        sums[image[first]] = np.add.reduceat(terms, first)
+
+    shape = ((np.asarray(width, dtype=np.uint64) << np.uint64(32))
+             | np.asarray(height, dtype=np.uint64))
+    return _mix(sums ^ _mix(shape))
+
+
+def iter_image_hashes(
+        imager: netCDF4.Group,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_pixels: int = DEFAULT_PIXEL_BLOCK,
+) -> Iterator[tuple[slice, np.ndarray]]:
+    """Compute the hashes of the images of an imager group in blocks
+
+    Args:
+        imager: The imager group.
+        chunk_size: Approximate number of images whose index variables are
+            read at once. This is aligned to the chunking of ``startpixel``.
+        max_pixels: Largest number of pixels read at once.
+
+    Yields:
+        The ``image_num`` slice of a block and its hashes.
+    """
+    core = core_group(imager)
+    n_dims = array_dimensions(imager)
+
+    image = pixel_source(core)
+    startpixel = raw(core.variables[STARTPIXEL])
+    width = raw(core.variables[WIDTH])
+    height = raw(core.variables[HEIGHT])
+    n_images = startpixel.shape[0]
+
+    for chunk in iter_chunks(n_images, chunk_size_for(startpixel, chunk_size)):
+        starts = startpixel[chunk].astype(np.uint64)
+        widths = width[chunk]
+        heights = height[chunk]
+        lengths = image_lengths(widths, heights, n_dims)
+
+        for block in pixel_blocks(lengths, max_pixels):
+            first = int(starts[block.start])
+            last = int(starts[block.stop - 1] + lengths[block.stop - 1])
+            hashes = hash_images(image[first:last], starts[block],
+                                 widths[block], heights[block])
+            yield (slice(chunk.start + block.start,
+                         chunk.start + block.stop), hashes)
+
+
+def image_hashes(imager: netCDF4.Group,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+    """Return the hashes of every image of an imager group
+
+    Args:
+        imager: The imager group.
+        chunk_size: Approximate number of images processed at once.
+
+    Returns:
+        The ``uint64`` hash of each image.
+    """
+    blocks = [hashes for _, hashes in iter_image_hashes(imager, chunk_size)]
+    return (np.concatenate(blocks) if blocks
+            else np.zeros(0, dtype=np.uint64))
+
+
+def duplicate_flags(hashes: np.ndarray) -> np.ndarray:
+    """Return the duplicate flags of images from their hashes
+
+    Args:
+        hashes: The hash of each image, in order.
+
+    Returns:
+        The ``int8`` flags of each image, see module documentation.
+    """
+    hashes = np.asarray(hashes)
+    flags = np.zeros(len(hashes), dtype=np.int8)
+    if len(hashes) < 2:
+        return flags
+
+    flags[1:][hashes[1:] == hashes[:-1]] |= DUPLICATE_PREVIOUS
+
+    # A stable sort keeps equal hashes in image order, so all but the first
+    # of each run of equal hashes repeat an earlier image
+    order = np.argsort(hashes, kind='stable')
+    ordered = hashes[order]
+    repeats = order[1:][ordered[1:] == ordered[:-1]]
+    flags[repeats] |= DUPLICATE_EARLIER
+    return flags
+
+
+def write_duplicate_flags(imager: netCDF4.Group,
+                          group: str = ANCILLARY_GROUP,
+                          chunk_size: int = DEFAULT_CHUNK_SIZE,
+                          zlib: bool = True,
+                          complevel: int = 4,
+                          hashes: Optional[Any] = None,
+                          flags: Optional[Any] = None,
+                          ) -> netCDF4.Group:
+    """Hash the images of an imager group and write their duplicate flags
+
+    The file must be open for writing. The 'image_hash' and 'duplicate'
+    variables are created in the group if needed, and overwritten.
+
+    Args:
+        imager: The imager group.
+        group: Name of the ancillary group created in the imager group.
+        chunk_size: Approximate number of images processed at once.
+        zlib: Compress the new variables.
+        complevel: Compression level used when ``zlib`` is True.
+        hashes: Hashes already computed with ``image_hashes``, eg in another
+            process. Computed here if ``None``.
+        flags: Flags already computed with ``duplicate_flags``. Computed
+            from ``hashes`` if ``None``. Given hashes and flags may be
+            variables of a scratch file, and are copied in chunks.
+
+    Returns:
+        The ancillary group.
+    """
+    if hashes is None:
+        hashes = image_hashes(imager, chunk_size)
+    if flags is None:
+        flags = duplicate_flags(hashes[:])
+
+    if group in imager.groups:
+        ancillary = imager.groups[group]
+    else:
+        ancillary = imager.createGroup(group)
+        ancillary.group_type = 'ancillary'
+        ancillary.createDimension(IMAGE_NUM_DIM, None)
+
+    image_chunk = core_group(imager).variables[STARTPIXEL].chunking()
+    chunks = (None if image_chunk in (None, 'contiguous')
+              else (int(image_chunk[0]),))
+    opts = dict(zlib=zlib, complevel=complevel) if zlib else {}
+
+    if 'image_hash' not in ancillary.variables:
+        var = ancillary.createVariable('image_hash', np.uint64,
+                                       (IMAGE_NUM_DIM,), chunksizes=chunks,
+                                       **opts)
+        var.long_name = 'Hash of the image shape and pixels'
+    if 'duplicate' not in ancillary.variables:
+        var = ancillary.createVariable('duplicate', np.int8,
+                                       (IMAGE_NUM_DIM,), chunksizes=chunks,
+                                       **opts)
+        var.long_name = 'Image is identical to an earlier image'
+        var.flag_masks = np.array([DUPLICATE_PREVIOUS, DUPLICATE_EARLIER],
+                                  dtype=np.int8)
+        var.flag_meanings = 'previous_image earlier_image'
+
+    for name, values in (('image_hash', hashes), ('duplicate', flags)):
+        var = raw(ancillary.variables[name])
+        for chunk in iter_chunks(len(values), chunk_size_for(var, chunk_size)):
+            var[chunk] = values[chunk]
+    return ancillary
+
+
+def _scratch_flags(imager: netCDF4.Group, directory: str,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> tuple[str, int]:
+    """Write the hashes and flags of an imager group to a scratch file
+
+    Returns:
+        The name of the scratch file, which holds 'image_hash' and
+        'duplicate' variables, and the number of repeated images.
+    """
+    hashes = image_hashes(imager, chunk_size)
+    flags = duplicate_flags(hashes)
+    filename = os.path.join(directory, f'{imager.name}.nc')
+    with netCDF4.Dataset(filename, 'w') as nc:
+        nc.createDimension(IMAGE_NUM_DIM, None)
+        for name, values in (('image_hash', hashes), ('duplicate', flags)):
+            nc.createVariable(name, values.dtype, (IMAGE_NUM_DIM,))[:] = values
+    return filename, int(np.count_nonzero(flags & DUPLICATE_EARLIER))
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == '__main__':
+
+    import argparse
+
+    parser = argparse.ArgumentParser(
+            description=('Flag repeated images in the imager groups of SPIF '
+                         'files.'))
+    parser.add_argument('paths',
+                        nargs='+',
+                        help='Files to add flags to, in place.')
+    parser.add_argument('--group',
+                        dest='group',
+                        default=ANCILLARY_GROUP,
+                        help=('Name of the ancillary group. Default is '
+                              f'"{ANCILLARY_GROUP}".'))
+    parser.add_argument('-j', '--jobs',
+                        dest='max_workers',
+                        type=int,
+                        default=None,
+                        help=('Number of worker processes hashing the '
+                              'imager groups of a file. Default is one per '
+                              'imager group.'))
+
+    args = parser.parse_args()
+
+    for path in args.paths:
+        with tempfile.TemporaryDirectory() as directory:
+            results = map_imagers(path, _scratch_flags, directory,
+                                  max_workers=args.max_workers)
+            with netCDF4.Dataset(path, 'a') as nc:
+                for name, result in results.items():
+                    if isinstance(result, Exception):
+                        print(f'{path}: {name} failed ({result})')
+                        continue
+                    scratch, n = result
+                    with netCDF4.Dataset(scratch, 'r') as flags:
+                        write_duplicate_flags(
+                            nc[name], args.group,
+                            hashes=raw(flags.variables['image_hash']),
+                            flags=raw(flags.variables['duplicate'])
+                        )
+                    print(f'{path}: {name}/{args.group}, {n} repeated images')
@@ -0,0 +1,97 @@
+"""
+Reading the structure of a SPIF file from its header alone.
+
+All the rules of the models in ``standard/v0/models`` are about metadata;
+dimension sizes, datatypes, attributes, and the group layout. The functions
+here build the input of the ``Dataset`` model without reading any variable
+data, so the time taken does not depend on the size of the file;
+
+    * only names, datatypes, dimensions, and attributes are requested from
+      netCDF, never variable values,
+    * the HDF5 chunk cache of every variable is switched off while the
+      file is open, so no chunk can be read or decompressed into it, and
+    * the file is closed before the structure is handed to any validator.
+"""
+
+import os
+from typing import Any
+
+import netCDF4  # type: ignore
+import numpy as np
+
+__all__ = ['read_structure', 'read_header']
+
+
+def _value(value: Any) -> Any:
+    """Convert a netCDF attribute value into a python type"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _attributes(obj: Any) -> dict:
+    return {k: _value(obj.getncattr(k)) for k in obj.ncattrs()}
+
+
+def _datatype(var: netCDF4.Variable) -> str:
+    """Return the datatype string used by the models, eg '<uint8>'"""
+    if var.dtype is str:
+        return '<str>'
+    return f'<{np.dtype(var.dtype).name}>'
+
+
+def _variable(var: netCDF4.Variable) -> dict:
+    return {
+        'meta': {'name': var.name, 'datatype': _datatype(var)},
+        'dimensions': list(var.dimensions),
+        'attributes': _attributes(var),
+    }
+
+
+def _group(grp: netCDF4.Group) -> dict:
+    return {
+        'meta': {'name': grp.name},
+        'attributes': _attributes(grp),
+        'dimensions': [
+            {'name': d.name, 'size': None if d.isunlimited() else d.size}
+            for d in grp.dimensions.values()
+        ],
+        'variables': [_variable(v) for v in grp.variables.values()],
+        'groups': [_group(g) for g in grp.groups.values()],
+    }
+
+
+def read_structure(nc: netCDF4.Dataset) -> dict:
+    """Return the structure of an open file as input to the ``Dataset`` model
+
+    Only the metadata of the file is read.
+    """
+    structure = _group(nc)
+    structure['meta'] = {'file_pattern': os.path.basename(nc.filepath())}
+    return structure
+
+
+def _no_chunk_cache(grp: netCDF4.Group) -> None:
+    """Switch off the HDF5 chunk cache of the variables of an open group
+
+    The cache is set for each variable rather than with
+    ``netCDF4.set_chunk_cache``, which would change it for every file opened
+    meanwhile in other threads.
+    """
+    for var in grp.variables.values():
+        var.set_var_chunk_cache(size=0, nelems=0)
+    for sub in grp.groups.values():
+        _no_chunk_cache(sub)
+
+
+def read_header(path: str) -> dict:
+    """Return the structure of a file as input to the ``Dataset`` model
+
+    The file is opened, its header read, and closed again without any
+    variable data being read.
+    """
+    with netCDF4.Dataset(path, 'r') as nc:
+        _no_chunk_cache(nc)
+        return read_structure(nc)
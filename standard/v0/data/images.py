@@ -0,0 +1,242 @@
+"""
+Random access to individual images in the flattened ``image`` variable.
+
+The pixels of image *n* are ``image[startpixel[n]:startpixel[n] + length[n]]``
+where ``length = width * height * array_dimensions``. An ``ImageReader`` loads
+the per-image index variables once and serves images from them, eg
+
+.. code-block:: python
+
+    with netCDF4.Dataset('spif_example.nc') as nc:
+        reader = ImageReader(nc['imager_1'])
+        image = reader.get(100)
+        images = reader.get_many([5, 3000, 6, 7])
+        first_ten = reader[:10]
+        in_window = reader.get_window(start, stop)
+        stack = reader.stack(slice(0, 10000))
+
+Requests for several images are coalesced into as few reads of ``image`` as
+possible, with nearby images read together in one contiguous block.
+
+``stack`` returns a range of images as a single ``(N, height, width)`` array
+for array processing. If every image in the range has the same width and
+height, as for many imagers with a fixed ``image_size``, this is a view of
+the pixels read from the file. Otherwise the images are padded to the
+largest height and width in the range, with the pixels scattered into place
+in one vectorized step.
+"""
+
+from functools import cached_property
+from typing import Iterable, Optional, Union
+
+import netCDF4  # type: ignore
+import numpy as np
+
+from .layout import (
+    STARTPIXEL, WIDTH, HEIGHT,
+    core_group, array_dimensions, image_lengths, raw,
+)
+from .packing import pixel_source
+from .timewindow import TimeIndex
+
+__all__ = ['ImageReader']
+
+
+class ImageReader:
+    """Random access reader of the images of an imager group
+
+    Args:
+        imager: The imager group to read from.
+        max_gap: Largest number of unwanted pixels between two requested
+            images for them to be read in a single block. Default is the
+            chunk length of the ``image`` variable, as the pixels in between
+            must then be decompressed anyway.
+    """
+
+    def __init__(self, imager: netCDF4.Group,
+                 max_gap: Optional[int] = None) -> None:
+        self.imager = imager
+        self.core = core_group(imager)
+        self.n_dims = array_dimensions(imager)
+        self.image = pixel_source(self.core)
+
+        if max_gap is None:
+            chunking = self.image.chunking()
+            max_gap = (0 if chunking in (None, 'contiguous') or not chunking
+                       else int(chunking[0]))
+        self.max_gap = max_gap
+
+    @cached_property
+    def width(self) -> np.ndarray:
+        """Width of each image"""
+        return raw(self.core.variables[WIDTH])[:]
+
+    @cached_property
+    def height(self) -> np.ndarray:
+        """Height of each image"""
+        return raw(self.core.variables[HEIGHT])[:]
+
+    @cached_property
+    def startpixel(self) -> np.ndarray:
+        """Index of the first pixel of each image as ``uint64``"""
+        return raw(self.core.variables[STARTPIXEL])[:].astype(np.uint64)
+
+    @cached_property
+    def lengths(self) -> np.ndarray:
+        """Number of pixels of each image as ``uint64``"""
+        return image_lengths(self.width, self.height, self.n_dims)
+
+    @cached_property
+    def time_index(self) -> TimeIndex:
+        """Index of the image timestamps"""
+        return TimeIndex(self.imager)
+
+    def __len__(self) -> int:
+        return len(self.startpixel)
+
+    def __getitem__(self, key: Union[int, slice]):
+        if isinstance(key, slice):
+            return self.get_slice(key)
+        return self.get(key)
+
+    def _index(self, n: int) -> int:
+        """Return a non-negative image number, checking it is in range"""
+        size = len(self)
+        if n < 0:
+            n += size
+        if not 0 <= n < size:
+            raise IndexError(f'image {n} out of range for {size} images')
+        return n
+
+    def _shape(self, pixels: np.ndarray, n: int) -> np.ndarray:
+        """Reshape the flat pixels of image ``n`` into its slices"""
+        return pixels.reshape(int(self.height[n]),
+                              int(self.width[n]) * self.n_dims)
+
+    def segment(self, n: int) -> np.ndarray:
+        """Return the flat pixels of image ``n``"""
+        n = self._index(n)
+        start = int(self.startpixel[n])
+        return self.image[start:start + int(self.lengths[n])]
+
+    def get(self, n: int) -> np.ndarray:
+        """Return image ``n`` with shape ``(height, width * array_dimensions)``"""
+        n = self._index(n)
+        return self._shape(self.segment(n), n)
+
+    def blocks(self, indices: Iterable[int]) -> list[tuple[int, int]]:
+        """Return the pixel ranges that are read to get the given images
+
+        Images are sorted by position in ``image`` and neighbouring images
+        with no more than ``max_gap`` pixels between them are merged into a
+        single block.
+        """
+        index = np.unique([self._index(int(i)) for i in indices])
+        if not index.size:
+            return []
+        starts = self.startpixel[index]
+        ends = starts + self.lengths[index]
+        order = np.argsort(starts, kind='stable')
+        starts, ends = starts[order], np.maximum.accumulate(ends[order])
+
+        # A new block starts wherever the gap to the previous image is too big
+        new = np.flatnonzero(starts[1:] > ends[:-1] + np.uint64(self.max_gap)) + 1
+        first = np.concatenate(([0], new))
+        last = np.concatenate((new - 1, [len(starts) - 1]))
+        return list(zip(starts[first].tolist(), ends[last].tolist()))
+
+    def get_many(self, indices: Iterable[int]) -> list[np.ndarray]:
+        """Return several images, in the order requested
+
+        The images are read with one call per block given by ``blocks``.
+        """
+        indices = [self._index(int(i)) for i in indices]
+        blocks = self.blocks(indices)
+        block_starts = np.array([b[0] for b in blocks], dtype=np.uint64)
+        data = [self.image[a:b] for a, b in blocks]
+
+        images = []
+        for n in indices:
+            start = self.startpixel[n]
+            i = int(np.searchsorted(block_starts, start, side='right')) - 1
+            offset = int(start - block_starts[i])
+            pixels = data[i][offset:offset + int(self.lengths[n])]
+            images.append(self._shape(pixels, n))
+        return images
+
+    def get_slice(self, key: slice) -> list[np.ndarray]:
+        """Return a range of consecutive images read as one block"""
+        index = range(*key.indices(len(self)))
+        if not len(index):
+            return []
+        if index.step == 1:
+            return self._get_range(index.start, index.stop)
+        return self.get_many(index)
+
+    def _get_range(self, first: int, stop: int) -> list[np.ndarray]:
+        """Return images ``first`` to ``stop - 1`` from a single read"""
+        starts = self.startpixel[first:stop]
+        ends = starts + self.lengths[first:stop]
+        base = int(starts[0])
+        pixels = self.image[base:int(ends.max())]
+        return [self._shape(pixels[int(a) - base:int(b) - base], n)
+                for n, a, b in zip(range(first, stop), starts, ends)]
+
+    def get_window(self, start: int, stop: int) -> list[np.ndarray]:
+        """Return the images with ``start <= timestamp < stop``"""
+        images = self.time_index.images(start, stop)
+        if images.start == images.stop:
+            return []
+        return self._get_range(images.start, images.stop)
+
+    def stack(self, key: slice, fill: int = 0) -> np.ndarray:
+        """Return a range of images as an array of shape ``(N, height, width)``
+
+        The width is ``width * array_dimensions``. Images of a range with a
+        single width and height are returned as a view of the pixels read,
+        otherwise images are padded with ``fill`` to the largest height and
+        width of the range.
+
+        Args:
+            key: Range of image numbers, with a step of 1.
+            fill: Value of the padding pixels.
+        """
+        first, stop, step = key.indices(len(self))
+        if step != 1:
+            raise ValueError('stack only supports ranges with a step of 1')
+        if stop <= first:
+            return np.empty((0, 0, 0), dtype=self.image.dtype)
+
+        width = self.width[first:stop].astype(np.int64) * self.n_dims
+        height = self.height[first:stop].astype(np.int64)
+        starts = self.startpixel[first:stop].astype(np.int64)
+        lengths = self.lengths[first:stop].astype(np.int64)
+        base = int(starts[0])
+        starts -= base
+        pixels = self.image[base:int((starts + lengths).max()) + base]
+
+        # Images are contiguous if each starts where the previous one ended
+        contiguous = (starts[0] == 0 and
+                      np.array_equal(starts[1:], np.cumsum(lengths[:-1])))
+        fixed_width = bool((width[0] == width).all())
+        n, max_width, max_height = len(width), int(width.max()), int(height.max())
+
+        if contiguous and fixed_width and bool((height[0] == height).all()):
+            return pixels[:lengths.sum()].reshape(n, max_height, max_width)
+
+        out = np.full((n, max_height, max_width), fill, dtype=pixels.dtype)
+        if contiguous and fixed_width:
+            # Scatter whole rows, each image being a whole number of rows
+            rows = pixels[:lengths.sum()].reshape(-1, max_width)
+            image = np.repeat(np.arange(n), height)
+            first_row = np.repeat(np.cumsum(height) - height, height)
+            out[image, np.arange(len(rows)) - first_row] = rows
+            return out
+
+        # Scatter every pixel to its image, row, and column
+        image = np.repeat(np.arange(n), lengths)
+        offset = (np.arange(lengths.sum())
+                  - np.repeat(np.cumsum(lengths) - lengths, lengths))
+        row, col = np.divmod(offset, np.repeat(width, lengths))
+        out[image, row, col] = pixels[np.repeat(starts, lengths) + offset]
+        return out
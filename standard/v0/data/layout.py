@@ -0,0 +1,119 @@
+"""
+Names and helpers describing how image data is laid out in a SPIF file
+"""
+
+import re
+from typing import Iterator
+
+import netCDF4  # type: ignore
+import numpy as np
+
+__all__ = ['CORE_GROUP',
+           'IMAGE', 'TIMESTAMP', 'STARTPIXEL', 'WIDTH', 'HEIGHT', 'OVERLOAD',
+           'IMAGE_NUM_DIM', 'PIXEL_DIM', 'ARRAY_DIMENSIONS_DIM',
+           'DEFAULT_CHUNK_SIZE', 'DEFAULT_PIXEL_BLOCK',
+           'imager_group_names', 'core_group', 'array_dimensions',
+           'image_lengths', 'chunk_size_for', 'iter_chunks', 'pixel_blocks',
+           'raw',
+           ]
+
+# Group and variable names mandated by the standard
+CORE_GROUP = 'core'
+IMAGE = 'image'
+TIMESTAMP = 'timestamp'
+STARTPIXEL = 'startpixel'
+WIDTH = 'width'
+HEIGHT = 'height'
+OVERLOAD = 'overload'
+
+# Dimension names mandated by the standard
+IMAGE_NUM_DIM = 'image_num'
+PIXEL_DIM = 'pixel'
+ARRAY_DIMENSIONS_DIM = 'array_dimensions'
+
+# Default number of elements read from a variable in one go
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+# Default largest number of pixels read in one go
+DEFAULT_PIXEL_BLOCK = 2 ** 24
+
+
+def imager_group_names(nc: netCDF4.Dataset) -> list[str]:
+    """Return the imager group names given in the ``imager_groups`` attribute
+
+    The attribute is a space- or comma-delineated string of group names.
+    """
+    names = getattr(nc, 'imager_groups', '')
+    return [n for n in re.split(r'[,\s]+', names.strip()) if n]
+
+
+def core_group(imager: netCDF4.Group) -> netCDF4.Group:
+    """Return the 'core' group of an imager group"""
+    try:
+        return imager.groups[CORE_GROUP]
+    except KeyError:
+        raise ValueError(f'{imager.path} - No \'{CORE_GROUP}\' group found')
+
+
+def array_dimensions(imager: netCDF4.Group) -> int:
+    """Return the size of the 'array_dimensions' dimension of an imager group
+
+    Each image holds ``width * height * array_dimensions`` pixels.
+    """
+    try:
+        return imager.dimensions[ARRAY_DIMENSIONS_DIM].size
+    except KeyError:
+        raise ValueError(f'{imager.path} - No \'{ARRAY_DIMENSIONS_DIM}\' '
+                         'dimension found')
+
+
+def image_lengths(width: np.ndarray,
+                  height: np.ndarray,
+                  n_dims: int = 1) -> np.ndarray:
+    """Return the number of pixels in each image as an ``uint64`` array"""
+    lengths = np.asarray(width, dtype=np.uint64) * np.asarray(height,
+                                                              dtype=np.uint64)
+    if n_dims != 1:
+        lengths *= np.uint64(n_dims)
+    return lengths
+
+
+def chunk_size_for(var: netCDF4.Variable,
+                   target: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Return a read size of about ``target`` aligned to the variable chunks
+
+    Reading whole HDF5 chunks means each chunk is decompressed only once.
+    """
+    chunking = var.chunking()
+    if chunking in (None, 'contiguous') or not chunking:
+        return target
+    chunk = int(chunking[0])
+    return max(chunk, (target // chunk) * chunk)
+
+
+def iter_chunks(n: int, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                start: int = 0) -> Iterator[slice]:
+    """Yield consecutive slices covering ``start`` to ``n``"""
+    for i in range(start, n, chunk_size):
+        yield slice(i, min(i + chunk_size, n))
+
+
+def pixel_blocks(lengths: np.ndarray, max_pixels: int) -> Iterator[slice]:
+    """Split images into consecutive blocks of at most ``max_pixels``
+
+    A block holds a single image if that image alone is larger.
+    """
+    ends = np.cumsum(lengths, dtype=np.uint64)
+    start = 0
+    while start < len(lengths):
+        base = int(ends[start - 1]) if start else 0
+        stop = int(np.searchsorted(ends, base + max_pixels, side='right'))
+        stop = max(stop, start + 1)
+        yield slice(start, stop)
+        start = stop
+
+
+def raw(var: netCDF4.Variable) -> netCDF4.Variable:
+    """Switch off masking and scaling so reads return plain numpy arrays"""
+    var.set_auto_maskandscale(False)
+    return var
@@ -0,0 +1,156 @@
+"""
+Merging several SPIF files into one.
+
+Acquisition software often splits a flight into many segment files. The
+images of each imager group are concatenated, in the order of the files, and
+``startpixel`` is rebased by the running number of pixels, eg
+
+.. code-block:: python
+
+    merge_files(sorted(glob.glob('segments/*.nc')), 'flight.nc')
+
+or from the command line
+
+.. code-block:: shell
+
+    ~/spif$ python -m standard.v0.data.merge -o flight.nc segments/*.nc
+
+The imager groups of all the files must agree on ``resolution``,
+``array_size``, ``color_level``, and the units of ``timestamp``, as images
+from differently configured imagers cannot share a group. They must also
+have the same per-image variables besides the core data, eg the same
+'particle_stats' and 'ancillary' groups, so that these cover every merged
+image. All files are checked before the merged file is created. An imager group
+may be missing from some of the files. The global attributes and any other
+groups, eg platform groups, are taken from the first file.
+
+Data is copied in chunks as numpy arrays, with one input file open at a
+time, so memory use does not depend on the number or size of the files.
+"""
+
+from typing import Sequence
+
+import netCDF4  # type: ignore
+import numpy as np
+
+from .copying import (
+    copy_attributes, copy_variable, copy_dimensions, copy_group,
+    image_variables, copy_imager, append_images,
+)
+from .layout import (
+    TIMESTAMP, DEFAULT_CHUNK_SIZE, DEFAULT_PIXEL_BLOCK,
+    imager_group_names, core_group,
+)
+
+__all__ = ['MATCHING_VARIABLES', 'check_compatible', 'merge_files']
+
+
+# Imager group variables that must be the same in all merged files
+MATCHING_VARIABLES = ('resolution', 'array_size', 'color_level')
+
+
+def check_compatible(imager: netCDF4.Group, other: netCDF4.Group) -> None:
+    """Check that the images of two imager groups can be merged
+
+    Raises:
+        ValueError: If the imager groups do not match.
+    """
+    for name in MATCHING_VARIABLES:
+        if name not in imager.variables or name not in other.variables:
+            raise ValueError(f'{other.path} - missing {name}')
+        if not np.array_equal(imager.variables[name][:],
+                              other.variables[name][:]):
+            raise ValueError(f'{other.path} - {name} does not match '
+                             f'{imager.filepath()}')
+
+    units = [getattr(core_group(g).variables[TIMESTAMP], 'units', None)
+             for g in (imager, other)]
+    if units[0] != units[1]:
+        raise ValueError(f'{other.path} - timestamp units {units[1]!r} do '
+                         f'not match {units[0]!r} of {imager.filepath()}')
+
+    # Variables copied with the images, eg of 'particle_stats', must be in
+    # every file so that they have an entry for every merged image
+    first, second = image_variables(imager), image_variables(other)
+    names = sorted(k for k in first.keys() | second.keys()
+                   if first.get(k) != second.get(k))
+    if names:
+        raise ValueError(f'{other.path} - per-image variables do not match '
+                         f'{imager.filepath()} ({", ".join(names)})')
+
+
+def merge_files(paths: Sequence[str], output: str,
+                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                max_pixels: int = DEFAULT_PIXEL_BLOCK) -> None:
+    """Concatenate the images of several SPIF files into a new file
+
+    Args:
+        paths: Files to merge, in order.
+        output: Name of the new file.
+        chunk_size: Approximate number of images read at once.
+        max_pixels: Largest number of pixels read at once.
+
+    Raises:
+        ValueError: If no files are given or the imager groups of the files
+            do not match.
+    """
+    if not paths:
+        raise ValueError(f'{output} - no files to merge')
+
+    # Imager groups in order of first appearance, checked before writing
+    names: dict[str, str] = {}
+    for path in paths:
+        with netCDF4.Dataset(path, 'r') as nc:
+            for name in imager_group_names(nc):
+                if name not in names:
+                    names[name] = path
+                    continue
+                with netCDF4.Dataset(names[name], 'r') as first:
+                    check_compatible(first[name], nc[name])
+
+    with netCDF4.Dataset(output, 'w') as out:
+        writers = {}
+        for i, path in enumerate(paths):
+            with netCDF4.Dataset(path, 'r') as nc:
+                if i == 0:
+                    copy_attributes(nc, out)
+                    copy_dimensions(nc, out)
+                    for var in nc.variables.values():
+                        copy_variable(var, out, True, chunk_size)
+                    for group in nc.groups.values():
+                        if group.name not in names:
+                            copy_group(group, out, True, chunk_size)
+                    out.imager_groups = ' '.join(names)
+
+                for name in imager_group_names(nc):
+                    if name not in writers:
+                        writers[name] = copy_imager(nc[name], out,
+                                                    chunk_size)
+                    append_images(writers[name], nc[name],
+                                  chunk_size=chunk_size,
+                                  max_pixels=max_pixels)
+
+        for writer in writers.values():
+            writer.close()
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == '__main__':
+
+    import argparse
+
+    parser = argparse.ArgumentParser(
+            description='Concatenate the images of several SPIF files.')
+    parser.add_argument('paths',
+                        nargs='+',
+                        help='Files to merge, in order.')
+    parser.add_argument('-o', '--output',
+                        dest='output',
+                        required=True,
+                        help='Name of the merged file.')
+
+    args = parser.parse_args()
+
+    merge_files(args.paths, args.output)
+    print(f'Merged {len(args.paths)} files into {args.output}')
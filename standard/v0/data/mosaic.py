@@ -0,0 +1,405 @@
+"""
+Quick-look PNG mosaics of the images of SPIF files.
+
+The images of an imager group are laid out as a tape, in order of arrival,
+with the slices of each image running left to right and the pixels across
+the array running top to bottom, as is usual for optical array probes. The
+tape is wrapped into bands of ``page_width`` slices, and the images of each
+time window are written as pages of up to ``bands`` bands, eg
+
+.. code-block:: python
+
+    files = write_mosaics('flight.nc', 'qa', window=10 * 10 ** 9)
+
+or, with a window given in seconds,
+
+.. code-block:: shell
+
+    ~/spif$ python -m standard.v0.data.mosaic flight.nc -o qa --window 10
+
+Pages are named ``<imager>_<window>_<first image>.png``, where the window is
+counted from the first image of the imager group. Pixel values are mapped to
+grey with ``color_level``, background (the first level) being white and the
+last level black, and images are separated by light grey gaps.
+
+Pages are planned from the index variables alone, streamed in chunks, and
+rendered in worker processes, several consecutive pages at a time, each
+batch from a single contiguous read of the pixels. A page is built with a
+few vectorized steps rather than image by image. PNG files are written with
+``zlib`` and ``struct`` only, so no imaging library is needed.
+"""
+
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Sequence
+
+import netCDF4  # type: ignore
+import numpy as np
+
+from .layout import (
+    TIMESTAMP, STARTPIXEL, WIDTH, HEIGHT, DEFAULT_CHUNK_SIZE,
+    core_group, array_dimensions, image_lengths, chunk_size_for,
+    iter_chunks, imager_group_names, raw,
+)
+from .packing import pixel_source
+
+__all__ = ['PAGE_WIDTH', 'BANDS', 'GAP', 'write_png', 'grey_levels',
+           'window_length', 'plan_pages', 'render_page', 'write_mosaics']
+
+# Number of slices across a page
+PAGE_WIDTH = 2000
+
+# Largest number of bands of a page, if the images of a window fill them
+BANDS = 16
+
+# Number of columns between images
+GAP = 2
+
+# Number of rows between bands
+BAND_GAP = 4
+
+# Grey of the gaps between images and bands
+FRAME = 224
+
+# Number of consecutive pages rendered from a single read of the pixels
+PAGES_PER_TASK = 4
+
+# zlib level of the pages, as compressing the pixels costs far more than
+# rendering them and quick-looks need not be small
+PNG_LEVEL = 1
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    """Return a PNG chunk with its length and checksum"""
+    return (struct.pack('>I', len(data)) + tag + data
+            + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff))
+
+
+def write_png(filename: str, grey: np.ndarray, level: int = 6) -> None:
+    """Write a greyscale image to a PNG file
+
+    Args:
+        filename: Name of the file to write.
+        grey: 8-bit grey values with shape ``(height, width)``.
+        level: zlib compression level.
+    """
+    grey = np.asarray(grey, dtype=np.uint8)
+    height, width = grey.shape
+
+    # Each row starts with its filter type, 0 for none
+    rows = np.zeros((height, width + 1), dtype=np.uint8)
+    rows[:, 1:] = grey
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)
+    with open(filename, 'wb') as f:
+        f.write(PNG_SIGNATURE)
+        f.write(_png_chunk(b'IHDR', header))
+        f.write(_png_chunk(b'IDAT', zlib.compress(rows.tobytes(), level)))
+        f.write(_png_chunk(b'IEND', b''))
+
+
+def grey_levels(color_level: Sequence[float]) -> np.ndarray:
+    """Return the grey of each pixel value, from white to black
+
+    The grey is scaled from the lower bound of each color level, so that the
+    first level is white and the last is black.
+    """
+    color_level = np.asarray(color_level, dtype=np.float64)
+    span = color_level.max() - color_level.min() if color_level.size else 0
+    if span > 0:
+        scaled = (color_level - color_level.min()) / span
+    else:
+        scaled = np.linspace(0, 1, max(len(color_level), 2))
+    return np.round(255 * (1 - scaled)).astype(np.uint8)
+
+
+def window_length(imager: netCDF4.Group, seconds: float) -> int:
+    """Return a time in seconds in the units of the ``timestamp`` variable"""
+    from cfunits import Units
+
+    units = core_group(imager).variables[TIMESTAMP].units
+    units = units.split(' since ')[0]
+    return max(1, int(round(float(Units.conform(seconds, Units('s'),
+                                                Units(units))))))
+
+
+def plan_pages(
+        imager: netCDF4.Group,
+        window: int,
+        capacity: int = PAGE_WIDTH * BANDS,
+        gap: int = GAP,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> list[tuple[int, slice]]:
+    """Split the images of an imager group into pages
+
+    A page holds consecutive images of one time window, starting a new page
+    when the columns of the window reach a multiple of ``capacity``. The
+    last image of a page may overrun it.
+
+    Args:
+        imager: The imager group.
+        window: Length of the time windows in the units of ``timestamp``.
+        capacity: Number of columns of a page, ie slices and gaps.
+        gap: Number of columns between images.
+        chunk_size: Approximate number of images read at once.
+
+    Returns:
+        The window number and range of images of each page, in order.
+    """
+    core = core_group(imager)
+    timestamp = raw(core.variables[TIMESTAMP])
+    height = raw(core.variables[HEIGHT])
+    n_images = timestamp.shape[0]
+
+    pages: list[tuple[int, slice]] = []
+    if not n_images:
+        return pages
+
+    origin = int(timestamp[0])
+    key = None      # window and page of the open page
+    first = 0       # first image of the open page
+    used = 0        # columns of the window before the next image
+
+    for chunk in iter_chunks(n_images, chunk_size_for(timestamp, chunk_size)):
+        windows = (timestamp[chunk].astype(np.int64) - origin) // window
+        columns = height[chunk].astype(np.int64) + gap
+        before = np.cumsum(columns) - columns
+
+        # Restart the count of columns at the first image of each window
+        previous = np.empty_like(windows)
+        previous[1:] = windows[:-1]
+        previous[0] = key[0] if key is not None else windows[0] - 1
+        starts = windows != previous
+        segment = np.maximum.accumulate(
+            np.where(starts, np.arange(len(windows)), 0)
+        )
+        offset = before - before[segment]
+        if not starts[0]:
+            offset[np.cumsum(starts) == 0] += used
+        page = offset // capacity
+
+        previous_page = np.empty_like(page)
+        previous_page[1:] = page[:-1]
+        previous_page[0] = key[1] if key is not None else -1
+        for i in np.flatnonzero(starts | (page != previous_page)).tolist():
+            if key is not None:
+                pages.append((key[0], slice(first, chunk.start + i)))
+            key = (int(windows[i]), int(page[i]))
+            first = chunk.start + i
+
+        key = (int(windows[-1]), int(page[-1]))
+        used = int(offset[-1] + columns[-1])
+
+    pages.append((key[0], slice(first, n_images)))
+    return pages
+
+
+def render_page(pixels: np.ndarray,
+                startpixel: np.ndarray,
+                width: np.ndarray,
+                height: np.ndarray,
+                n_dims: int,
+                levels: np.ndarray,
+                page_width: int = PAGE_WIDTH,
+                gap: int = GAP) -> np.ndarray:
+    """Return the grey values of a page of consecutive images
+
+    Args:
+        pixels: The pixels of the images, starting at the first pixel of the
+            first image.
+        startpixel: The first pixel of each image.
+        width: The width of each image.
+        height: The height of each image.
+        n_dims: Size of the 'array_dimensions' dimension.
+        levels: The grey of each pixel value, see ``grey_levels``.
+        page_width: Number of columns of each band.
+        gap: Number of columns between images.
+
+    Returns:
+        8-bit grey values with shape ``(height, page_width)``.
+    """
+    starts = np.asarray(startpixel, dtype=np.int64)
+    starts = starts - starts[0]
+    row_len = np.asarray(width, dtype=np.int64) * n_dims
+    height = np.asarray(height, dtype=np.int64)
+    lengths = row_len * height
+    n, rows, total = len(starts), int(row_len.max()), int(height.sum())
+
+    # Column of each slice on the tape, leaving gaps between images
+    columns = np.arange(total) + np.repeat(np.arange(n) * gap, height)
+    tape = np.full((rows, total + n * gap), FRAME, dtype=np.uint8)
+
+    contiguous = np.array_equal(starts[1:], np.cumsum(lengths[:-1]))
+    if contiguous and bool((row_len == rows).all()):
+        # The slices of all the images form one (slices, rows) array
+        slices = np.take(levels, pixels[:total * rows], mode='clip')
+        tape[:, columns] = slices.reshape(total, rows).T
+    else:
+        # Scatter every pixel to its row and column, over a background that
+        # pads images narrower than the widest
+        tape[:, columns] = levels[0]
+        image = np.repeat(np.arange(n), lengths)
+        offset = (np.arange(lengths.sum())
+                  - np.repeat(np.cumsum(lengths) - lengths, lengths))
+        sl, across = np.divmod(offset, np.repeat(row_len, lengths))
+        first_slice = np.cumsum(height) - height
+        tape[across, columns[first_slice[image] + sl]] = np.take(
+            levels, pixels[starts[image] + offset], mode='clip'
+        )
+
+    n_bands = max(1, -(-tape.shape[1] // page_width))
+    padded = np.full((rows, n_bands * page_width), FRAME, dtype=np.uint8)
+    padded[:, :tape.shape[1]] = tape
+
+    page = np.full((n_bands, rows + BAND_GAP, page_width), FRAME,
+                   dtype=np.uint8)
+    page[:, :rows] = padded.reshape(rows, n_bands,
+                                    page_width).transpose(1, 0, 2)
+    return page.reshape(-1, page_width)
+
+
+def _render_pages(path: str, name: str, pages: list[tuple[int, slice]],
+                  output_dir: str, page_width: int, gap: int) -> list[str]:
+    """Render consecutive pages of an imager group from one read"""
+    files = []
+    with netCDF4.Dataset(path, 'r') as nc:
+        imager = nc.groups[name]
+        core = core_group(imager)
+        n_dims = array_dimensions(imager)
+        levels = grey_levels(raw(imager.variables['color_level'])[:])
+
+        first, stop = pages[0][1].start, pages[-1][1].stop
+        startpixel = raw(core.variables[STARTPIXEL])[first:stop]
+        startpixel = startpixel.astype(np.uint64)
+        width = raw(core.variables[WIDTH])[first:stop]
+        height = raw(core.variables[HEIGHT])[first:stop]
+        lengths = image_lengths(width, height, n_dims)
+
+        base = int(startpixel[0])
+        pixels = pixel_source(core)[base:int((startpixel + lengths).max())]
+
+        for window, images in pages:
+            block = slice(images.start - first, images.stop - first)
+            offset = int(startpixel[block.start]) - base
+            grey = render_page(pixels[offset:], startpixel[block],
+                               width[block], height[block], n_dims, levels,
+                               page_width, gap)
+            filename = os.path.join(
+                output_dir, f'{name}_{window:06d}_{images.start:010d}.png'
+            )
+            write_png(filename, grey, PNG_LEVEL)
+            files.append(filename)
+    return files
+
+
+def write_mosaics(path: str,
+                  output_dir: str,
+                  window: Optional[int] = None,
+                  page_width: int = PAGE_WIDTH,
+                  bands: int = BANDS,
+                  gap: int = GAP,
+                  max_workers: Optional[int] = None,
+                  names: Optional[list[str]] = None) -> list[str]:
+    """Write PNG mosaic pages of the images of a file
+
+    Args:
+        path: Name of the SPIF file.
+        output_dir: Directory the pages are written to, created if needed.
+        window: Length of the time windows in the units of ``timestamp``.
+            Default is a single window, ie pages only break when full.
+        page_width: Number of columns of each band.
+        bands: Largest number of bands of a page.
+        gap: Number of columns between images.
+        max_workers: Largest number of worker processes. Default is the
+            number of CPUs. With 1 pages are rendered in this process.
+        names: Names of the imager groups. Default is those given in
+            ``imager_groups``.
+
+    Returns:
+        The names of the files written, in order.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    if window is None:
+        window = np.iinfo(np.int64).max
+
+    tasks = []
+    with netCDF4.Dataset(path, 'r') as nc:
+        if names is None:
+            names = imager_group_names(nc)
+        for name in names:
+            pages = plan_pages(nc.groups[name], window, page_width * bands,
+                               gap)
+            tasks.extend((name, pages[i:i + PAGES_PER_TASK])
+                         for i in range(0, len(pages), PAGES_PER_TASK))
+
+    args = (output_dir, page_width, gap)
+    if max_workers == 1 or len(tasks) <= 1:
+        results = [_render_pages(path, name, pages, *args)
+                   for name, pages in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_render_pages, path, name, pages, *args)
+                       for name, pages in tasks]
+            results = [future.result() for future in futures]
+    return [filename for files in results for filename in files]
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == '__main__':
+
+    import argparse
+
+    parser = argparse.ArgumentParser(
+            description='Write quick-look PNG mosaics of SPIF images.')
+    parser.add_argument('path',
+                        help='SPIF file to render.')
+    parser.add_argument('-o', '--output',
+                        dest='output_dir',
+                        required=True,
+                        help='Directory the pages are written to.')
+    parser.add_argument('--window',
+                        dest='window',
+                        type=float,
+                        default=None,
+                        help=('Length of the time window of each page in '
+                              'seconds. Default is to fill every page.'))
+    parser.add_argument('--page-width',
+                        dest='page_width',
+                        type=int,
+                        default=PAGE_WIDTH,
+                        help=f'Number of slices across a page. Default is '
+                             f'{PAGE_WIDTH}.')
+    parser.add_argument('--bands',
+                        dest='bands',
+                        type=int,
+                        default=BANDS,
+                        help=f'Largest number of bands of a page. Default is '
+                             f'{BANDS}.')
+    parser.add_argument('-j', '--jobs',
+                        dest='max_workers',
+                        type=int,
+                        default=None,
+                        help=('Number of worker processes. Default is the '
+                              'number of CPUs.'))
+
+    args = parser.parse_args()
+
+    window = None
+    if args.window is not None:
+        with netCDF4.Dataset(args.path, 'r') as nc:
+            lengths = {window_length(nc.groups[name], args.window)
+                       for name in imager_group_names(nc)}
+        if len(lengths) > 1:
+            parser.error('imager groups have different timestamp units')
+        window = lengths.pop() if lengths else None
+
+    files = write_mosaics(args.path, args.output_dir, window,
+                          args.page_width, args.bands,
+                          max_workers=args.max_workers)
+    print(f'Wrote {len(files)} pages to {args.output_dir}')
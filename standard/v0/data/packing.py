@@ -0,0 +1,185 @@
+"""
+Compact encodings of binary (two color) image data.
+
+For imagers with ``pixel_colors == 2`` every pixel is 0 or 1, so storing one
+pixel per ``uint8`` wastes 7 bits of every byte. The pixels may instead be
+held in an ``image_packed`` variable in the 'core' group, on its own
+unlimited ``packed_pixel`` dimension, leaving ``image`` empty. Its
+attributes are;
+
+    :encoding: "bitpack", 8 pixels per ``uint8`` byte with the first pixel in
+        the most significant bit, or "rle", ``uint`` lengths of alternating
+        runs of 0 and 1 pixels starting with a (possibly empty) run of 0.
+    :unpacked_length: The number of pixels encoded, ie the length that
+        ``image`` would have, and so the extent of ``startpixel``.
+
+The encoders and decoders here are vectorized and losslessly round-trip to
+the flat ``uint8`` layout. ``pixel_source`` returns an object that reads
+unpacked pixels from a core group whichever way they are stored. Reads of
+run lengths are located with the number of pixels at the end of each HDF5
+chunk of runs, so only the chunks covering a read are decoded.
+"""
+
+from typing import Optional, Union
+
+import netCDF4  # type: ignore
+import numpy as np
+
+from .layout import IMAGE, iter_chunks, raw
+
+__all__ = ['PACKED_IMAGE', 'PACKED_PIXEL_DIM', 'ENCODINGS',
+           'pack_bits', 'unpack_bits', 'encode_rle', 'decode_rle',
+           'PackedPixels', 'pixel_source', 'pixel_count']
+
+PACKED_IMAGE = 'image_packed'
+PACKED_PIXEL_DIM = 'packed_pixel'
+ENCODINGS = ('bitpack', 'rle')
+
+RUN_TYPE = np.uint32
+
+# Runs indexed together when the run lengths are not chunked
+RUN_BLOCK = 2 ** 17
+
+
+def _binary(pixels: np.ndarray) -> np.ndarray:
+    pixels = np.asarray(pixels)
+    if pixels.size and pixels.max() > 1:
+        raise ValueError('Only binary (0 or 1) pixels can be packed')
+    return pixels
+
+
+def pack_bits(pixels: np.ndarray) -> np.ndarray:
+    """Pack binary pixels 8 to a byte, padding the last byte with 0"""
+    return np.packbits(_binary(pixels).astype(bool))
+
+
+def unpack_bits(packed: np.ndarray, count: int, offset: int = 0) -> np.ndarray:
+    """Unpack ``count`` pixels starting ``offset`` pixels into ``packed``"""
+    bits = np.unpackbits(np.asarray(packed, dtype=np.uint8),
+                         count=offset + count)
+    return bits[offset:]
+
+
+def encode_rle(pixels: np.ndarray) -> np.ndarray:
+    """Return the run lengths of binary pixels, starting with a run of 0"""
+    pixels = _binary(pixels)
+    if not pixels.size:
+        return np.zeros(0, dtype=RUN_TYPE)
+    bounds = np.concatenate(([0], np.flatnonzero(pixels[1:] != pixels[:-1]) + 1,
+                             [pixels.size]))
+    runs = np.diff(bounds)
+    if pixels[0]:
+        runs = np.concatenate(([0], runs))
+    if runs.max() > np.iinfo(RUN_TYPE).max:
+        raise ValueError('Run too long to be encoded')
+    return runs.astype(RUN_TYPE)
+
+
+def decode_rle(runs: np.ndarray) -> np.ndarray:
+    """Return the binary pixels of alternating run lengths"""
+    values = np.arange(len(runs), dtype=np.uint8) & 1
+    return np.repeat(values, np.asarray(runs, dtype=np.int64))
+
+
+class PackedPixels:
+    """Unpacked read access to the ``image_packed`` variable of a core group
+
+    Supports slicing with a step of 1, like a netCDF4 variable.
+    """
+
+    def __init__(self, var: netCDF4.Variable) -> None:
+        self.var = raw(var)
+        self.encoding = var.getncattr('encoding')
+        if self.encoding not in ENCODINGS:
+            raise ValueError(f'{var.name} - unknown encoding {self.encoding}')
+        self.size = int(var.getncattr('unpacked_length'))
+        self.shape = (self.size,)
+        self.dtype = np.dtype(np.uint8)
+
+        chunking = self.var.chunking()
+        self._block = (RUN_BLOCK if chunking in (None, 'contiguous')
+                       or not chunking else int(chunking[0]))
+        self._block_ends: Optional[np.ndarray] = None
+        self._decoded: Optional[tuple[int, int, np.ndarray]] = None
+
+    def chunking(self):
+        """Return the chunking of the variable in unpacked pixels"""
+        chunking = self.var.chunking()
+        if chunking in (None, 'contiguous') or not chunking:
+            return chunking
+        if self.encoding == 'bitpack':
+            return [int(chunking[0]) * 8]
+        return 'contiguous'
+
+    @property
+    def block_ends(self) -> np.ndarray:
+        """Number of pixels encoded by the end of each block of runs
+
+        The blocks are the HDF5 chunks of a run-length encoding. This is
+        read once, a block at a time, and holds one value per block.
+        """
+        if self._block_ends is None:
+            n_runs = self.var.shape[0]
+            ends = np.zeros(-(-n_runs // self._block), dtype=np.uint64)
+            total = 0
+            for i, chunk in enumerate(iter_chunks(n_runs, self._block)):
+                total += int(self.var[chunk].sum(dtype=np.uint64))
+                ends[i] = total
+            self._block_ends = ends
+        return self._block_ends
+
+    def _run_ends(self, first: int, last: int) -> np.ndarray:
+        """Return the cumulative run lengths of blocks ``first`` to ``last``
+
+        The blocks decoded last are kept, as consecutive reads are often of
+        the same blocks.
+        """
+        if self._decoded is not None and self._decoded[:2] == (first, last):
+            return self._decoded[2]
+        base = self.block_ends[first - 1] if first else np.uint64(0)
+        runs = self.var[first * self._block:(last + 1) * self._block]
+        ends = np.cumsum(runs, dtype=np.uint64) + base
+        self._decoded = (first, last, ends)
+        return ends
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, key: slice) -> np.ndarray:
+        start, stop, step = key.indices(self.size)
+        if step != 1:
+            raise IndexError('Only slices with a step of 1 are supported')
+        count = max(0, stop - start)
+        if not count:
+            return np.zeros(0, dtype=np.uint8)
+
+        if self.encoding == 'bitpack':
+            packed = self.var[start // 8:(stop + 7) // 8]
+            return unpack_bits(packed, count, start % 8)
+
+        # Find the blocks of runs covering the range, then the runs within
+        # them, and clip the runs to the range
+        blocks = self.block_ends
+        first_block = int(np.searchsorted(blocks, start, side='right'))
+        last_block = min(int(np.searchsorted(blocks, stop - 1, side='right')),
+                         max(0, len(blocks) - 1))
+        ends = self._run_ends(first_block, last_block)
+        first = int(np.searchsorted(ends, start, side='right'))
+        last = int(np.searchsorted(ends, stop - 1, side='right'))
+        runs = np.diff(np.concatenate(([start], ends[first:last].astype(np.int64),
+                                       [stop])))
+        offset = first_block * self._block
+        values = (np.arange(offset + first, offset + last + 1) & 1)
+        return np.repeat(values.astype(np.uint8), runs)
+
+
+def pixel_source(core: netCDF4.Group) -> Union[netCDF4.Variable, PackedPixels]:
+    """Return the unpacked pixels of a core group, packed or not"""
+    if PACKED_IMAGE in core.variables:
+        return PackedPixels(core.variables[PACKED_IMAGE])
+    return raw(core.variables[IMAGE])
+
+
+def pixel_count(core: netCDF4.Group) -> int:
+    """Return the number of pixels of a core group, packed or not"""
+    return pixel_source(core).shape[0]
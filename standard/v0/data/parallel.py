@@ -0,0 +1,91 @@
+"""
+Concurrent processing of the imager groups of a SPIF file.
+
+The imager groups listed in ``imager_groups`` hold data from independent
+instruments and share nothing but the file, so data-level passes over them
+can run side by side. ``map_imagers`` calls a function on each imager group
+in its own worker process, each opening the file read-only, and collects
+the results in the order of ``imager_groups``, eg
+
+.. code-block:: python
+
+    errors = map_imagers('flight.nc', check_core_data)
+
+The HDF5 library is not safe to use from several threads at once, so
+processes are used rather than threads. The function, its arguments, and
+its result must be picklable, ie the function must be defined at module
+level.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+import netCDF4  # type: ignore
+
+from .layout import imager_group_names
+
+__all__ = ['map_imagers']
+
+
+def _call(path: str, name: str, func: Callable, args: tuple,
+          kwargs: dict) -> Any:
+    """Open a file and call a function on one of its imager groups"""
+    with netCDF4.Dataset(path, 'r') as nc:
+        try:
+            imager = nc.groups[name]
+        except KeyError:
+            raise ValueError(f'{name} - imager group not found')
+        return func(imager, *args, **kwargs)
+
+
+def map_imagers(path: str,
+                func: Callable,
+                *args: Any,
+                max_workers: Optional[int] = None,
+                names: Optional[list[str]] = None,
+                **kwargs: Any) -> dict[str, Any]:
+    """Call a function on each imager group of a file concurrently
+
+    Args:
+        path: Name of the SPIF file.
+        func: Function called as ``func(imager, *args, **kwargs)`` with each
+            open imager group.
+        *args: Further positional arguments of ``func``.
+        max_workers: Largest number of worker processes. Default is one per
+            imager group. With 1, or a single imager group, ``func`` is
+            called in this process.
+        names: Names of the imager groups. Default is those given in
+            ``imager_groups``.
+        **kwargs: Keyword arguments of ``func``.
+
+    Returns:
+        The result of each imager group, or the exception it raised, keyed
+        by imager group name in the order of ``names``.
+    """
+    if names is None:
+        with netCDF4.Dataset(path, 'r') as nc:
+            names = imager_group_names(nc)
+
+    results: dict[str, Any] = {}
+    if not names:
+        return results
+
+    if max_workers is None:
+        max_workers = len(names)
+    max_workers = min(max_workers, len(names))
+
+    if max_workers <= 1:
+        for name in names:
+            try:
+                results[name] = _call(path, name, func, args, kwargs)
+            except Exception as err:
+                results[name] = err
+        return results
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {name: pool.submit(_call, path, name, func, args, kwargs)
+                   for name in names}
+        for name, future in futures.items():
+            err = future.exception()
+            results[name] = err if err is not None else future.result()
+    return results
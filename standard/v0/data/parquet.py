@@ -0,0 +1,241 @@
+"""
+Export of the per-image table of each imager group to Parquet.
+
+The variables of the 'core' group on ``image_num`` form a table with one
+row per image, which columnar tools query far faster as Parquet than through
+netCDF. Each imager group is written to its own file, ``<imager>.parquet``,
+with the columns
+
+    :timestamp: Arrival time of the image, in the units of ``timestamp``.
+    :startpixel: Index of the first pixel of the image in ``image``.
+    :width: Number of pixels across the image.
+    :height: Number of slices of the image.
+    :overload: Imager overload flag of the image.
+
+eg
+
+.. code-block:: python
+
+    files = write_parquet('flight.nc', 'tables')
+
+or, with the imager groups exported in parallel processes,
+
+.. code-block:: shell
+
+    ~/spif$ python -m standard.v0.data.parquet flight.nc -o tables
+
+The columns keep the datatypes of the variables, and their attributes, eg
+the ``timestamp`` units, are kept as field metadata. The schema metadata
+holds the name of the imager group and the source file as plain strings,
+then the attributes of the imager group, eg ``instrument_name``, and its
+variables, eg ``resolution`` and ``color_level``. Attribute and variable
+values are all given as JSON.
+
+The variables are read in chunks aligned to their HDF5 chunks and each chunk
+is written as a row group. The numpy arrays read are wrapped as Arrow arrays
+without copying, so memory use is bounded by the chunk size.
+
+Requires ``pyarrow``, which is only imported when this module is used.
+"""
+
+import json
+import os
+from typing import Any, Iterator, Optional
+
+import netCDF4  # type: ignore
+import numpy as np
+import pyarrow as pa  # type: ignore
+import pyarrow.parquet as pq  # type: ignore
+
+from .header import _attributes
+from .layout import (
+    TIMESTAMP, STARTPIXEL, WIDTH, HEIGHT, OVERLOAD, DEFAULT_CHUNK_SIZE,
+    core_group, chunk_size_for, iter_chunks, raw,
+)
+from .parallel import map_imagers
+
+__all__ = ['CORE_COLUMNS', 'to_arrow', 'imager_metadata', 'core_schema',
+           'iter_core_batches', 'write_imager_parquet', 'write_parquet']
+
+# Variables of the core group written as columns, in order
+CORE_COLUMNS = (TIMESTAMP, STARTPIXEL, WIDTH, HEIGHT, OVERLOAD)
+
+
+def _json(value: Any) -> bytes:
+    """Return a value, including numpy values, as JSON"""
+    if isinstance(value, (np.ndarray, np.generic)):
+        value = value.tolist()
+    return json.dumps(value).encode('utf-8')
+
+
+def to_arrow(values: np.ndarray) -> pa.Array:
+    """Wrap a 1-D numpy array as an Arrow array without copying
+
+    The array is only copied if it is not contiguous or not in the native
+    byte order, which Arrow requires.
+    """
+    values = np.ascontiguousarray(values)
+    values = values.astype(values.dtype.newbyteorder('='), copy=False)
+    return pa.Array.from_buffers(pa.from_numpy_dtype(values.dtype),
+                                 len(values), [None, pa.py_buffer(values)])
+
+
+def imager_metadata(imager: netCDF4.Group) -> dict[bytes, bytes]:
+    """Return the schema metadata of the table of an imager group
+
+    The metadata holds the group name and source file, then the attributes
+    and variables of the imager group, keyed by name.
+    """
+    metadata = {
+        b'imager_group': imager.name.encode('utf-8'),
+        b'source': os.path.basename(imager.filepath()).encode('utf-8'),
+    }
+    for name, value in _attributes(imager).items():
+        metadata[name.encode('utf-8')] = _json(value)
+    for name, var in imager.variables.items():
+        metadata[name.encode('utf-8')] = _json(raw(var)[...])
+        units = getattr(var, 'units', None)
+        if units is not None:
+            metadata[f'{name}_units'.encode('utf-8')] = _json(units)
+    return metadata
+
+
+def core_schema(imager: netCDF4.Group) -> pa.Schema:
+    """Return the Arrow schema of the table of an imager group"""
+    core = core_group(imager)
+    fields = []
+    for name in CORE_COLUMNS:
+        var = core.variables[name]
+        metadata = {k.encode('utf-8'): _json(v)
+                    for k, v in _attributes(var).items()}
+        dtype = np.dtype(var.dtype).newbyteorder('=')
+        fields.append(pa.field(name, pa.from_numpy_dtype(dtype),
+                               nullable=False, metadata=metadata or None))
+    return pa.schema(fields, metadata=imager_metadata(imager))
+
+
+def iter_core_batches(
+        imager: netCDF4.Group,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        schema: Optional[pa.Schema] = None,
+) -> Iterator[pa.RecordBatch]:
+    """Read the table of an imager group in record batches
+
+    Args:
+        imager: The imager group.
+        chunk_size: Approximate number of rows of each batch, aligned to the
+            chunking of ``startpixel``.
+        schema: Schema of the batches. Default is ``core_schema(imager)``.
+
+    Yields:
+        Consecutive record batches of the table.
+    """
+    if schema is None:
+        schema = core_schema(imager)
+    core = core_group(imager)
+    variables = [raw(core.variables[name]) for name in CORE_COLUMNS]
+    n_images = variables[0].shape[0]
+    step = chunk_size_for(core.variables[STARTPIXEL], chunk_size)
+
+    for chunk in iter_chunks(n_images, step):
+        yield pa.RecordBatch.from_arrays(
+            [to_arrow(var[chunk]) for var in variables], schema=schema
+        )
+
+
+def write_imager_parquet(imager: netCDF4.Group,
+                         output_dir: str,
+                         chunk_size: int = DEFAULT_CHUNK_SIZE,
+                         compression: str = 'zstd') -> str:
+    """Write the table of an imager group to a Parquet file
+
+    Args:
+        imager: The imager group.
+        output_dir: Directory of the file, which is named after the group.
+        chunk_size: Approximate number of rows of each row group.
+        compression: Parquet compression codec.
+
+    Returns:
+        The name of the file written.
+    """
+    filename = os.path.join(output_dir, f'{imager.name}.parquet')
+    schema = core_schema(imager)
+    with pq.ParquetWriter(filename, schema,
+                          compression=compression) as writer:
+        for batch in iter_core_batches(imager, chunk_size, schema):
+            writer.write_batch(batch)
+    return filename
+
+
+def write_parquet(path: str,
+                  output_dir: str,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  compression: str = 'zstd',
+                  max_workers: Optional[int] = None,
+                  names: Optional[list[str]] = None) -> dict[str, Any]:
+    """Write the table of each imager group of a file to a Parquet file
+
+    Args:
+        path: Name of the SPIF file.
+        output_dir: Directory the files are written to, created if needed.
+        chunk_size: Approximate number of rows of each row group.
+        compression: Parquet compression codec.
+        max_workers: Largest number of worker processes, see
+            ``map_imagers``.
+        names: Names of the imager groups. Default is those given in
+            ``imager_groups``.
+
+    Returns:
+        The name of the file written for each imager group, or the exception
+        raised, keyed by imager group name.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    return map_imagers(path, write_imager_parquet, output_dir, chunk_size,
+                       compression, max_workers=max_workers, names=names)
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == '__main__':
+
+    import argparse
+
+    parser = argparse.ArgumentParser(
+            description=('Export the per-image table of each imager group '
+                         'of SPIF files to Parquet.'))
+    parser.add_argument('paths',
+                        nargs='+',
+                        help='Files to export.')
+    parser.add_argument('-o', '--output',
+                        dest='output_dir',
+                        required=True,
+                        help=('Directory the files are written to, in a '
+                              'sub-directory named after each SPIF file if '
+                              'more than one is given.'))
+    parser.add_argument('--compression',
+                        dest='compression',
+                        default='zstd',
+                        help='Parquet compression codec. Default is zstd.')
+    parser.add_argument('-j', '--jobs',
+                        dest='max_workers',
+                        type=int,
+                        default=None,
+                        help=('Number of worker processes exporting the '
+                              'imager groups of a file. Default is one per '
+                              'imager group.'))
+
+    args = parser.parse_args()
+
+    for path in args.paths:
+        output_dir = args.output_dir
+        if len(args.paths) > 1:
+            stem = os.path.splitext(os.path.basename(path))[0]
+            output_dir = os.path.join(output_dir, stem)
+        results = write_parquet(path, output_dir,
+                                compression=args.compression,
+                                max_workers=args.max_workers)
+        for name, result in results.items():
+            if isinstance(result, Exception):
+                print(f'{path}: {name} failed ({result})')
+            else:
+                print(f'{path}: {name} -> {result}')
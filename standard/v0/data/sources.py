@@ -0,0 +1,73 @@
+"""
+Hashes of the source files of the standard.
+
+Results derived from the standard, eg cached compliance check results or the
+released product files, are only valid for the sources they were created
+from. ``tree_hash`` combines the relative path and content of every source
+file below a directory, so that any edit, addition, or removal of a file
+changes it, eg
+
+.. code-block:: python
+
+    key = tree_hash('standard/v0')
+
+Hidden files and directories, and ``__pycache__``, are ignored.
+"""
+
+import hashlib
+import os
+from typing import Optional
+
+__all__ = ['SOURCE_SUFFIXES', 'file_hash', 'walk', 'tree_hash']
+
+# Suffixes of the source files of the standard, including its definitions
+SOURCE_SUFFIXES = ('.py', '.yaml', '.yml', '.json')
+
+
+def file_hash(filename: str) -> str:
+    """Return the hex sha256 digest of the content of a file"""
+    h = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def walk(path: str, suffixes: Optional[tuple[str, ...]] = None) -> list[str]:
+    """Return the sorted files below a path, ignoring hidden and cache files
+
+    Args:
+        path: The directory to search.
+        suffixes: Only return files with one of these suffixes. Default is
+            all files.
+    """
+    files = []
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames[:] = [d for d in dirnames
+                       if not d.startswith('.') and d != '__pycache__']
+        files.extend(os.path.join(dirpath, f) for f in filenames
+                     if not f.startswith('.')
+                     and (suffixes is None or f.endswith(suffixes)))
+    return sorted(files)
+
+
+def tree_hash(path: str,
+              suffixes: Optional[tuple[str, ...]] = SOURCE_SUFFIXES,
+              prefix: str = '') -> str:
+    """Return a hash of the names and content of the files below a path
+
+    Args:
+        path: The directory to hash, eg 'standard/v0'.
+        suffixes: Only hash files with one of these suffixes. Default is
+            ``SOURCE_SUFFIXES``, all files if ``None``.
+        prefix: Text hashed before the files, eg a version number.
+
+    Returns:
+        The hex sha256 digest.
+    """
+    h = hashlib.sha256()
+    h.update(prefix.encode('utf-8'))
+    for filename in walk(path, suffixes):
+        h.update(os.path.relpath(filename, path).encode('utf-8'))
+        h.update(file_hash(filename).encode('utf-8'))
+    return h.hexdigest()
@@ -0,0 +1,331 @@
+"""
+Per-image particle statistics.
+
+Most uses of SPIF data start by reducing each image to a few numbers. The
+functions here compute them once, for every image of an imager group;
+
+    :shaded_pixels: The number of pixels that are not background (color 0).
+    :x_extent: The number of pixels across the shaded region.
+    :y_extent: The number of slices/lines of the shaded region.
+    :max_dimension: The larger of the extents scaled by ``resolution``.
+    :edge_touch: Flags of images with shaded pixels in their first (1) or
+        last (2) pixel across.
+
+Images are taken to be laid out as ``(height, width * array_dimensions)``,
+as returned by ``ImageReader``. The statistics are computed with segment
+reductions over the shaded pixels of blocks of images, so there is no
+per-image Python loop, and the pixels are streamed so memory use is bounded.
+They may be written to an optional 'particle_stats' group of the imager
+group, which is validated by the ``ParticleStatsGroup`` model, eg
+
+.. code-block:: python
+
+    with netCDF4.Dataset('flight.nc', 'a') as nc:
+        for name in imager_group_names(nc):
+            write_particle_stats(nc[name])
+
+or, with the imager groups computed in parallel processes,
+
+.. code-block:: shell
+
+    ~/spif$ python -m standard.v0.data.stats flight.nc
+
+Each process writes the statistics of its imager group to a scratch file as
+they are computed, and these are then copied into the file one at a time, so
+memory use stays bounded.
+"""
+
+import os
+import tempfile
+from typing import Any, Iterator, Mapping, Optional, Sequence
+
+import netCDF4  # type: ignore
+import numpy as np
+
+from .layout import (
+    IMAGE_NUM_DIM, STARTPIXEL, WIDTH, HEIGHT, DEFAULT_CHUNK_SIZE,
+    DEFAULT_PIXEL_BLOCK, core_group, array_dimensions, image_lengths,
+    chunk_size_for, iter_chunks, pixel_blocks, raw,
+)
+from .packing import pixel_source
+from .parallel import map_imagers
+
+__all__ = ['STATS_GROUP', 'STATS_TYPES', 'EDGE_FIRST', 'EDGE_LAST',
+           'image_stats', 'iter_particle_stats', 'particle_stats',
+           'write_particle_stats']
+
+STATS_GROUP = 'particle_stats'
+
+# Datatypes of the statistics
+STATS_TYPES = {
+    'shaded_pixels': np.uint32,
+    'x_extent': np.uint16,
+    'y_extent': np.uint16,
+    'max_dimension': np.float32,
+    'edge_touch': np.int8,
+}
+
+# Flags of 'edge_touch'
+EDGE_FIRST = 1
+EDGE_LAST = 2
+
+
+def image_stats(pixels: np.ndarray,
+                startpixel: np.ndarray,
+                width: np.ndarray,
+                height: np.ndarray,
+                n_dims: int = 1,
+                resolution: Sequence[float] = (1.,)) -> dict[str, np.ndarray]:
+    """Return the statistics of a contiguous block of images
+
+    Args:
+        pixels: The pixels of the images, starting at the first pixel of the
+            first image.
+        startpixel: The first pixel of each image.
+        width: The width of each image.
+        height: The height of each image.
+        n_dims: Size of the 'array_dimensions' dimension.
+        resolution: Resolution of each array dimension. The first is used
+            across the images and the last along them.
+
+    Returns:
+        An array of each statistic, keyed by name.
+    """
+    n = len(startpixel)
+    starts = np.asarray(startpixel, dtype=np.int64)
+    if n:
+        starts = starts - starts[0]
+    row_len = np.asarray(width, dtype=np.int64) * n_dims
+
+    # Only shaded pixels matter, so find the image, row, and column of each
+    shaded = np.flatnonzero(pixels)
+    image = np.searchsorted(starts, shaded, side='right') - 1
+    row, col = np.divmod(shaded - starts[image], row_len[image])
+
+    count = np.bincount(image, minlength=n)
+    x_min = np.zeros(n, dtype=np.int64)
+    x_max = np.full(n, -1, dtype=np.int64)
+    y_extent = np.zeros(n, dtype=np.int64)
+    if shaded.size:
+        # Shaded pixels are in image order, so each image is one segment
+        first = np.flatnonzero(np.diff(image, prepend=-1))
+        last = np.append(first[1:], len(image)) - 1
+        which = image[first]
+        x_min[which] = np.minimum.reduceat(col, first)
+        x_max[which] = np.maximum.reduceat(col, first)
+        y_extent[which] = row[last] - row[first] + 1
+    x_extent = x_max - x_min + 1
+
+    touched = count > 0
+    edge_touch = (EDGE_FIRST * (touched & (x_min == 0))
+                  | EDGE_LAST * (touched & (x_max == row_len - 1)))
+    max_dimension = np.maximum(x_extent * resolution[0],
+                               y_extent * resolution[-1])
+
+    stats = {
+        'shaded_pixels': count,
+        'x_extent': x_extent,
+        'y_extent': y_extent,
+        'max_dimension': max_dimension,
+        'edge_touch': edge_touch,
+    }
+    return {k: v.astype(STATS_TYPES[k]) for k, v in stats.items()}
+
+
+def iter_particle_stats(
+        imager: netCDF4.Group,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_pixels: int = DEFAULT_PIXEL_BLOCK,
+) -> Iterator[tuple[slice, dict[str, np.ndarray]]]:
+    """Compute the statistics of the images of an imager group in blocks
+
+    Args:
+        imager: The imager group.
+        chunk_size: Approximate number of images whose index variables are
+            read at once. This is aligned to the chunking of ``startpixel``.
+        max_pixels: Largest number of pixels read at once.
+
+    Yields:
+        The ``image_num`` slice of a block and its statistics.
+    """
+    core = core_group(imager)
+    n_dims = array_dimensions(imager)
+    resolution = np.atleast_1d(raw(imager.variables['resolution'])[:])
+    resolution = resolution.astype(np.float64)
+
+    image = pixel_source(core)
+    startpixel = raw(core.variables[STARTPIXEL])
+    width = raw(core.variables[WIDTH])
+    height = raw(core.variables[HEIGHT])
+    n_images = startpixel.shape[0]
+
+    for chunk in iter_chunks(n_images, chunk_size_for(startpixel, chunk_size)):
+        starts = startpixel[chunk].astype(np.uint64)
+        widths = width[chunk]
+        heights = height[chunk]
+        lengths = image_lengths(widths, heights, n_dims)
+
+        for block in pixel_blocks(lengths, max_pixels):
+            first = int(starts[block.start])
+            last = int(starts[block.stop - 1] + lengths[block.stop - 1])
+            stats = image_stats(image[first:last], starts[block],
+                                widths[block], heights[block], n_dims,
+                                resolution)
+            yield (slice(chunk.start + block.start,
+                         chunk.start + block.stop), stats)
+
+
+def particle_stats(
+        imager: netCDF4.Group,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> dict[str, np.ndarray]:
+    """Return the statistics of every image of an imager group
+
+    Args:
+        imager: The imager group.
+        chunk_size: Approximate number of images processed at once.
+
+    Returns:
+        An array of each statistic, keyed by name.
+    """
+    blocks = [stats for _, stats in iter_particle_stats(imager, chunk_size)]
+    return {name: np.concatenate([b[name] for b in blocks])
+            if blocks else np.zeros(0, dtype=dtype)
+            for name, dtype in STATS_TYPES.items()}
+
+
+def write_particle_stats(imager: netCDF4.Group,
+                         group: str = STATS_GROUP,
+                         chunk_size: int = DEFAULT_CHUNK_SIZE,
+                         zlib: bool = True,
+                         complevel: int = 4,
+                         stats: Optional[Mapping[str, Any]] = None,
+                         ) -> netCDF4.Group:
+    """Compute the statistics of an imager group and write them to a group
+
+    The file must be open for writing. An existing group of the same name
+    must have the statistics variables, which are overwritten.
+
+    Args:
+        imager: The imager group.
+        group: Name of the statistics group created in the imager group.
+        chunk_size: Approximate number of images processed at once.
+        zlib: Compress the statistics variables.
+        complevel: Compression level used when ``zlib`` is True.
+        stats: Statistics already computed, eg in another process, keyed
+            by name. These are arrays, as returned by ``particle_stats``, or
+            variables of a scratch file, and are copied in chunks. Computed
+            here if ``None``.
+
+    Returns:
+        The statistics group.
+    """
+    core = core_group(imager)
+    resolution = imager.variables['resolution']
+    units = getattr(resolution, 'units', None)
+
+    if group in imager.groups:
+        stats_group = imager.groups[group]
+    else:
+        stats_group = imager.createGroup(group)
+        stats_group.group_type = 'particle_stats'
+        stats_group.createDimension(IMAGE_NUM_DIM, None)
+
+        image_chunk = core.variables[STARTPIXEL].chunking()
+        chunks = (None if image_chunk in (None, 'contiguous')
+                  else (int(image_chunk[0]),))
+        opts = dict(zlib=zlib, complevel=complevel) if zlib else {}
+        for name, dtype in STATS_TYPES.items():
+            stats_group.createVariable(name, dtype, (IMAGE_NUM_DIM,),
+                                       chunksizes=chunks, **opts)
+
+        variables = stats_group.variables
+        variables['shaded_pixels'].long_name = 'Number of shaded pixels'
+        variables['x_extent'].long_name = 'Number of pixels across the shaded region'
+        variables['y_extent'].long_name = 'Number of slices of the shaded region'
+        variables['max_dimension'].long_name = 'Maximum dimension of the shaded region'
+        if units is not None:
+            variables['max_dimension'].units = units
+        variables['edge_touch'].long_name = 'Shaded region touches the image edge'
+        variables['edge_touch'].flag_masks = np.array([EDGE_FIRST, EDGE_LAST],
+                                                      dtype=np.int8)
+        variables['edge_touch'].flag_meanings = 'first_pixel last_pixel'
+
+    variables = {name: raw(stats_group.variables[name])
+                 for name in STATS_TYPES}
+    if stats is not None:
+        for name, values in stats.items():
+            step = chunk_size_for(variables[name], chunk_size)
+            for chunk in iter_chunks(len(values), step):
+                variables[name][chunk] = values[chunk]
+        return stats_group
+
+    for block, values in iter_particle_stats(imager, chunk_size):
+        for name, var in variables.items():
+            var[block] = values[name]
+    return stats_group
+
+
+def _scratch_stats(imager: netCDF4.Group, directory: str,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """Write the statistics of an imager group to a scratch file
+
+    Returns:
+        The name of the scratch file, which holds a variable of each
+        statistic.
+    """
+    filename = os.path.join(directory, f'{imager.name}.nc')
+    with netCDF4.Dataset(filename, 'w') as nc:
+        nc.createDimension(IMAGE_NUM_DIM, None)
+        variables = {name: nc.createVariable(name, dtype, (IMAGE_NUM_DIM,))
+                     for name, dtype in STATS_TYPES.items()}
+        for block, values in iter_particle_stats(imager, chunk_size):
+            for name, var in variables.items():
+                var[block] = values[name]
+    return filename
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == '__main__':
+
+    import argparse
+
+    parser = argparse.ArgumentParser(
+            description=('Add per-image particle statistics to the imager '
+                         'groups of SPIF files.'))
+    parser.add_argument('paths',
+                        nargs='+',
+                        help='Files to add statistics to, in place.')
+    parser.add_argument('--group',
+                        dest='group',
+                        default=STATS_GROUP,
+                        help=('Name of the statistics group. Default is '
+                              f'"{STATS_GROUP}".'))
+
+    parser.add_argument('-j', '--jobs',
+                        dest='max_workers',
+                        type=int,
+                        default=None,
+                        help=('Number of worker processes computing the '
+                              'statistics of the imager groups of a file. '
+                              'Default is one per imager group.'))
+
+    args = parser.parse_args()
+
+    for path in args.paths:
+        with tempfile.TemporaryDirectory() as directory:
+            results = map_imagers(path, _scratch_stats, directory,
+                                  max_workers=args.max_workers)
+            with netCDF4.Dataset(path, 'a') as nc:
+                for name, scratch in results.items():
+                    if isinstance(scratch, Exception):
+                        print(f'{path}: {name} failed ({scratch})')
+                        continue
+                    with netCDF4.Dataset(scratch, 'r') as stats:
+                        write_particle_stats(
+                            nc[name], args.group,
+                            stats={k: raw(v)
+                                   for k, v in stats.variables.items()}
+                        )
+                    print(f'{path}: {name}/{args.group}')
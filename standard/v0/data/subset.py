@@ -0,0 +1,176 @@
+"""
+Extracting the images of a time or image range into a new file.
+
+The images of each imager group are selected either by time, ie
+``start <= timestamp < stop`` in the units of ``timestamp``, or by a range of
+image numbers, eg
+
+.. code-block:: python
+
+    subset_file('flight.nc', 'cloud.nc', start=t0, stop=t1)
+    subset_file('flight.nc', 'first.nc', images=slice(0, 10_000))
+
+or from the command line
+
+.. code-block:: shell
+
+    ~/spif$ python -m standard.v0.data.subset flight.nc -o cloud.nc \\
+                --start 3600000000000 --stop 3900000000000
+
+The range of images of a time window is found by bisection of the
+``timestamp`` chunks, with ``TimeIndex(..., cache=False, scan=False)``, and
+only the chunks of the index variables and the pixels of the selected images
+are read. The images are written through an ``ImagerWriter``, so
+``startpixel`` is rewritten relative to the new file and packed pixels stay
+packed. The cost therefore depends on the size of the subset rather than of
+the file.
+
+Every imager group is carried over, with its attributes, variables, and
+groups derived from the core data, eg 'particle_stats'. An imager group with
+no images in the range is kept with an empty core group. The global
+attributes and any other groups, eg the platform group, are copied whole.
+"""
+
+from typing import Optional
+
+import netCDF4  # type: ignore
+
+from .copying import (
+    copy_attributes, copy_variable, copy_dimensions, copy_group,
+    copy_imager, append_images,
+)
+from .layout import (
+    DEFAULT_CHUNK_SIZE, DEFAULT_PIXEL_BLOCK, imager_group_names,
+)
+from .timewindow import TimeIndex
+
+__all__ = ['subset_images', 'subset_file']
+
+
+def subset_images(imager: netCDF4.Group,
+                  start: Optional[int] = None,
+                  stop: Optional[int] = None,
+                  images: Optional[slice] = None,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> slice:
+    """Return the range of images of an imager group to extract
+
+    Args:
+        imager: The imager group.
+        start: Earliest timestamp of the images, inclusive.
+        stop: Latest timestamp of the images, exclusive.
+        images: Range of image numbers, applied after the time range.
+        chunk_size: Approximate number of timestamps read at once.
+
+    Returns:
+        The range of image numbers, with a step of 1.
+    """
+    index = TimeIndex(imager, cache=False, chunk_size=chunk_size, scan=False)
+    first, last = 0, index.size
+    if start is not None or stop is not None:
+        if start is not None:
+            first = index.images(start, start).start
+        if stop is not None:
+            last = index.images(stop, stop).start
+        last = max(first, last)
+
+    if images is not None:
+        if images.step not in (None, 1):
+            raise ValueError(f'{imager.path} - image range must have a '
+                             'step of 1')
+        lo, hi, _ = images.indices(last - first)
+        first, last = first + lo, first + max(lo, hi)
+    return slice(first, last)
+
+
+def subset_file(path: str, output: str,
+                start: Optional[int] = None,
+                stop: Optional[int] = None,
+                images: Optional[slice] = None,
+                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                max_pixels: int = DEFAULT_PIXEL_BLOCK) -> dict[str, slice]:
+    """Write the images of a time or image range to a new file
+
+    Args:
+        path: Name of the file to read.
+        output: Name of the new file.
+        start: Earliest timestamp of the images, inclusive.
+        stop: Latest timestamp of the images, exclusive.
+        images: Range of image numbers, applied after the time range, eg
+            ``slice(0, 100)`` for the first 100 images of the time range.
+        chunk_size: Approximate number of images read at once.
+        max_pixels: Largest number of pixels read at once.
+
+    Returns:
+        The range of images copied from each imager group.
+    """
+    ranges = {}
+    with netCDF4.Dataset(path, 'r') as nc, \
+            netCDF4.Dataset(output, 'w') as out:
+        copy_attributes(nc, out)
+        copy_dimensions(nc, out)
+        for var in nc.variables.values():
+            copy_variable(var, out, True, chunk_size)
+
+        names = imager_group_names(nc)
+        for group in nc.groups.values():
+            if group.name not in names:
+                copy_group(group, out, True, chunk_size)
+
+        for name in names:
+            ranges[name] = subset_images(nc[name], start, stop, images,
+                                         chunk_size)
+            writer = copy_imager(nc[name], out, chunk_size)
+            append_images(writer, nc[name], ranges[name],
+                          chunk_size=chunk_size, max_pixels=max_pixels)
+            writer.close()
+    return ranges
+
+
+# ----------------------------------------------------------------------
+# ----------------------------------------------------------------------
+if __name__ == '__main__':
+
+    import argparse
+
+    from .compliance import check_file
+
+    parser = argparse.ArgumentParser(
+            description=('Extract the images of a time or image range of a '
+                         'SPIF file into a new file.'))
+    parser.add_argument('path',
+                        help='File to extract images from.')
+    parser.add_argument('-o', '--output',
+                        dest='output',
+                        required=True,
+                        help='Name of the new file.')
+    parser.add_argument('--start',
+                        dest='start',
+                        type=int,
+                        default=None,
+                        help=('Earliest timestamp, inclusive, in the units '
+                              'of the timestamp variable.'))
+    parser.add_argument('--stop',
+                        dest='stop',
+                        type=int,
+                        default=None,
+                        help=('Latest timestamp, exclusive, in the units of '
+                              'the timestamp variable.'))
+    parser.add_argument('--images',
+                        dest='images',
+                        type=int,
+                        nargs=2,
+                        default=None,
+                        metavar=('FIRST', 'LAST'),
+                        help=('Range of image numbers, last exclusive, '
+                              'counted from the start of the time range.'))
+
+    args = parser.parse_args()
+
+    ranges = subset_file(args.path, args.output, args.start, args.stop,
+                         slice(*args.images) if args.images else None)
+    for name, images in ranges.items():
+        print(f'{name}: images {images.start} to {images.stop}')
+
+    result = check_file(args.output)
+    for error in result['errors']:
+        print(f'{args.output}: {error}')
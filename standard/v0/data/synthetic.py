@@ -0,0 +1,130 @@
+"""
+Generation of synthetic, standard-compliant SPIF files.
+
+Files are written in blocks of images with ``SpifWriter.extend`` so memory
+use is bounded by the block size, whatever the number of images, eg
+
+.. code-block:: python
+
+    make_spif('synthetic.nc', n_images=10_000_000, n_imagers=2,
+              width=128, height=(1, 64), pixel_colors=2)
+
+Image widths and heights may each be given as a fixed size, a ``(low, high)``
+range from which sizes are drawn uniformly, or a function ``f(rng, n)``
+returning ``n`` sizes. Image arrival times follow a Poisson process.
+"""
+
+from typing import Callable, Optional, Sequence, Union
+
+import numpy as np
+
+from .writer import SpifWriter, IMAGE_CHUNK, PIXEL_CHUNK
+
+__all__ = ['make_spif']
+
+Sizes = Union[int, tuple[int, int], Callable[[np.random.Generator, int],
+                                             np.ndarray]]
+
+# Number of images generated and written at once
+BLOCK_SIZE = 100_000
+
+
+def _sizes(sizes: Sizes, rng: np.random.Generator, n: int) -> np.ndarray:
+    """Draw ``n`` image sizes"""
+    if callable(sizes):
+        return np.asarray(sizes(rng, n), dtype=np.uint64)
+    if isinstance(sizes, tuple):
+        return rng.integers(sizes[0], sizes[1], n, endpoint=True,
+                            dtype=np.uint64)
+    return np.full(n, sizes, dtype=np.uint64)
+
+
+def _pixels(rng: np.random.Generator, n: int, pixel_colors: int,
+            shaded: float) -> np.ndarray:
+    """Draw ``n`` pixels, a fraction ``shaded`` of them not background"""
+    pixels = np.zeros(n, dtype=np.uint8)
+    mask = rng.random(n, dtype=np.float32) < shaded
+    pixels[mask] = rng.integers(1, pixel_colors, int(mask.sum()),
+                                dtype=np.uint8)
+    return pixels
+
+
+def make_spif(filename: str,
+              n_images: int,
+              n_imagers: int = 1,
+              width: Sizes = 64,
+              height: Sizes = (1, 64),
+              pixel_colors: int = 2,
+              array_dimensions: int = 1,
+              shaded: float = 0.3,
+              rate: float = 1000.,
+              image_chunk: int = IMAGE_CHUNK,
+              pixel_chunk: int = PIXEL_CHUNK,
+              zlib: bool = True,
+              complevel: int = 4,
+              block_size: int = BLOCK_SIZE,
+              seed: Optional[int] = None,
+              imager_names: Optional[Sequence[str]] = None,
+              encoding: Optional[str] = None) -> None:
+    """Write a synthetic SPIF file
+
+    Args:
+        filename: Name of the file to create.
+        n_images: Number of images in each imager group.
+        n_imagers: Number of imager groups.
+        width: Image widths, see module documentation. Must not exceed 255.
+        height: Image heights, see module documentation. Must not exceed 255.
+        pixel_colors: Number of color levels of the pixels.
+        array_dimensions: Size of the 'array_dimensions' dimension.
+        shaded: Fraction of pixels that are not background.
+        rate: Mean rate of images per second.
+        image_chunk: Chunk length of the 'image_num' variables.
+        pixel_chunk: Chunk length of the 'image' variable.
+        zlib: Compress the core variables.
+        complevel: Compression level used when ``zlib`` is True.
+        block_size: Number of images generated and written at once.
+        seed: Seed of the random number generator.
+        imager_names: Names of the imager groups. Default is 'imager_1',
+            'imager_2', etc.
+        encoding: Write the pixels packed with this encoding, 'bitpack' or
+            'rle'. Requires ``pixel_colors`` of 2.
+    """
+    rng = np.random.default_rng(seed)
+    if imager_names is None:
+        imager_names = [f'imager_{i + 1}' for i in range(n_imagers)]
+
+    max_width = width if isinstance(width, int) else None
+    color_level = np.linspace(0, 1, pixel_colors, endpoint=False)
+    mean_interval = 1e9 / rate
+
+    with SpifWriter(filename, image_chunk=image_chunk,
+                    pixel_chunk=pixel_chunk, zlib=zlib, complevel=complevel,
+                    title='Synthetic SPIF data') as writer:
+        for name in imager_names:
+            imager = writer.create_imager(
+                name,
+                color_level=color_level,
+                array_size=[max_width or 64] * array_dimensions,
+                image_size=[max_width] * array_dimensions if max_width else None,
+                resolution=[10.] * array_dimensions,
+                wavelength=785.,
+                pathlength=63.,
+                timestamp_units='nanoseconds since 2024-01-01 00:00:00 +0000',
+                encoding=encoding,
+                instrument_long_name=f'Synthetic imager {name}',
+            )
+
+            time = 0
+            for first in range(0, n_images, block_size):
+                n = min(block_size, n_images - first)
+                widths = _sizes(width, rng, n)
+                heights = _sizes(height, rng, n)
+                n_pixels = int((widths * heights).sum()) * array_dimensions
+
+                intervals = rng.exponential(mean_interval, n).astype(np.uint64)
+                timestamps = time + np.cumsum(intervals, dtype=np.uint64)
+                time = int(timestamps[-1])
+
+                imager.extend(_pixels(rng, n_pixels, pixel_colors, shaded),
+                              widths, heights, timestamps,
+                              (rng.random(n) < 0.001).astype(np.int8))
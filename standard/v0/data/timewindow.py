@@ -0,0 +1,182 @@
+"""
+Selection of the images that arrived within a time window.
+
+``timestamp`` gives the arrival time of each image and is expected to be
+sorted. A ``TimeIndex`` finds the images of a window with a binary search
+rather than reading and masking the whole variable, and returns both the
+range of images and the range of pixels in ``image`` that they occupy, eg
+
+.. code-block:: python
+
+    with netCDF4.Dataset('spif_example.nc') as nc:
+        index = TimeIndex(nc['imager_1'])
+        window = index.window(start, stop)
+        timestamps = nc['imager_1/core/timestamp'][window.images]
+        pixels = nc['imager_1/core/image'][window.pixels]
+
+Times are given in the units of the ``timestamp`` variable. If timestamps
+are found to decrease anywhere, queries raise a ``ValueError`` rather than
+return a range that may be wrong. For a single query of a very large file
+the index may be created with ``cache=False, scan=False``, when the sorted
+order is trusted and each query reads only O(log n) chunks of ``timestamp``.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import netCDF4  # type: ignore
+import numpy as np
+
+from .layout import (
+    TIMESTAMP, STARTPIXEL, WIDTH, HEIGHT, DEFAULT_CHUNK_SIZE,
+    core_group, array_dimensions, chunk_size_for, iter_chunks, raw,
+)
+
+__all__ = ['TimeWindow', 'TimeIndex']
+
+
+@dataclass(frozen=True)
+class TimeWindow:
+    """Images within a time window
+
+    Args:
+        images: Range of image numbers, ie of the 'image_num' dimension.
+        pixels: Range of pixels in the ``image`` variable.
+    """
+    images: slice
+    pixels: slice
+
+    def __len__(self) -> int:
+        return self.images.stop - self.images.start
+
+
+class TimeIndex:
+    """Binary search index of the image timestamps of an imager group
+
+    Args:
+        imager: The imager group to index.
+        cache: Keep all the timestamps in memory. If False only the first
+            timestamp of each block of ``chunk_size`` images is kept and at
+            most two blocks are read for each query.
+        chunk_size: Approximate number of timestamps read at once while
+            building the index, aligned to the chunking of ``timestamp``.
+        scan: If ``cache`` is False, read all the timestamps once to find the
+            first timestamp of each block and check they are sorted. If
+            False the timestamps are assumed sorted and the blocks are found
+            by bisection.
+    """
+
+    def __init__(self, imager: netCDF4.Group, cache: bool = True,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 scan: bool = True) -> None:
+        self.core = core_group(imager)
+        self.n_dims = array_dimensions(imager)
+        self.timestamp = raw(self.core.variables[TIMESTAMP])
+        self.chunk_size = chunk_size_for(self.timestamp, chunk_size)
+        self.size = self.timestamp.shape[0]
+
+        # Image number of the first decreasing timestamp, if any
+        self.first_decrease: Optional[int] = None
+        self._cached: Optional[np.ndarray] = None
+        self._samples: Optional[np.ndarray] = None
+
+        if cache:
+            self._cached = self.timestamp[:]
+            self._check_sorted(self._cached, 0)
+        elif scan:
+            self._build_samples()
+
+    @property
+    def monotonic(self) -> bool:
+        """True if the timestamps never decrease"""
+        return self.first_decrease is None
+
+    def _check_sorted(self, values: np.ndarray, offset: int) -> None:
+        if self.first_decrease is not None or len(values) < 2:
+            return
+        bad = np.flatnonzero(values[1:] < values[:-1])
+        if bad.size:
+            self.first_decrease = int(bad[0]) + 1 + offset
+
+    def _build_samples(self) -> None:
+        """Stream the timestamps, keeping the first of each block"""
+        samples = []
+        last = None
+        for sl in iter_chunks(self.size, self.chunk_size):
+            values = self.timestamp[sl]
+            if last is not None and values[0] < last:
+                self._check_sorted(np.array([last, values[0]]), sl.start - 1)
+            self._check_sorted(values, sl.start)
+            samples.append(values[0])
+            last = values[-1]
+        self._samples = np.array(samples, dtype=self.timestamp.dtype)
+
+    def _search(self, value: int, side: str) -> int:
+        """Return the insertion point of a time in the sorted timestamps"""
+        # Times beyond the range of an integer timestamp type cannot be
+        # converted to it for the search, but are before or after all images
+        if np.issubdtype(self.timestamp.dtype, np.integer):
+            limits = np.iinfo(self.timestamp.dtype)
+            if value < limits.min:
+                return 0
+            if value > limits.max:
+                return self.size
+
+        if self._cached is not None:
+            return int(np.searchsorted(self._cached, value, side=side))
+
+        # The insertion point is either in the last block whose first
+        # timestamp is before the value or at the start of the next block
+        if self._samples is not None:
+            block = int(np.searchsorted(self._samples, value, side=side)) - 1
+        else:
+            block = self._bisect_blocks(value, side)
+        if block < 0:
+            return 0
+        start = block * self.chunk_size
+        stop = min(start + 2 * self.chunk_size, self.size)
+        values = self.timestamp[start:stop]
+        return start + int(np.searchsorted(values, value, side=side))
+
+    def _bisect_blocks(self, value: int, side: str) -> int:
+        """Return the last block whose first timestamp is before a time"""
+        lo, hi = 0, -(-self.size // self.chunk_size)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            first = self.timestamp[mid * self.chunk_size]
+            if first < value or (side == 'right' and first == value):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo - 1
+
+    def _pixel(self, n: int, end: bool = False) -> int:
+        """Return the first pixel of image ``n``, or the pixel after it"""
+        pixel = int(raw(self.core.variables[STARTPIXEL])[n])
+        if end:
+            pixel += (int(raw(self.core.variables[WIDTH])[n])
+                      * int(raw(self.core.variables[HEIGHT])[n])
+                      * self.n_dims)
+        return pixel
+
+    def images(self, start: int, stop: int) -> slice:
+        """Return the range of images with ``start <= timestamp < stop``"""
+        if not self.monotonic:
+            raise ValueError(f'{self.core.path} - timestamp decreases at '
+                             f'image_num {self.first_decrease}, cannot '
+                             'select a time window')
+        first = self._search(start, 'left')
+        last = max(first, self._search(stop, 'left'))
+        return slice(first, last)
+
+    def window(self, start: int, stop: int) -> TimeWindow:
+        """Return the images and pixels with ``start <= timestamp < stop``"""
+        images = self.images(start, stop)
+        if images.start == images.stop:
+            pixel = (self._pixel(images.start) if images.start < self.size
+                     else self._pixel(self.size - 1, end=True)
+                     if self.size else 0)
+            return TimeWindow(images, slice(pixel, pixel))
+        pixels = slice(self._pixel(images.start),
+                       self._pixel(images.stop - 1, end=True))
+        return TimeWindow(images, pixels)
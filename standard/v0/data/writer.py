@@ -0,0 +1,444 @@
+"""
+Buffered writing of SPIF files.
+
+Appending images one at a time to the unlimited ``image_num`` and ``pixel``
+dimensions makes HDF5 extend the variables on every write. The writers here
+collect images in preallocated numpy buffers and write them out in batches
+that are whole multiples of the variable chunk sizes, keeping ``startpixel``
+up to date as they go, eg
+
+.. code-block:: python
+
+    with SpifWriter('flight.nc') as writer:
+        imager = writer.create_imager(
+            'imager_1',
+            color_level=[0, 0.5],
+            array_size=[128],
+            image_size=[128],
+            resolution=[10],
+            wavelength=785,
+            pathlength=63,
+            timestamp_units='nanoseconds since 2024-01-01 00:00:00 +0000',
+        )
+        for timestamp, image in images:
+            imager.append(image, timestamp)
+
+Images may also be added in blocks with ``ImagerWriter.extend`` which avoids
+any per-image Python overhead.
+"""
+
+from typing import Any, Optional, Sequence
+
+import netCDF4  # type: ignore
+import numpy as np
+
+from .layout import (
+    CORE_GROUP, IMAGE, TIMESTAMP, STARTPIXEL, WIDTH, HEIGHT, OVERLOAD,
+    IMAGE_NUM_DIM, PIXEL_DIM, ARRAY_DIMENSIONS_DIM,
+)
+from .packing import (
+    PACKED_IMAGE, PACKED_PIXEL_DIM, ENCODINGS, pack_bits, encode_rle,
+    _binary,
+)
+
+__all__ = ['SpifWriter', 'ImagerWriter']
+
+# Default chunk lengths of the 'image_num' and 'pixel' variables
+IMAGE_CHUNK = 2 ** 16
+PIXEL_CHUNK = 2 ** 20
+
+# Number of chunks collected in the buffers before they are written
+CHUNKS_PER_FLUSH = 4
+
+
+class _Buffer:
+    """Preallocated buffer written to a variable in whole-chunk batches"""
+
+    def __init__(self, var: netCDF4.Variable, size: int,
+                 dtype: Any = None) -> None:
+        dtype = np.dtype(var.dtype if dtype is None else dtype)
+        self.var = var
+        self.data = np.empty(size, dtype=dtype)
+        self.used = 0
+        self.written = 0
+        self.limits = (np.iinfo(dtype)
+                       if np.issubdtype(dtype, np.integer) else None)
+
+    def check(self, values: Any) -> np.ndarray:
+        """Return values converted to the buffer type, if all are in range"""
+        values = np.asarray(values)
+        if self.limits is not None and values.size and (
+                values.min() < self.limits.min
+                or values.max() > self.limits.max):
+            raise ValueError(f'{self.var.name} - values out of range for '
+                             f'type {self.var.dtype}')
+        return values.astype(self.data.dtype, copy=False)
+
+    def extend(self, values: Any) -> None:
+        self.put(self.check(values))
+
+    def put(self, values: np.ndarray) -> None:
+        """Add values already returned by ``check``"""
+        size = len(self.data)
+        while len(values):
+            n = min(size - self.used, len(values))
+            self.data[self.used:self.used + n] = values[:n]
+            self.used += n
+            values = values[n:]
+            if self.used == size:
+                self.flush()
+
+    def flush(self) -> None:
+        if not self.used:
+            return
+        self._write(self.data[:self.used])
+        self.used = 0
+
+    def close(self) -> None:
+        self.flush()
+
+    def _write(self, values: np.ndarray) -> None:
+        self.var[self.written:self.written + len(values)] = values
+        self.written += len(values)
+
+
+class _PackedBuffer(_Buffer):
+    """Buffer of binary pixels written to an 'image_packed' variable
+
+    With 'bitpack' encoding only whole bytes are written until the buffer is
+    closed. With 'rle' encoding the last run is held back until the next
+    write, as it may continue into the following pixels.
+    """
+
+    def __init__(self, var: netCDF4.Variable, size: int,
+                 encoding: str) -> None:
+        super().__init__(var, -(-size // 8) * 8, dtype=np.uint8)
+        self.encoding = encoding
+        self.unpacked = 0
+        self.started = False
+        self.pending: Optional[tuple[int, int]] = None
+
+    def check(self, values: Any) -> np.ndarray:
+        return super().check(_binary(values))
+
+    def flush(self, final: bool = False) -> None:
+        n = self.used
+        if self.encoding == 'bitpack' and not final:
+            n -= n % 8
+        if not n and not (final and self.pending):
+            return
+
+        pixels = self.data[:n]
+        if self.encoding == 'bitpack':
+            self._write(pack_bits(pixels))
+        else:
+            self._write_runs(encode_rle(pixels), final)
+
+        self.unpacked += n
+        self.var.unpacked_length = np.uint64(self.unpacked)
+        remainder = self.used - n
+        self.data[:remainder] = self.data[n:self.used]
+        self.used = remainder
+
+    def close(self) -> None:
+        self.flush(final=True)
+
+    def _write_runs(self, runs: np.ndarray, final: bool) -> None:
+        """Join runs to those already written, holding back the last one"""
+        runs = runs.astype(np.int64)
+        values = np.arange(len(runs)) & 1
+        if self.pending is not None:
+            values = np.concatenate(([self.pending[0]], values))
+            runs = np.concatenate(([self.pending[1]], runs))
+            self.pending = None
+
+        # Drop empty runs and merge neighbouring runs of the same value
+        keep = runs > 0
+        runs, values = runs[keep], values[keep]
+        if not len(runs):
+            return
+        first = np.flatnonzero(np.concatenate(([True],
+                                               values[1:] != values[:-1])))
+        runs, values = np.add.reduceat(runs, first), values[first]
+
+        if not final:
+            self.pending = (int(values[-1]), int(runs[-1]))
+            runs, values = runs[:-1], values[:-1]
+        if not len(runs):
+            return
+        if not self.started and values[0] == 1:
+            runs = np.concatenate(([0], runs))
+        if runs.max() > np.iinfo(self.var.dtype).max:
+            raise ValueError(f'{self.var.name} - run too long to be encoded')
+        self._write(runs.astype(self.var.dtype))
+        self.started = True
+
+
+class ImagerWriter:
+    """Buffered writer of the core data of a single imager group
+
+    Created with ``SpifWriter.create_imager``.
+
+    Args:
+        core: The 'core' group of the imager group.
+        n_dims: Size of the 'array_dimensions' dimension.
+        image_chunk: Chunk length of the 'image_num' variables.
+        pixel_chunk: Chunk length of the 'image' variable.
+        encoding: Encoding of the 'image_packed' variable the pixels are
+            written to, or ``None`` to write them to 'image'.
+    """
+
+    def __init__(self, core: netCDF4.Group, n_dims: int,
+                 image_chunk: int, pixel_chunk: int,
+                 encoding: Optional[str] = None) -> None:
+        self.core = core
+        self.n_dims = n_dims
+        self.n_images = 0
+        self.n_pixels = 0
+
+        for var in core.variables.values():
+            var.set_auto_maskandscale(False)
+
+        image_size = image_chunk * CHUNKS_PER_FLUSH
+        if encoding is None:
+            self._image = _Buffer(core.variables[IMAGE],
+                                  pixel_chunk * CHUNKS_PER_FLUSH)
+        else:
+            self._image = _PackedBuffer(core.variables[PACKED_IMAGE],
+                                        pixel_chunk * CHUNKS_PER_FLUSH,
+                                        encoding)
+        self._index = {name: _Buffer(core.variables[name], image_size)
+                       for name in (TIMESTAMP, STARTPIXEL, WIDTH, HEIGHT,
+                                    OVERLOAD)}
+
+    def append(self, image: np.ndarray, timestamp: int,
+               overload: int = 0) -> None:
+        """Add a single image
+
+        Args:
+            image: Image pixels with shape ``(height, width * array_dimensions)``.
+            timestamp: Arrival time of the first pixel of the image in the
+                units of the ``timestamp`` variable.
+            overload: Imager overload flag of the image.
+
+        The image is checked as a block of one by ``extend``, so a rejected
+        image leaves nothing buffered.
+        """
+        image = np.asarray(image)
+        height, width = image.shape
+        width, extra = divmod(width, self.n_dims)
+        if extra:
+            raise ValueError(f'{self.core.path} - image width must be a '
+                             'multiple of array_dimensions')
+        self.extend(image.ravel(), [width], [height], [timestamp],
+                    [overload])
+
+    def extend(self, pixels: np.ndarray, width: Sequence[int],
+               height: Sequence[int], timestamp: Sequence[int],
+               overload: Optional[Sequence[int]] = None) -> None:
+        """Add a block of images already flattened into one array
+
+        Args:
+            pixels: Flattened pixels of all the images, in order.
+            width: Width of each image.
+            height: Height of each image.
+            timestamp: Arrival time of each image.
+            overload: Imager overload flag of each image. Default is 0.
+        """
+        width = np.asarray(width, dtype=np.uint64)
+        height = np.asarray(height, dtype=np.uint64)
+        lengths = width * height * np.uint64(self.n_dims)
+        pixels = np.asarray(pixels).ravel()
+        if int(lengths.sum()) != len(pixels):
+            raise ValueError(f'{self.core.path} - number of pixels does not '
+                             'match the image widths and heights')
+        if overload is None:
+            overload = np.zeros(len(width), dtype=np.int8)
+
+        startpixel = np.empty(len(lengths), dtype=np.uint64)
+        startpixel[:1] = self.n_pixels
+        np.cumsum(lengths[:-1], out=startpixel[1:])
+        startpixel[1:] += np.uint64(self.n_pixels)
+
+        # Check every value before buffering any, so that a rejected block
+        # leaves the buffers aligned
+        values = {TIMESTAMP: timestamp, STARTPIXEL: startpixel,
+                  WIDTH: width, HEIGHT: height, OVERLOAD: overload}
+        for name, value in values.items():
+            if np.shape(value) != (len(lengths),):
+                raise ValueError(f'{self.core.path} - {name} must have one '
+                                 'value per image')
+            values[name] = self._index[name].check(value)
+        pixels = self._image.check(pixels)
+
+        for name, value in values.items():
+            self._index[name].put(value)
+        self._image.put(pixels)
+
+        self.n_images += len(lengths)
+        self.n_pixels += len(pixels)
+
+    def flush(self) -> None:
+        """Write all buffered images to the file
+
+        Up to 7 pixels of a 'bitpack' encoding, and the last run of a 'rle'
+        encoding, are kept until the writer is closed.
+        """
+        for buffer in self._index.values():
+            buffer.flush()
+        self._image.flush()
+
+    def close(self) -> None:
+        """Write all buffered images, including any held back pixels"""
+        for buffer in self._index.values():
+            buffer.close()
+        self._image.close()
+
+
+class SpifWriter:
+    """Writer of a SPIF file with one or more imager groups
+
+    Args:
+        filename: Name of the file to create.
+        conventions: Value of the ``Conventions`` global attribute.
+        image_chunk: Chunk length of the variables on the 'image_num'
+            dimension.
+        pixel_chunk: Chunk length of the 'image' variable.
+        zlib: Compress the core variables.
+        complevel: Compression level used when ``zlib`` is True.
+        **attrs: Further global attributes.
+    """
+
+    def __init__(self, filename: str, conventions: str = 'SPIF-1.0',
+                 image_chunk: int = IMAGE_CHUNK,
+                 pixel_chunk: int = PIXEL_CHUNK,
+                 zlib: bool = True,
+                 complevel: int = 4,
+                 **attrs: Any) -> None:
+        self.nc = netCDF4.Dataset(filename, 'w')
+        self.nc.Conventions = conventions
+        self.nc.imager_groups = ''
+        self.nc.setncatts(attrs)
+
+        self.image_chunk = image_chunk
+        self.pixel_chunk = pixel_chunk
+        self.zlib = zlib
+        self.complevel = complevel
+        self.imagers: dict[str, ImagerWriter] = {}
+
+    def __enter__(self) -> 'SpifWriter':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def create_imager(self, name: str,
+                      color_level: Sequence[float],
+                      array_size: Sequence[int],
+                      resolution: Sequence[float],
+                      wavelength: float,
+                      pathlength: float,
+                      timestamp_units: str,
+                      image_size: Optional[Sequence[int]] = None,
+                      instrument_name: Optional[str] = None,
+                      startpixel_type: str = 'u8',
+                      width_type: str = 'u1',
+                      height_type: str = 'u1',
+                      encoding: Optional[str] = None,
+                      **attrs: Any) -> ImagerWriter:
+        """Create an imager group and its core group
+
+        Args:
+            name: Name of the imager group.
+            color_level: Lower bound of each pixel color level.
+            array_size: Number of detector pixels in each array dimension.
+            resolution: Resolution in each array dimension.
+            wavelength: Operating wavelength of the imager.
+            pathlength: Optical path length of the imaging region.
+            timestamp_units: Units of the ``timestamp`` variable.
+            image_size: Number of pixels across an image if of fixed size.
+                Left as ``_FillValue`` if ``None``.
+            instrument_name: Short name of the instrument. Default is the
+                group name.
+            startpixel_type: Datatype of ``startpixel``, 'u8' so that files
+                may hold more than 2**32 pixels.
+            width_type: Datatype of ``width``.
+            height_type: Datatype of ``height``.
+            encoding: Write binary pixels to an 'image_packed' variable with
+                this encoding, 'bitpack' or 'rle', leaving 'image' empty.
+                See ``packing``. Only allowed with 2 color levels.
+            **attrs: Further imager group attributes.
+
+        Returns:
+            The writer used to add images to the group.
+        """
+        if encoding is not None:
+            if encoding not in ENCODINGS:
+                raise ValueError(f'{name} - unknown encoding {encoding}')
+            if len(color_level) != 2:
+                raise ValueError(f'{name} - only images with 2 color levels '
+                                 'can be packed')
+
+        nc = self.nc
+        imager = nc.createGroup(name)
+        imager.group_type = 'imager'
+        imager.instrument_name = instrument_name or name
+        imager.setncatts(attrs)
+
+        imager.createDimension(ARRAY_DIMENSIONS_DIM, len(array_size))
+        imager.createDimension('pixel_colors', len(color_level))
+        imager.createVariable('color_level', 'f4', ('pixel_colors',))[:] = color_level
+        imager.createVariable('array_size', 'i4', (ARRAY_DIMENSIONS_DIM,))[:] = array_size
+        var = imager.createVariable('image_size', 'i4', (ARRAY_DIMENSIONS_DIM,))
+        if image_size is not None:
+            var[:] = image_size
+        imager.createVariable('resolution', 'f4', (ARRAY_DIMENSIONS_DIM,))[:] = resolution
+        imager.createVariable('wavelength', 'f4', ())[:] = wavelength
+        imager.createVariable('pathlength', 'f4', ())[:] = pathlength
+
+        core = imager.createGroup(CORE_GROUP)
+        core.group_type = 'core'
+        core.createDimension(IMAGE_NUM_DIM, None)
+        core.createDimension(PIXEL_DIM, None)
+
+        opts = {'zlib': self.zlib, 'complevel': self.complevel}
+        image_opts = dict(opts, chunksizes=(self.image_chunk,))
+        timestamp = core.createVariable(TIMESTAMP, 'u8', (IMAGE_NUM_DIM,),
+                                        **image_opts)
+        timestamp.standard_name = 'time'
+        timestamp.units = timestamp_units
+        core.createVariable(STARTPIXEL, startpixel_type, (IMAGE_NUM_DIM,),
+                            **image_opts)
+        core.createVariable(WIDTH, width_type, (IMAGE_NUM_DIM,), **image_opts)
+        core.createVariable(HEIGHT, height_type, (IMAGE_NUM_DIM,),
+                            **image_opts)
+        core.createVariable(OVERLOAD, 'i1', (IMAGE_NUM_DIM,), **image_opts)
+        core.createVariable(IMAGE, 'u1', (PIXEL_DIM,),
+                            chunksizes=(self.pixel_chunk,), **opts)
+        if encoding is not None:
+            core.createDimension(PACKED_PIXEL_DIM, None)
+            packed = core.createVariable(
+                PACKED_IMAGE, 'u1' if encoding == 'bitpack' else 'u4',
+                (PACKED_PIXEL_DIM,),
+                chunksizes=(max(1, self.pixel_chunk // 8),), **opts
+            )
+            packed.encoding = encoding
+            packed.unpacked_length = np.uint64(0)
+
+        writer = ImagerWriter(core, len(array_size),
+                              self.image_chunk, self.pixel_chunk, encoding)
+        self.imagers[name] = writer
+        nc.imager_groups = ' '.join(self.imagers)
+        return writer
+
+    def flush(self) -> None:
+        """Write all buffered images to the file"""
+        for writer in self.imagers.values():
+            writer.flush()
+
+    def close(self) -> None:
+        """Write all buffered images and close the file"""
+        if self.nc.isopen():
+            for writer in self.imagers.values():
+                writer.close()
+            self.nc.close()
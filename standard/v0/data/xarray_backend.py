@@ -0,0 +1,233 @@
+"""
+An xarray backend for SPIF files.
+
+Each imager group listed in the ``imager_groups`` attribute is opened as an
+``xarray.Dataset`` holding;
+
+    * the variables of the imager group itself, eg ``color_level`` and
+      ``resolution``, and its attributes,
+    * the per-image variables of the 'core' group on ``image_num``, eg
+      ``timestamp`` and ``startpixel``, which are loaded when the file is
+      opened, and
+    * the ``image`` pixels on ``pixel``, which are only read when used.
+      Pixels held packed in ``image_packed`` are decoded on read, see
+      ``packing``.
+
+The preferred chunks of ``image`` are its HDF5 chunks, so opening with
+``chunks={}`` gives a dask array whose chunks each decompress exactly one
+chunk of the file, eg
+
+.. code-block:: python
+
+    ds = xarray.open_dataset('flight.nc', engine=SpifBackendEntrypoint,
+                             group='imager_1', chunks={})
+
+    # or every imager group at once
+    datasets = open_spif('flight.nc', chunks={})
+
+The backend is not registered as an entry point, so the class itself must be
+given as the ``engine``. The ``group`` defaults to the first imager group.
+"""
+
+import os
+from typing import Any, Iterable, Optional
+
+import netCDF4  # type: ignore
+import numpy as np
+import xarray
+from xarray.backends import BackendArray, BackendEntrypoint
+from xarray.backends.file_manager import CachingFileManager
+from xarray.backends.locks import HDF5_LOCK
+from xarray.core import indexing
+
+from .layout import (
+    IMAGE, IMAGE_NUM_DIM, PIXEL_DIM,
+    imager_group_names, core_group, raw,
+)
+from .header import _attributes
+from .packing import PACKED_IMAGE, pixel_source
+
+__all__ = ['SpifBackendEntrypoint', 'open_spif']
+
+
+class SpifPixelArray(BackendArray):
+    """Lazily read pixels of the 'image' variable of an imager group
+
+    Args:
+        manager: File manager of the open netCDF file.
+        group: Name of the imager group.
+        shape: Shape of the unpacked pixels.
+        lock: Lock held while reading from the file.
+    """
+
+    def __init__(self, manager: CachingFileManager, group: str,
+                 shape: tuple[int], lock: Any = HDF5_LOCK) -> None:
+        self.manager = manager
+        self.group = group
+        self.shape = shape
+        self.dtype = np.dtype(np.uint8)
+        self.lock = lock
+        self._source: Any = None
+        self._dataset: Any = None
+
+    def __getstate__(self) -> dict:
+        # The pixel source holds an open netCDF variable, so is rebuilt
+        # after unpickling, eg in a dask worker
+        state = self.__dict__.copy()
+        state.update(_source=None, _dataset=None)
+        return state
+
+    def __getitem__(self, key: indexing.ExplicitIndexer) -> np.ndarray:
+        return indexing.explicit_indexing_adapter(
+            key, self.shape, indexing.IndexingSupport.BASIC, self._getitem
+        )
+
+    def _getitem(self, key: tuple) -> np.ndarray:
+        (index,) = key
+        if not isinstance(index, slice):
+            index = int(index)
+            return self._read(slice(index, index + 1))[0]
+
+        wanted = range(*index.indices(self.shape[0]))
+        if wanted.step == 1 or not len(wanted):
+            return self._read(slice(wanted.start, wanted.stop))
+        first, last = min(wanted), max(wanted)
+        pixels = self._read(slice(first, last + 1))
+        return pixels[np.asarray(wanted) - first]
+
+    def _pixels(self, nc: netCDF4.Dataset) -> Any:
+        """Return the pixel source, built once for each opening of the file
+
+        Building the source of packed pixels reads their index, so this
+        must not be repeated for every chunk read.
+        """
+        if self._source is None or self._dataset is not nc:
+            self._source = pixel_source(core_group(nc[self.group]))
+            self._dataset = nc
+        return self._source
+
+    def _read(self, block: slice) -> np.ndarray:
+        with self.lock:
+            nc = self.manager.acquire(needs_lock=False)
+            return self._pixels(nc)[block]
+
+
+def _preferred_chunks(source: Any) -> dict:
+    chunking = source.chunking()
+    if chunking in (None, 'contiguous') or not chunking:
+        return {}
+    return {PIXEL_DIM: int(chunking[0])}
+
+
+def _read_imager(nc: netCDF4.Dataset, manager: CachingFileManager,
+                 group: str, drop_variables: Iterable[str]) -> xarray.Dataset:
+    """Return the dataset of one imager group"""
+    imager = nc[group]
+    core = core_group(imager)
+    drop = set(drop_variables)
+    variables = {}
+
+    for name, var in imager.variables.items():
+        if name not in drop:
+            variables[name] = xarray.Variable(var.dimensions, raw(var)[...],
+                                              _attributes(var))
+
+    for name, var in core.variables.items():
+        if name in drop or name in (IMAGE, PACKED_IMAGE):
+            continue
+        if var.dimensions != (IMAGE_NUM_DIM,):
+            continue
+        variables[name] = xarray.Variable(var.dimensions, raw(var)[:],
+                                          _attributes(var))
+
+    if IMAGE not in drop:
+        source = pixel_source(core)
+        data = indexing.LazilyIndexedArray(
+            SpifPixelArray(manager, group, (len(source),))
+        )
+        attrs = _attributes(core.variables[IMAGE])
+        preferred = _preferred_chunks(source)
+        encoding = {'preferred_chunks': preferred}
+        if preferred:
+            encoding['chunksizes'] = (preferred[PIXEL_DIM],)
+        variables[IMAGE] = xarray.Variable((PIXEL_DIM,), data, attrs,
+                                           encoding=encoding)
+
+    ds = xarray.Dataset(variables, attrs=_attributes(imager))
+    ds.attrs['imager_group'] = group
+    ds.encoding['source'] = nc.filepath()
+    return ds
+
+
+class SpifBackendEntrypoint(BackendEntrypoint):
+    """Open one imager group of a SPIF file as an ``xarray.Dataset``"""
+
+    description = 'Open imager groups of SPIF files'
+    open_dataset_parameters = ('filename_or_obj', 'drop_variables', 'group',
+                               'decode_times')
+
+    def open_dataset(self, filename_or_obj: Any, *,
+                     drop_variables: Optional[Iterable[str]] = None,
+                     group: Optional[str] = None,
+                     decode_times: bool = True) -> xarray.Dataset:
+        """
+        Args:
+            filename_or_obj: Path of the SPIF file.
+            drop_variables: Names of variables not to include.
+            group: Name of the imager group. Default is the first group
+                listed in ``imager_groups``.
+            decode_times: Decode ``timestamp`` to datetimes using its units.
+        """
+        manager = CachingFileManager(netCDF4.Dataset,
+                                     os.fspath(filename_or_obj), mode='r')
+        nc = manager.acquire()
+        groups = imager_group_names(nc)
+        if group is None:
+            if not groups:
+                manager.close()
+                raise ValueError(f'{filename_or_obj} - no imager groups '
+                                 'listed in imager_groups')
+            group = groups[0]
+        elif group not in groups:
+            manager.close()
+            raise ValueError(f'{filename_or_obj} - {group} is not an imager '
+                             f'group, expected one of {groups}')
+
+        ds = _read_imager(nc, manager, group, drop_variables or ())
+        if decode_times:
+            ds = xarray.decode_cf(ds, mask_and_scale=False, decode_times=True,
+                                  decode_coords=False)
+        ds.set_close(manager.close)
+        return ds
+
+    def guess_can_open(self, filename_or_obj: Any) -> bool:
+        try:
+            path = os.fspath(filename_or_obj)
+        except TypeError:
+            return False
+        if os.path.splitext(path)[1] not in ('.nc', '.nc4', '.h5'):
+            return False
+        try:
+            with netCDF4.Dataset(path) as nc:
+                return 'imager_groups' in nc.ncattrs()
+        except OSError:
+            return False
+
+
+def open_spif(filename: str, **kwargs: Any) -> dict[str, xarray.Dataset]:
+    """Open every imager group of a SPIF file
+
+    Args:
+        filename: Path of the SPIF file.
+        **kwargs: Passed to ``xarray.open_dataset``, eg ``chunks={}``.
+
+    Returns:
+        A dataset for each imager group, keyed by group name.
+    """
+    with netCDF4.Dataset(filename) as nc:
+        groups = imager_group_names(nc)
+    return {
+        group: xarray.open_dataset(filename, engine=SpifBackendEntrypoint,
+                                   group=group, **kwargs)
+        for group in groups
+    }
@@ -2,7 +2,7 @@
 from .dataset import Dataset, DatasetMeta
 from .variable import Variable, VariableMeta
 from .group import (
-    CoreGroup, GenericGroup, PlatformGroup, ImagerGroup,
-    GroupMeta
+    CoreGroup, GenericGroup, PlatformGroup, ImagerGroup, ParticleStatsGroup,
+    AncillaryGroup, GroupMeta
 )
 from .dimension import Dimension
\ No newline at end of file
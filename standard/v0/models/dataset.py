@@ -1,6 +1,5 @@
 
 from typing import Optional
-import netCDF4 # type: ignore
 
 from pydantic import BaseModel, Field
 
@@ -1,28 +1,27 @@
 
 from __future__ import annotations
+from functools import lru_cache
 from typing import Optional
 
-from cfunits import Units
 from pydantic import BaseModel, ConfigDict
 from vocal.netcdf.mixins import GroupNetCDFMixin
 from vocal.validation import (
     validator,
-    variable_exists,
-    dimension_exists,
-    group_exists,
-    variable_has_types,
-    variable_has_dimensions,
     substitutor,
-    _randomize_object_name,
 )
 
 from ..attributes.group_attributes import (
     GenericGroupAttributes, PlatformGroupAttributes
 )
 
-from ..attributes import  ImagerGroupAttributes, CoreGroupAttributes
+from ..attributes import (
+    ImagerGroupAttributes, CoreGroupAttributes, ParticleStatsGroupAttributes,
+    AncillaryGroupAttributes
+)
 
 from .dimension import Dimension
+from .plan import DimensionRule, VariableRule, ValidationPlan
+from .profiling import profiled
 from .variable import Variable
 
 # Define some data types for use in the group schema validators
@@ -34,17 +33,136 @@ UINTS = UINT8 + [f'<uint{i}>' for i in [16, 32, 64]]
 UINT64 = ['<uint64>']
 
 
-def core_group(func):
+@lru_cache(maxsize=256)
+def _units(units: str):
     """
-    A decorator which will only apply a validator to the 'core' group
+    Return a cached cfunits ``Units`` object
+
+    cfunits loads the UDUNITS2 library so is only imported when first needed.
     """
-    def wrapper(cls, values):
-        name = values.meta.name
-        if name != 'core':
-            return values
-        return func(cls, values)
-    return _randomize_object_name(wrapper)
-    
+    from cfunits import Units
+    return Units(units)
+
+
+def check_time_units_valid(var: Variable) -> None:
+    """
+    The 'timestamp' units must be a valid time units string
+    """
+    valid_unit = _units('seconds since 1970-01-01 00:00:00')
+    units = getattr(var.attributes, 'units', None)
+    if units is None:
+        raise ValueError(f'\'timestamp\' variable must have a units attribute')
+    if not _units(units).isvalid:
+        raise ValueError(f'\'timestamp\' variable units not valid (got {units})')
+    if not _units(units).equivalent(valid_unit):
+        raise ValueError(f'\'timestamp\' variable units must be equivalent to \'{valid_unit}\'')
+
+
+def check_timestamp_variable_standard_name(var: Variable) -> None:
+    """
+    The 'timestamp' variable must have a standard_name of 'time'
+    """
+    standard_name = getattr(var.attributes, 'standard_name', None)
+    if standard_name is None:
+        raise ValueError(f'\'timestamp\' variable must have a standard_name attribute')
+    if standard_name != 'time':
+        raise ValueError(f'\'timestamp\' variable standard_name must be \'time\'')
+
+
+def check_packed_image(var: Variable) -> None:
+    """
+    The 'image_packed' variable must give a known encoding, with a type
+    suited to it, and the number of pixels encoded
+    """
+    attributes = var.attributes
+    encoding = getattr(attributes, 'encoding', None)
+    if encoding not in ('bitpack', 'rle'):
+        raise ValueError('\'image_packed\' variable encoding must be '
+                         f'\'bitpack\' or \'rle\' (got {encoding})')
+    if getattr(attributes, 'unpacked_length', None) is None:
+        raise ValueError('\'image_packed\' variable must have an '
+                         'unpacked_length attribute')
+    types = UINT8 if encoding == 'bitpack' else UINTS
+    if var.meta.datatype not in types:
+        raise ValueError(f'\'image_packed\' variable with {encoding} encoding '
+                         f'must have a type in {types}')
+
+
+# Mandatory content of the 'core' group. Required dimensions must be
+# unlimited size, and the timestamp units and standard_name are only checked
+# in the group named 'core'. Binary pixels may instead be held in the
+# optional 'image_packed' variable, see ``standard.v0.data.packing``
+CORE_GROUP_PLAN = ValidationPlan(
+    'CoreGroup',
+    dimensions=[
+        DimensionRule('image_num', unlimited=True, group_name='core'),
+        DimensionRule('pixel', unlimited=True, group_name='core'),
+    ],
+    variables=[
+        VariableRule('image', ('pixel',), tuple(UINT8)),
+        VariableRule('timestamp', ('image_num',), tuple(UINT64),
+                     checks=(check_time_units_valid,
+                             check_timestamp_variable_standard_name),
+                     group_name='core'),
+        VariableRule('startpixel', ('image_num',), tuple(UINTS)),
+        VariableRule('width', ('image_num',), tuple(UINTS)),
+        VariableRule('height', ('image_num',), tuple(UINTS)),
+        VariableRule('overload', types=tuple(INT8)),
+        VariableRule('image_packed', ('packed_pixel',),
+                     checks=(check_packed_image,), required=False),
+    ],
+)
+
+# Mandatory content of the optional 'particle_stats' group, which holds
+# statistics of each image derived from the 'core' group, see
+# ``standard.v0.data.stats``
+PARTICLE_STATS_GROUP_PLAN = ValidationPlan(
+    'ParticleStatsGroup',
+    dimensions=[
+        DimensionRule('image_num'),
+    ],
+    variables=[
+        VariableRule('shaded_pixels', ('image_num',), tuple(UINTS)),
+        VariableRule('x_extent', ('image_num',), tuple(UINTS)),
+        VariableRule('y_extent', ('image_num',), tuple(UINTS)),
+        VariableRule('max_dimension', ('image_num',), tuple(FLOATS)),
+        VariableRule('edge_touch', ('image_num',), tuple(INT8)),
+    ],
+)
+
+# Content of the optional 'ancillary' group, which holds flags and other
+# values of each image derived from the 'core' group. Its variables are all
+# optional, see ``standard.v0.data.duplicates``
+ANCILLARY_GROUP_PLAN = ValidationPlan(
+    'AncillaryGroup',
+    dimensions=[
+        DimensionRule('image_num'),
+    ],
+    variables=[
+        VariableRule('image_hash', ('image_num',), tuple(UINT64),
+                     required=False),
+        VariableRule('duplicate', ('image_num',), tuple(INT8),
+                     required=False),
+    ],
+)
+
+# Mandatory content of the 'imager' group
+IMAGER_GROUP_PLAN = ValidationPlan(
+    'ImagerGroup',
+    dimensions=[
+        DimensionRule('array_dimensions', sizes=(1, 2)),
+        DimensionRule('pixel_colors'),
+    ],
+    groups=['core'],
+    variables=[
+        VariableRule('color_level', ('pixel_colors',), tuple(FLOATS)),
+        VariableRule('array_size', ('array_dimensions',), tuple(INTS)),
+        VariableRule('image_size', ('array_dimensions',), tuple(INTS)),
+        VariableRule('resolution', ('array_dimensions',), tuple(FLOATS)),
+        VariableRule('wavelength', types=tuple(FLOATS)),
+        VariableRule('pathlength', types=tuple(FLOATS)),
+    ],
+)
 
 
 class GroupMeta(BaseModel):
@@ -89,87 +207,12 @@ class CoreGroup(BaseModel, GroupNetCDFMixin):
     variables: list[Variable]
     groups: Optional[list[GenericGroup]] = None
 
-    # Ensure that the 'core' group has the required variables
-    check_for_image_variable = validator(variable_exists('image'))
-    check_for_timestamp_variable = validator(variable_exists('timestamp'))
-    check_for_startpixel_variable = validator(variable_exists('startpixel'))
-    check_for_width_variable = validator(variable_exists('width'))
-    check_for_height_variable = validator(variable_exists('height'))
-    check_for_overload_variable = validator(variable_exists('overload'))
-
-    # Ensure that the 'core' group has the required dimensions
-    check_for_image_num_dimension = validator(dimension_exists('image_num'))
-    check_for_pixel_dimension = validator(dimension_exists('pixel'))
-
-    # Ensure that variables have the correct dimensions
-    check_image_dims = validator(variable_has_dimensions('image', ['pixel']))
-    check_timestamp_dims = validator(variable_has_dimensions('timestamp', ['image_num']))
-    check_startpixel_dims = validator(variable_has_dimensions('startpixel', ['image_num']))
-    check_width_dims = validator(variable_has_dimensions('width', ['image_num']))
-    check_height_dims = validator(variable_has_dimensions('height', ['image_num']))
-    
-    # Check that variables have the correct type
-    image_has_correct_type = validator(variable_has_types('image', UINT8))
-    timestamp_has_correct_type = validator(variable_has_types('timestamp', UINT64))
-    startpixel_has_correct_type = validator(variable_has_types('startpixel', UINTS))
-    width_has_correct_type = validator(variable_has_types('width', UINTS))
-    height_has_correct_type = validator(variable_has_types('height', UINTS))
-    overload_has_correct_type = validator(variable_has_types('overload', INT8))
-
-    # Ensure that required dimensions are unlimited size
-    @validator
-    @core_group
-    def check_unlimited_dimensions(cls, values):
-        dimensions = values.dimensions
-        if dimensions is None:
-            return values # No dimensions to check - this will be caught in the dimension_exists validator
-        name = values.meta.name
-        for dim in dimensions:
-            if dim.name in ['image_num', 'pixel']:
-                if dim.size != None:
-                    raise ValueError(f'{name} - The \'{dim.name}\' dimension must be unlimited size')
-        return values
-
-    @validator 
-    @core_group
-    def check_time_units_valid(cls, values):
-        try:
-            variables = values.variables
-        except Exception:
-            variables = []
-        valid_unit = Units('seconds since 1970-01-01 00:00:00')
-        if variables is None:
-            return values
-        for var in variables:
-            if var.meta.name == 'timestamp':
-                units = getattr(var.attributes, 'units', None)
-                if units is None:
-                    raise ValueError(f'\'timestamp\' variable must have a units attribute')
-                if not Units(units).isvalid:
-                    raise ValueError(f'\'timestamp\' variable units not valid (got {units})')
-                if not Units(units).equivalent(valid_unit):
-                    raise ValueError(f'\'timestamp\' variable units must be equivalent to \'{valid_unit}\'')
-        return values
-
-    @validator
-    @core_group
-    def check_timestamp_variable_standard_name(cls, values):
-        try:
-            variables = values.variables
-        except Exception:
-            variables = []
-        if variables is None:
-            return values
-        for var in variables:
-            if var.meta.name == 'timestamp':
-                standard_name = getattr(var.attributes, 'standard_name', None)
-                if standard_name is None:
-                    raise ValueError(f'\'timestamp\' variable must have a standard_name attribute')
-                if standard_name != 'time':
-                    raise ValueError(f'\'timestamp\' variable standard_name must be \'time\'')
-        return values
+    # Ensure that the 'core' group has the required dimensions and variables
+    # with the correct dimensions and types
+    check_core_group_plan = validator(CORE_GROUP_PLAN.validator())
     
     @substitutor
+    @profiled('CoreGroup.substitute_time_units')
     def substitute_time_units(cls, values):
         """
         Replace the timestamp units with a valid units string if it is specified
@@ -185,6 +228,38 @@ class CoreGroup(BaseModel, GroupNetCDFMixin):
         return values
 
 
+class ParticleStatsGroup(BaseModel, GroupNetCDFMixin):
+    model_config = ConfigDict(
+        title='Particle Statistics Group Schema'
+    )
+
+    meta: GroupMeta
+    attributes: ParticleStatsGroupAttributes
+    dimensions: list[Dimension]
+    variables: list[Variable]
+    groups: Optional[list[GenericGroup]] = None
+
+    # Ensure that the statistics are all given for each image
+    check_particle_stats_group_plan = validator(
+        PARTICLE_STATS_GROUP_PLAN.validator()
+    )
+
+
+class AncillaryGroup(BaseModel, GroupNetCDFMixin):
+    model_config = ConfigDict(
+        title='Ancillary Group Schema'
+    )
+
+    meta: GroupMeta
+    attributes: AncillaryGroupAttributes
+    dimensions: list[Dimension]
+    variables: list[Variable]
+    groups: Optional[list[GenericGroup]] = None
+
+    # Ensure that any ancillary values are given for each image
+    check_ancillary_group_plan = validator(ANCILLARY_GROUP_PLAN.validator())
+
+
 class ImagerGroup(BaseModel, GroupNetCDFMixin):
     model_config = ConfigDict(
         title='Imager Group Schema'
@@ -193,56 +268,33 @@ class ImagerGroup(BaseModel, GroupNetCDFMixin):
     meta: GroupMeta
     attributes: ImagerGroupAttributes
     dimensions: list[Dimension]
-    groups: list[CoreGroup | GenericGroup]
+    groups: list[CoreGroup | ParticleStatsGroup | AncillaryGroup
+                 | GenericGroup]
     variables: list[Variable]
 
-    # Ensure that the 'core' group exists
-    check_core_group_exists = validator(group_exists('core'))
-
-    # Ensure that the 'imager' group has the correct variables
-    check_color_level_variable_exists = validator(variable_exists('color_level'))
-    check_array_size_variable_exists = validator(variable_exists('array_size'))
-    check_image_size_variable_exists = validator(variable_exists('image_size'))
-    check_resolution_variable_exists = validator(variable_exists('resolution'))
-    check_wavelength_variable_exists = validator(variable_exists('wavelength'))
-    check_pathlength_variable_exists = validator(variable_exists('pathlength'))
-
-    # Ensure that the 'imager' group has the correct dimensions
-    check_array_dimensions_dimension_exists = validator(dimension_exists('array_dimensions'))
-    check_pixel_colors_dimension_exists = validator(dimension_exists('pixel_colors'))
-
-    # Ensure required variables have the correct dimensions
-    check_color_level_dims = validator(variable_has_dimensions('color_level', ['pixel_colors']))
-    check_array_size_dims = validator(variable_has_dimensions('array_size', ['array_dimensions']))
-    check_image_size_dims = validator(variable_has_dimensions('image_size', ['array_dimensions']))
-    check_resolution_dims = validator(variable_has_dimensions('resolution', ['array_dimensions']))
-    
-    # Check that variables have the correct type
-    check_color_level_has_correct_type = validator(variable_has_types('color_level', FLOATS))
-    check_array_size_has_correct_type = validator(variable_has_types('array_size', INTS))
-    check_image_size_has_correct_type = validator(variable_has_types('image_size', INTS))
-    check_resolution_has_correct_type = validator(variable_has_types('resolution', FLOATS))
-    check_wavelength_has_correct_type = validator(variable_has_types('wavelength', FLOATS))
-    check_pathlength_has_correct_type = validator(variable_has_types('pathlength', FLOATS))
+    # Ensure that the 'imager' group has the 'core' group and the required
+    # dimensions and variables with the correct dimensions and types
+    check_imager_group_plan = validator(IMAGER_GROUP_PLAN.validator())
 
     @validator
-    def array_dimensions_dimension_size_1_or_2(cls, values):
+    @profiled('ImagerGroup.check_packed_image_colors')
+    def check_packed_image_colors(cls, values):
         """
-        array_dimensions dimension must have a size of 1 or 2
+        Only binary images, with 2 pixel colors, may be packed
         """
-        dims = values.dimensions
-
-        fail_msg = (f'The \'array_dimensions\' dimension must have a ' 
-                    'size of 1 or 2')
-
-        try:
-            for dim in dims:
-                if dim.name == 'array_dimensions':
-                    if dim.size not in [1, 2]:
-                        raise ValueError(fail_msg)
-                    return values
-        except Exception:
-            # No dimensions defined, fall through to fail
-            pass
-
-        raise ValueError(fail_msg)
+        packed = any(
+            var.meta.name == 'image_packed'
+            for group in values.groups if group.meta.name == 'core'
+            for var in group.variables
+        )
+        if not packed:
+            return values
+
+        for dim in values.dimensions:
+            if dim.name == 'pixel_colors' and dim.size != 2:
+                raise ValueError(
+                    f'{values.meta.name} - The \'pixel_colors\' dimension '
+                    'must have a size of 2 when the core group has an '
+                    '\'image_packed\' variable'
+                )
+        return values
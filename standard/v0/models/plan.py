@@ -0,0 +1,193 @@
+"""
+Compiled validation plans for groups with mandatory content.
+
+Declaring one ``validator(variable_exists(...))`` per requirement means every
+check scans the group's variables or dimensions again. A ``ValidationPlan``
+collects the requirements of a model class once, at class definition, and
+checks them all against a single name index built for each group instance.
+Dimension, type, and content checks of a variable are skipped when the
+variable itself is missing, so only the root cause is reported.
+"""
+
+from __future__ import annotations
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Optional, Sequence
+
+from vocal.validation import _randomize_object_name
+
+from . import profiling
+
+__all__ = ['DimensionRule', 'VariableRule', 'ValidationPlan', 'GroupIndex']
+
+
+@dataclass(frozen=True)
+class DimensionRule:
+    """Requirements of a mandatory dimension
+
+    Args:
+        name: Name of the dimension.
+        unlimited: The dimension must be of unlimited size.
+        sizes: Allowed sizes of the dimension, any size if ``None``.
+        group_name: Only check ``unlimited`` and ``sizes`` in groups of this
+            name, always check them if ``None``.
+    """
+    name: str
+    unlimited: bool = False
+    sizes: Optional[tuple[int, ...]] = None
+    group_name: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class VariableRule:
+    """Requirements of a mandatory, or optional, variable
+
+    Args:
+        name: Name of the variable.
+        dimensions: Required dimensions of the variable, not checked if
+            ``None``.
+        types: Allowed datatypes of the variable, not checked if ``None``.
+        checks: Further checks of the variable. Each is called with the
+            variable and raises a ``ValueError`` if the check fails.
+        group_name: Only apply ``checks`` in groups of this name, always
+            apply them if ``None``.
+        required: The variable must exist. If False, the other requirements
+            are only checked when it does.
+    """
+    name: str
+    dimensions: Optional[tuple[str, ...]] = None
+    types: Optional[tuple[str, ...]] = None
+    checks: tuple[Callable[[Any], None], ...] = ()
+    group_name: Optional[str] = None
+    required: bool = True
+
+
+class GroupIndex:
+    """Name indices of the dimensions, variables, and groups of a group"""
+
+    def __init__(self, values: Any) -> None:
+        self.name = values.meta.name
+        self.dimensions = {d.name: d
+                           for d in getattr(values, 'dimensions', None) or []}
+        self.variables = {v.meta.name: v
+                          for v in getattr(values, 'variables', None) or []}
+        self.groups = {g.meta.name: g
+                       for g in getattr(values, 'groups', None) or []}
+
+
+class ValidationPlan:
+    """Mandatory content of a group, checked against one index per instance
+
+    Each rule is compiled into a step when the plan is created. While
+    ``profiling.profile`` is active the time taken by each step, and by
+    building the index, is recorded under the name of the plan.
+
+    Args:
+        name: Name of the plan used in profiling reports, eg the model name.
+        dimensions: Rules for the mandatory dimensions.
+        variables: Rules for the mandatory and optional variables.
+        groups: Names of mandatory sub-groups.
+    """
+
+    def __init__(self,
+                 name: str,
+                 dimensions: Sequence[DimensionRule] = (),
+                 variables: Sequence[VariableRule] = (),
+                 groups: Sequence[str] = ()) -> None:
+        self.name = name
+        self.dimensions = tuple(dimensions)
+        self.variables = tuple(variables)
+        self.groups = tuple(groups)
+
+        self.steps: list[tuple[str, Callable]] = []
+        for dim in self.dimensions:
+            self.steps.append((f'{name}.dimension.{dim.name}',
+                               partial(_check_dimension, dim)))
+        for group in self.groups:
+            self.steps.append((f'{name}.group.{group}',
+                               partial(_check_group, group)))
+        for var in self.variables:
+            self.steps.append((f'{name}.variable.{var.name}',
+                               partial(_check_variable, var)))
+
+    def index(self, values: Any) -> GroupIndex:
+        """Return the name index of a group instance"""
+        profiler = profiling.active()
+        if profiler is None:
+            return GroupIndex(values)
+        start = time.perf_counter()
+        index = GroupIndex(values)
+        profiler.add(f'{self.name}.index', time.perf_counter() - start)
+        return index
+
+    def errors(self, index: GroupIndex) -> list[str]:
+        """Return all failures of the plan for an indexed group"""
+        errors: list[str] = []
+        profiler = profiling.active()
+        for name, step in self.steps:
+            if profiler is None:
+                step(index, errors)
+                continue
+            start = time.perf_counter()
+            step(index, errors)
+            profiler.add(name, time.perf_counter() - start)
+        return errors
+
+    def validator(self) -> Callable:
+        """Return a function to be wrapped by ``vocal.validation.validator``"""
+        def check_plan(cls, values):
+            errors = self.errors(self.index(values))
+            if errors:
+                raise ValueError('\n'.join(errors))
+            return values
+        return _randomize_object_name(check_plan)
+
+
+def _check_dimension(rule: DimensionRule, index: GroupIndex,
+                     errors: list[str]) -> None:
+    name = index.name
+    dim = index.dimensions.get(rule.name)
+    if dim is None:
+        errors.append(f'{name} - The \'{rule.name}\' dimension does not exist')
+        return
+    if rule.group_name not in (None, name):
+        return
+    if rule.unlimited and dim.size is not None:
+        errors.append(f'{name} - The \'{rule.name}\' dimension '
+                      'must be unlimited size')
+    if rule.sizes is not None and dim.size not in rule.sizes:
+        sizes = ' or '.join(str(s) for s in rule.sizes)
+        errors.append(f'{name} - The \'{rule.name}\' dimension '
+                      f'must have a size of {sizes}')
+
+
+def _check_group(group: str, index: GroupIndex, errors: list[str]) -> None:
+    if group not in index.groups:
+        errors.append(f'{index.name} - The \'{group}\' group does not exist')
+
+
+def _check_variable(rule: VariableRule, index: GroupIndex,
+                    errors: list[str]) -> None:
+    name = index.name
+    var = index.variables.get(rule.name)
+    if var is None:
+        if rule.required:
+            errors.append(f'{name} - The \'{rule.name}\' variable '
+                          'does not exist')
+        return
+    if (rule.dimensions is not None
+            and list(var.dimensions) != list(rule.dimensions)):
+        errors.append(f'{name} - The \'{rule.name}\' variable must have '
+                      f'dimensions {list(rule.dimensions)} '
+                      f'(got {list(var.dimensions)})')
+    if rule.types is not None and var.meta.datatype not in rule.types:
+        errors.append(f'{name} - The \'{rule.name}\' variable must have a '
+                      f'type in {list(rule.types)} (got {var.meta.datatype})')
+    if rule.group_name not in (None, name):
+        return
+    for check in rule.checks:
+        try:
+            check(var)
+        except ValueError as err:
+            errors.append(f'{name} - {err}')
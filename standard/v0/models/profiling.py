@@ -0,0 +1,117 @@
+"""
+Opt-in timing of the validators and substitutors of the models.
+
+While a ``profile`` context is active, each validation plan rule, plan, and
+substitutor records its number of calls and cumulative wall time, eg
+
+.. code-block:: python
+
+    with profile() as profiler:
+        Dataset.model_validate(structure)
+    print(profiler.table())
+
+Outside of a ``profile`` context the only cost is a check of whether
+profiling is active. The active profiler is held in a context variable, so
+a ``profile`` context only records validation in its own thread or task.
+Reports from several profilers, eg from different worker processes, can be
+combined with ``Profiler.merge``.
+"""
+
+import contextlib
+import contextvars
+import json
+import time
+from typing import Callable, Iterator, Optional
+
+from vocal.validation import _randomize_object_name
+
+__all__ = ['Profiler', 'profile', 'active', 'profiled']
+
+
+class Profiler:
+    """Call counts and cumulative wall times of named validators"""
+
+    def __init__(self) -> None:
+        self.calls: dict[str, int] = {}
+        self.times: dict[str, float] = {}
+
+    def add(self, name: str, elapsed: float) -> None:
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.times[name] = self.times.get(name, 0.) + elapsed
+
+    def merge(self, report: list[dict]) -> None:
+        """Add the timings of a report from another profiler"""
+        for row in report:
+            name = row['name']
+            self.calls[name] = self.calls.get(name, 0) + row['calls']
+            self.times[name] = self.times.get(name, 0.) + row['total']
+
+    def report(self) -> list[dict]:
+        """Return the timings, slowest first"""
+        return [
+            {'name': name,
+             'calls': self.calls[name],
+             'total': self.times[name],
+             'mean': self.times[name] / self.calls[name]}
+            for name in sorted(self.times, key=self.times.get, reverse=True)
+        ]
+
+    def to_json(self, **kwargs) -> str:
+        """Return the report as a JSON string"""
+        return json.dumps(self.report(), **kwargs)
+
+    def table(self) -> str:
+        """Return the report as a text table"""
+        rows = self.report()
+        width = max([len(r['name']) for r in rows] + [4])
+        lines = [f'{"name":<{width}}  {"calls":>8}  {"total [s]":>12}  '
+                 f'{"mean [s]":>12}']
+        lines.append('-' * len(lines[0]))
+        lines.extend(f'{r["name"]:<{width}}  {r["calls"]:>8}  '
+                     f'{r["total"]:>12.6f}  {r["mean"]:>12.3e}'
+                     for r in rows)
+        return '\n'.join(lines)
+
+
+_active: contextvars.ContextVar[Optional[Profiler]] = contextvars.ContextVar(
+    'profiler', default=None
+)
+
+
+def active() -> Optional[Profiler]:
+    """Return the profiler of the active ``profile`` context, if any"""
+    return _active.get()
+
+
+@contextlib.contextmanager
+def profile(profiler: Optional[Profiler] = None) -> Iterator[Profiler]:
+    """Record validator timings within the context
+
+    Args:
+        profiler: Profiler to add timings to. A new one is created if
+            ``None``.
+    """
+    profiler = profiler if profiler is not None else Profiler()
+    token = _active.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _active.reset(token)
+
+
+def profiled(name: str) -> Callable:
+    """Decorator recording the timing of a ``(cls, values)`` validator"""
+    def decorator(func):
+        def wrapper(cls, values):
+            profiler = _active.get()
+            if profiler is None:
+                return func(cls, values)
+            start = time.perf_counter()
+            try:
+                return func(cls, values)
+            finally:
+                profiler.add(name, time.perf_counter() - start)
+        wrapper.__doc__ = func.__doc__
+        return _randomize_object_name(wrapper)
+    return decorator
+
@@ -0,0 +1,96 @@
+"""
+Shared fixtures of the tests of the SPIF standard and its data tools.
+
+Run from the repository root with
+
+.. code-block:: shell
+
+    ~/spif$ python -m pytest tests
+
+Tests of the models, and of tools that validate files with them, are skipped
+if ``vocal`` is not installed.
+"""
+
+import os
+import sys
+from typing import Optional, Sequence
+
+import numpy as np
+import pytest
+
+# Make the standard importable when run from anywhere
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from standard.v0.data import SpifWriter  # noqa: E402
+
+TIMESTAMP_UNITS = 'nanoseconds since 2024-01-01 00:00:00 +0000'
+
+
+def random_images(n: int, seed: int = 0, max_width: int = 16,
+                  max_height: int = 12, colors: int = 2) -> list[np.ndarray]:
+    """Return images of random sizes and pixels, some of them empty"""
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(n):
+        shape = (rng.integers(0, max_height + 1),
+                 rng.integers(1, max_width + 1))
+        images.append(rng.integers(0, colors, shape).astype(np.uint8))
+    return images
+
+
+def write_spif(filename: str,
+               images: Sequence[np.ndarray],
+               timestamps: Optional[Sequence[int]] = None,
+               encoding: Optional[str] = None,
+               image_chunk: int = 8,
+               pixel_chunk: int = 64,
+               block: bool = False) -> None:
+    """Write images to a file with a single imager group, 'imager_1'
+
+    Args:
+        filename: Name of the file to create.
+        images: Images with shape ``(height, width)``.
+        timestamps: Timestamp of each image. Default is the image number.
+        encoding: Encoding of the packed pixels, if any.
+        image_chunk: Chunk length of the 'image_num' variables.
+        pixel_chunk: Chunk length of the pixels.
+        block: Write all the images with one call of ``extend`` rather than
+            one ``append`` each.
+    """
+    if timestamps is None:
+        timestamps = np.arange(len(images), dtype=np.uint64)
+    with SpifWriter(filename, image_chunk=image_chunk,
+                    pixel_chunk=pixel_chunk) as writer:
+        imager = writer.create_imager(
+            'imager_1',
+            color_level=[0, 0.5],
+            array_size=[64],
+            resolution=[10.],
+            wavelength=785.,
+            pathlength=63.,
+            timestamp_units=TIMESTAMP_UNITS,
+            encoding=encoding,
+        )
+        if block:
+            imager.extend(
+                np.concatenate([np.zeros(0, np.uint8)]
+                               + [i.ravel() for i in images]),
+                [i.shape[1] for i in images],
+                [i.shape[0] for i in images],
+                timestamps,
+            )
+        else:
+            for image, timestamp in zip(images, timestamps):
+                imager.append(image, timestamp)
+
+
+@pytest.fixture
+def spif_file(tmp_path):
+    """Factory of files written with ``write_spif`` in a temporary directory"""
+    def factory(images, name='test.nc', **kwargs):
+        filename = str(tmp_path / name)
+        write_spif(filename, images, **kwargs)
+        return filename
+    return factory
@@ -0,0 +1,74 @@
+"""
+Batch compliance checking and its result cache.
+"""
+
+import json
+import os
+
+import pytest
+
+pytest.importorskip('vocal')
+
+from standard.v0.data.batch import (  # noqa: E402
+    ResultCache, check_files, find_files, source_hash,
+)
+from standard.v0.data.sources import tree_hash  # noqa: E402
+
+
+@pytest.mark.parametrize('content', [None, '', '{"truncated": ', '[1, 2'])
+def test_unusable_cache_is_empty(tmp_path, content):
+    filename = str(tmp_path / 'cache.json')
+    if content is not None:
+        with open(filename, 'w') as f:
+            f.write(content)
+    cache = ResultCache(filename)
+    assert cache.entries == {}
+    cache.save()
+    with open(filename) as f:
+        assert json.load(f) == {}
+
+
+def test_cache_key(tmp_path):
+    path = tmp_path / 'a.nc'
+    path.write_bytes(b'x')
+    cache = ResultCache(str(tmp_path / 'cache.json'))
+    result = {'path': str(path), 'ok': True, 'errors': []}
+    cache.put(str(path), result, check_data=False)
+    assert cache.get(str(path), check_data=False) == result
+    assert cache.get(str(path), check_data=True) is None
+
+    # A changed file is checked again
+    path.write_bytes(b'xy')
+    assert cache.get(str(path), check_data=False) is None
+
+    # Results of missing files are not kept
+    cache.put(str(tmp_path / 'missing.nc'), result)
+    assert len(cache.entries) == 1
+
+
+def test_source_hash_is_shared():
+    standard_dir = os.path.join(os.path.dirname(__file__), '..', 'standard',
+                                'v0')
+    assert source_hash() == tree_hash(os.path.abspath(standard_dir))
+
+
+@pytest.mark.parametrize('n_files', [1, 3])
+def test_bad_files_do_not_abort(tmp_path, n_files):
+    paths = []
+    for n in range(n_files):
+        path = tmp_path / 'archive' / f'{n}.nc'
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(b'not a netCDF file')
+        paths.append(str(path))
+    assert find_files([str(tmp_path / 'archive')]) == paths
+
+    cache = ResultCache(str(tmp_path / 'cache.json'))
+    results = check_files(paths, max_workers=2, cache=cache)
+    assert [r['path'] for r in results] == paths
+    assert not any(r['ok'] for r in results)
+    assert all('could not be' in r['errors'][0] for r in results)
+
+    # The cache was saved, and its results are reused
+    reloaded = ResultCache(cache.filename)
+    assert len(reloaded.entries) == n_files
+    assert check_files(paths, cache=reloaded) == results
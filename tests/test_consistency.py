@@ -0,0 +1,104 @@
+"""
+Data-level consistency checks of deliberately corrupted core groups.
+"""
+
+import netCDF4  # type: ignore
+import numpy as np
+import pytest
+
+from conftest import random_images
+
+from standard.v0.data import (
+    check_core_data, check_derived_lengths, check_data, raw,
+)
+
+N_IMAGES = 40
+
+
+@pytest.fixture
+def corrupt(spif_file):
+    """Write a consistent file, apply a change to its core group, and return
+    the errors of ``check_core_data``"""
+    images = [image for image in random_images(N_IMAGES, seed=2)
+              if image.size] + [np.ones((2, 4), np.uint8)]
+
+    def check(change, encoding=None, chunk_size=8):
+        filename = spif_file(images, encoding=encoding)
+        with netCDF4.Dataset(filename, 'a') as nc:
+            core = nc['imager_1/core']
+            for var in core.variables.values():
+                raw(var)
+            change(core)
+        with netCDF4.Dataset(filename) as nc:
+            return check_core_data(nc['imager_1'], chunk_size=chunk_size)
+    return check
+
+
+def test_consistent(corrupt):
+    assert corrupt(lambda core: None) == []
+
+
+@pytest.mark.parametrize('encoding', [None, 'bitpack', 'rle'])
+def test_first_image_not_at_zero(corrupt, encoding):
+    def change(core):
+        core['startpixel'][0] = 1
+    errors = corrupt(change, encoding)
+    assert any('first image does not start at pixel 0' in e for e in errors)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 8, 1000])
+def test_startpixel_decreases(corrupt, chunk_size):
+    def change(core):
+        core['startpixel'][8] = 0
+    errors = corrupt(change, chunk_size=chunk_size)
+    assert any('startpixel decreases for image_num 8' in e for e in errors)
+    assert any('does not start at the end of the previous image' in e
+               for e in errors)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 8, 1000])
+def test_width_changed(corrupt, chunk_size):
+    # Image 8 is one pixel wider, so image 9 no longer follows it
+    def change(core):
+        core['width'][8] = core['width'][8] + 1
+    errors = corrupt(change, chunk_size=chunk_size)
+    assert any('previous image for image_num 9' in e for e in errors)
+
+
+def test_height_of_last_image(corrupt):
+    def change(core):
+        core['height'][-1] = core['height'][-1] + 5
+    errors = corrupt(change)
+    assert any('beyond the end' in e for e in errors)
+
+
+def test_pixels_after_last_image(corrupt):
+    def change(core):
+        core['height'][-1] = 1
+    errors = corrupt(change)
+    assert any('pixels after the end of the last image' in e
+               for e in errors)
+
+
+def test_errors_are_limited(corrupt):
+    # Every image is one pixel wider, so none follows the previous one
+    def change(core):
+        core['width'][:] = core['width'][:] + 1
+    errors = corrupt(change)
+    contiguous = [e for e in errors if 'previous image' in e]
+    assert len(contiguous) == 1
+    assert '(and' in contiguous[0]
+
+
+def test_derived_group_length(spif_file):
+    filename = spif_file(random_images(10, seed=4))
+    with netCDF4.Dataset(filename, 'a') as nc:
+        group = nc['imager_1'].createGroup('particle_stats')
+        group.createDimension('image_num', None)
+        group.createVariable('shaded_pixels', np.uint32,
+                             ('image_num',))[:9] = np.arange(9)
+    with netCDF4.Dataset(filename) as nc:
+        assert check_derived_lengths(nc['imager_1']) == [
+            '/imager_1/particle_stats - 9 entries for 10 images']
+        assert check_data(nc)['imager_1'] == check_derived_lengths(
+            nc['imager_1'])
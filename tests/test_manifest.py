@@ -0,0 +1,108 @@
+"""
+The manifest of the incremental documentation build.
+"""
+
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+docs_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..',
+                                        'docs', 'source'))
+if docs_dir not in sys.path:
+    sys.path.insert(0, docs_dir)
+
+preproc = pytest.importorskip('preproc')
+Manifest = preproc.Manifest
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return Manifest(str(tmp_path / 'manifest.json'))
+
+
+def _read(filename):
+    with open(filename) as f:
+        return f.read()
+
+
+def test_write_string_and_chunks(manifest, tmp_path):
+    a, b = str(tmp_path / 'a.rst'), str(tmp_path / 'b.rst')
+    assert manifest.write(a, 'title\n=====\n')
+    assert manifest.write(b, (f'line {n}\n' for n in range(1000)))
+    assert _read(a) == 'title\n=====\n'
+    assert _read(b) == ''.join(f'line {n}\n' for n in range(1000))
+    assert manifest.is_current(a) and manifest.is_current(b)
+    assert manifest.files['b.rst'] == preproc._sha256(_read(b))
+    assert not os.path.exists(b + '.tmp')
+
+
+def test_unchanged_file_is_not_rewritten(manifest, tmp_path):
+    a = str(tmp_path / 'a.rst')
+    manifest.write(a, iter(['one\n', 'two\n']))
+    mtime = os.stat(a).st_mtime_ns
+    manifest.save()
+
+    reloaded = Manifest(manifest.filename)
+    assert not reloaded.write(a, 'one\ntwo\n')
+    assert os.stat(a).st_mtime_ns == mtime
+    assert not os.path.exists(a + '.tmp')
+
+    assert reloaded.write(a, 'one\nthree\n')
+    assert _read(a) == 'one\nthree\n'
+
+    # A file changed outside the build is not current, so its product is
+    # rendered again
+    with open(a, 'w') as f:
+        f.write('edited\n')
+    assert not reloaded.is_current(a)
+
+
+def test_failed_write_keeps_file(manifest, tmp_path):
+    a = str(tmp_path / 'a.rst')
+    manifest.write(a, 'original\n')
+
+    def chunks():
+        yield 'partial\n'
+        raise RuntimeError('render failed')
+
+    with pytest.raises(RuntimeError):
+        manifest.write(a, chunks())
+    assert _read(a) == 'original\n'
+    assert not os.path.exists(a + '.tmp')
+
+
+def test_concurrent_writes(manifest, tmp_path):
+    filenames = [str(tmp_path / f'{n}.rst') for n in range(50)]
+    threads = [threading.Thread(target=manifest.write, args=(f, f * 100))
+               for f in filenames]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(manifest.files) == len(manifest.used) == 50
+    assert all(manifest.is_current(f) for f in filenames)
+
+
+def test_remove_unused(manifest, tmp_path):
+    for name in ('kept.rst', 'stale.rst', 'skipped.rst'):
+        manifest.write(str(tmp_path / name), name)
+    manifest.set_source('product', 'abc', [str(tmp_path / 'stale.rst')])
+    manifest.save()
+    # Left by a build from before the manifest was kept
+    (tmp_path / 'untracked.rst').write_text('old')
+
+    manifest = Manifest(manifest.filename)
+    manifest.write(str(tmp_path / 'kept.rst'), 'kept.rst')
+    manifest.keep([str(tmp_path / 'skipped.rst')])
+    assert manifest.remove_unused() == ['stale.rst', 'untracked.rst']
+    manifest.save()
+
+    assert sorted(os.listdir(tmp_path)) == ['kept.rst', 'manifest.json',
+                                            'skipped.rst']
+    with open(manifest.filename) as f:
+        data = json.load(f)
+    assert sorted(data['files']) == ['kept.rst', 'skipped.rst']
+    assert data['sources'] == {}
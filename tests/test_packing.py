@@ -0,0 +1,128 @@
+"""
+Bit-packed and run-length encodings of binary pixels.
+"""
+
+import netCDF4  # type: ignore
+import numpy as np
+import pytest
+
+from standard.v0.data import (
+    PackedPixels, decode_rle, encode_rle, pack_bits, pixel_source,
+    unpack_bits,
+)
+
+
+def _pixels(n, seed=0):
+    rng = np.random.default_rng(seed)
+    pixels = (rng.random(n) < 0.3).astype(np.uint8)
+    # Long runs of each value as well as short ones
+    pixels[100:400] = 1
+    pixels[500:900] = 0
+    return pixels
+
+
+@pytest.mark.parametrize('n', [0, 1, 7, 8, 9, 1000])
+def test_bitpack_round_trip(n):
+    pixels = _pixels(n)
+    packed = pack_bits(pixels)
+    assert len(packed) == -(-n // 8)
+    np.testing.assert_array_equal(unpack_bits(packed, n), pixels)
+    for offset in range(min(n, 9)):
+        np.testing.assert_array_equal(
+            unpack_bits(packed, n - offset, offset), pixels[offset:])
+
+
+@pytest.mark.parametrize('pixels', [[], [0], [1], [1, 1, 0], [0, 0, 1, 1]])
+def test_rle_round_trip(pixels):
+    pixels = np.array(pixels, dtype=np.uint8)
+    runs = encode_rle(pixels)
+    if pixels.size:
+        assert runs.sum() == pixels.size
+        # Runs alternate starting with a, possibly empty, run of 0
+        assert runs[0] > 0 or pixels[0] == 1
+    np.testing.assert_array_equal(decode_rle(runs), pixels)
+
+
+def test_non_binary():
+    with pytest.raises(ValueError):
+        pack_bits(np.array([0, 1, 2], dtype=np.uint8))
+    with pytest.raises(ValueError):
+        encode_rle(np.array([0, 3], dtype=np.uint8))
+
+
+@pytest.fixture
+def packed_var(tmp_path):
+    """Write pixels to a packed variable and return it open for reading"""
+    datasets = []
+
+    def write(pixels, encoding, chunk):
+        filename = str(tmp_path / f'{encoding}_{chunk}.nc')
+        with netCDF4.Dataset(filename, 'w') as nc:
+            nc.createDimension('packed_pixel', None)
+            if encoding == 'bitpack':
+                values, dtype = pack_bits(pixels), 'u1'
+            else:
+                values, dtype = encode_rle(pixels), 'u4'
+            var = nc.createVariable('image_packed', dtype, ('packed_pixel',),
+                                    chunksizes=(chunk,))
+            var[:] = values
+            var.encoding = encoding
+            var.unpacked_length = np.uint64(len(pixels))
+        nc = netCDF4.Dataset(filename, 'r')
+        datasets.append(nc)
+        return PackedPixels(nc['image_packed'])
+
+    yield write
+    for nc in datasets:
+        nc.close()
+
+
+@pytest.mark.parametrize('encoding', ['bitpack', 'rle'])
+@pytest.mark.parametrize('chunk', [3, 16, 4096])
+def test_packed_slices(packed_var, encoding, chunk):
+    pixels = _pixels(2000, seed=1)
+    source = packed_var(pixels, encoding, chunk)
+    assert len(source) == len(pixels)
+    np.testing.assert_array_equal(source[:], pixels)
+
+    # Slices starting and ending on and either side of every byte and run
+    # boundary in a stretch of the pixels
+    runs = np.cumsum(encode_rle(pixels))
+    edges = sorted(set(range(0, 64)) | set(runs[:40].tolist())
+                   | {399, 400, 401, 1999, 2000})
+    for start in edges:
+        for stop in (start, start + 1, start + 7, start + 8, start + 9,
+                     start + 300):
+            np.testing.assert_array_equal(source[start:stop],
+                                          pixels[start:stop])
+
+    rng = np.random.default_rng(2)
+    for start, stop in np.sort(rng.integers(0, 2001, (500, 2)), axis=1):
+        np.testing.assert_array_equal(source[start:stop], pixels[start:stop])
+
+    with pytest.raises(IndexError):
+        source[::2]
+
+
+def test_rle_reads_only_covered_chunks(packed_var):
+    pixels = _pixels(5000, seed=3)
+    source = packed_var(pixels, 'rle', 16)
+    n_runs = len(encode_rle(pixels))
+    assert len(source.block_ends) == -(-n_runs // 16)
+    assert int(source.block_ends[-1]) == len(pixels)
+
+    np.testing.assert_array_equal(source[2500:2510], pixels[2500:2510])
+    first, last, ends = source._decoded
+    assert last - first <= 1
+    assert len(ends) <= 32
+
+
+def test_pixel_source(tmp_path):
+    filename = str(tmp_path / 'plain.nc')
+    with netCDF4.Dataset(filename, 'w') as nc:
+        nc.createDimension('pixel', None)
+        nc.createVariable('image', 'u1', ('pixel',))[:] = np.arange(5)
+    with netCDF4.Dataset(filename) as nc:
+        source = pixel_source(nc)
+        assert not isinstance(source, PackedPixels)
+        np.testing.assert_array_equal(source[1:4], [1, 2, 3])
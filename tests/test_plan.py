@@ -0,0 +1,168 @@
+"""
+Validation plans of the models and their opt-in profiling.
+"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('vocal')
+
+from standard.v0.models.plan import (  # noqa: E402
+    DimensionRule, ValidationPlan, VariableRule,
+)
+from standard.v0.models.profiling import (  # noqa: E402
+    Profiler, active, profile, profiled,
+)
+
+
+def _group(name='core', dimensions=(), variables=(), groups=()):
+    """Return a stand-in for a validated group model"""
+    return SimpleNamespace(
+        meta=SimpleNamespace(name=name),
+        dimensions=[SimpleNamespace(name=n, size=s) for n, s in dimensions],
+        variables=[
+            SimpleNamespace(meta=SimpleNamespace(name=n, datatype=t),
+                            dimensions=d)
+            for n, d, t in variables
+        ],
+        groups=[SimpleNamespace(meta=SimpleNamespace(name=g))
+                for g in groups],
+    )
+
+
+def _not_empty(var):
+    if not var.dimensions:
+        raise ValueError(f'{var.meta.name} is a scalar')
+
+
+PLAN = ValidationPlan(
+    'Test',
+    dimensions=[DimensionRule('image_num', unlimited=True),
+                DimensionRule('array_dimensions', sizes=(1, 2),
+                              group_name='core')],
+    groups=['core'],
+    variables=[
+        VariableRule('timestamp', ('image_num',), ('<u8',)),
+        VariableRule('width', ('image_num',), ('<u2', '<u4'),
+                     checks=(_not_empty,), group_name='core'),
+        VariableRule('overload', ('image_num',), required=False),
+    ],
+)
+
+VALID = dict(
+    dimensions=[('image_num', None), ('array_dimensions', 2)],
+    variables=[('timestamp', ['image_num'], '<u8'),
+               ('width', ['image_num'], '<u2')],
+    groups=['core'],
+)
+
+
+def _errors(**kwargs):
+    return PLAN.errors(PLAN.index(_group(**{**VALID, **kwargs})))
+
+
+def test_valid():
+    assert _errors() == []
+    assert PLAN.validator()(None, _group(**VALID)).meta.name == 'core'
+
+
+def test_missing():
+    errors = _errors(dimensions=[], variables=[], groups=[])
+    assert errors == [
+        "core - The 'image_num' dimension does not exist",
+        "core - The 'array_dimensions' dimension does not exist",
+        "core - The 'core' group does not exist",
+        "core - The 'timestamp' variable does not exist",
+        "core - The 'width' variable does not exist",
+    ]
+    with pytest.raises(ValueError, match='\n'):
+        PLAN.validator()(None, _group(**{**VALID, 'variables': []}))
+
+
+def test_dimension_rules():
+    errors = _errors(dimensions=[('image_num', 10), ('array_dimensions', 3)])
+    assert errors == [
+        "core - The 'image_num' dimension must be unlimited size",
+        "core - The 'array_dimensions' dimension must have a size of 1 or 2",
+    ]
+    # Sizes are only checked in groups of the named group
+    errors = PLAN.errors(PLAN.index(_group(
+        'other', dimensions=[('image_num', None), ('array_dimensions', 3)],
+        variables=VALID['variables'], groups=['core'])))
+    assert errors == []
+
+
+def test_variable_rules():
+    errors = _errors(variables=[('timestamp', ['pixel'], '<f8'),
+                                ('width', [], '<u2'),
+                                ('overload', [], '<i1')])
+    assert errors == [
+        "core - The 'timestamp' variable must have dimensions ['image_num'] "
+        "(got ['pixel'])",
+        "core - The 'timestamp' variable must have a type in ['<u8'] "
+        "(got <f8)",
+        "core - The 'width' variable must have dimensions ['image_num'] "
+        "(got [])",
+        'core - width is a scalar',
+        "core - The 'overload' variable must have dimensions ['image_num'] "
+        "(got [])",
+    ]
+
+
+def test_profiled_plan():
+    assert active() is None
+    with profile() as profiler:
+        assert active() is profiler
+        _errors()
+        _errors()
+    assert active() is None
+
+    report = {row['name']: row for row in profiler.report()}
+    assert set(report) == {'Test.index'} | {name for name, _ in PLAN.steps}
+    assert all(row['calls'] == 2 for row in report.values())
+
+    # Outside a profile context nothing is recorded
+    _errors()
+    assert profiler.calls['Test.index'] == 2
+
+
+def test_profiled_decorator():
+    @profiled('Model.check')
+    def check(cls, values):
+        """Check the values"""
+        return values + 1
+
+    assert check.__doc__ == 'Check the values'
+    assert check(None, 1) == 2
+    with profile() as profiler:
+        check(None, 1)
+    assert profiler.calls == {'Model.check': 1}
+
+
+def test_profile_is_thread_local():
+    def validate():
+        _errors()
+
+    with profile() as profiler:
+        thread = threading.Thread(target=validate)
+        thread.start()
+        thread.join()
+    assert profiler.calls == {}
+
+
+def test_merge_and_report():
+    first, second = Profiler(), Profiler()
+    first.add('a', 1.)
+    second.add('a', 3.)
+    second.add('b', 1.)
+    first.merge(second.report())
+    assert first.report() == [
+        {'name': 'a', 'calls': 2, 'total': 4., 'mean': 2.},
+        {'name': 'b', 'calls': 1, 'total': 1., 'mean': 1.},
+    ]
+    lines = first.table().splitlines()
+    assert len(lines) == 4
+    assert lines[2].split()[:2] == ['a', '2']
+    assert first.to_json().startswith('[{"name": "a"')
@@ -0,0 +1,101 @@
+"""
+Time-window selection with ``TimeIndex``.
+"""
+
+import netCDF4  # type: ignore
+import numpy as np
+import pytest
+
+from conftest import random_images
+
+from standard.v0.data import ImageReader, TimeIndex
+
+# Timestamps with repeats, across several index blocks of 8 images
+TIMESTAMPS = np.array([10, 10, 20, 30, 30, 30, 40, 50, 60, 60, 70, 80,
+                       90, 100, 100, 110, 120, 130, 130, 140],
+                      dtype=np.uint64)
+
+INDEX_MODES = [dict(cache=True), dict(cache=False),
+               dict(cache=False, scan=False)]
+
+
+@pytest.fixture
+def imager_file(spif_file):
+    images = random_images(len(TIMESTAMPS), seed=6)
+    return spif_file(images, timestamps=TIMESTAMPS), images
+
+
+def _expected(start, stop):
+    mask = (TIMESTAMPS.astype(object) >= start) & (
+        TIMESTAMPS.astype(object) < stop)
+    index = np.flatnonzero(mask)
+    return slice(int(index[0]), int(index[-1]) + 1) if index.size else None
+
+
+@pytest.mark.parametrize('mode', INDEX_MODES)
+def test_window_edges(imager_file, mode):
+    filename, _ = imager_file
+    times = [0, 9, 10, 11, 30, 31, 60, 100, 139, 140, 141, 1000]
+    with netCDF4.Dataset(filename) as nc:
+        index = TimeIndex(nc['imager_1'], chunk_size=8, **mode)
+        for start in times:
+            for stop in times:
+                images = index.images(start, stop)
+                expected = _expected(start, stop)
+                if expected is None:
+                    assert images.start == images.stop
+                else:
+                    assert images == expected, (start, stop)
+
+
+@pytest.mark.parametrize('mode', INDEX_MODES)
+@pytest.mark.parametrize('start, stop, expected', [
+    (-5, 30, slice(0, 3)),
+    (-10, -1, slice(0, 0)),
+    (-2 ** 70, 2 ** 70, slice(0, 20)),
+    (130, 2 ** 64, slice(17, 20)),
+    (2 ** 64, 2 ** 65, slice(20, 20)),
+])
+def test_out_of_range_times(imager_file, mode, start, stop, expected):
+    filename, _ = imager_file
+    with netCDF4.Dataset(filename) as nc:
+        index = TimeIndex(nc['imager_1'], chunk_size=8, **mode)
+        assert index.images(start, stop) == expected
+        assert len(index.window(start, stop)) == (expected.stop
+                                                  - expected.start)
+
+
+def test_window_pixels(imager_file):
+    filename, images = imager_file
+    with netCDF4.Dataset(filename) as nc:
+        index = TimeIndex(nc['imager_1'])
+        pixels = nc['imager_1/core/image'][:]
+
+        window = index.window(30, 60)
+        assert window.images == slice(3, 8)
+        expected = np.concatenate([i.ravel() for i in images[3:8]])
+        np.testing.assert_array_equal(pixels[window.pixels], expected)
+
+        # Empty windows are placed where their images would be
+        before = index.window(0, 10)
+        assert before.pixels == slice(0, 0)
+        after = index.window(200, 300)
+        assert after.pixels == slice(len(pixels), len(pixels))
+
+        reader = ImageReader(nc['imager_1'])
+        for got, image in zip(reader.get_window(30, 60), images[3:8]):
+            np.testing.assert_array_equal(got, image)
+
+
+def test_decreasing_timestamps(spif_file):
+    timestamps = TIMESTAMPS.copy()
+    timestamps[12] = 5
+    filename = spif_file(random_images(len(timestamps)),
+                         timestamps=timestamps)
+    with netCDF4.Dataset(filename) as nc:
+        for mode in INDEX_MODES[:2]:
+            index = TimeIndex(nc['imager_1'], chunk_size=8, **mode)
+            assert not index.monotonic
+            assert index.first_decrease == 12
+            with pytest.raises(ValueError):
+                index.images(0, 100)
@@ -0,0 +1,160 @@
+"""
+Round trips of images through the writers and ``ImageReader``.
+"""
+
+import netCDF4  # type: ignore
+import numpy as np
+import pytest
+
+from conftest import random_images, write_spif
+
+from standard.v0.data import (
+    ImageReader, SpifWriter, check_core_data, make_spif,
+)
+
+ENCODINGS = [None, 'bitpack', 'rle']
+
+
+@pytest.mark.parametrize('encoding', ENCODINGS)
+@pytest.mark.parametrize('block', [False, True])
+def test_round_trip(spif_file, encoding, block):
+    images = random_images(50, seed=1)
+    filename = spif_file(images, encoding=encoding, block=block)
+
+    with netCDF4.Dataset(filename) as nc:
+        reader = ImageReader(nc['imager_1'])
+        assert len(reader) == len(images)
+        for n, image in enumerate(images):
+            np.testing.assert_array_equal(reader[n], image)
+        for got, image in zip(reader.get_many([40, 3, 17, 3]),
+                              [images[40], images[3], images[17], images[3]]):
+            np.testing.assert_array_equal(got, image)
+        for got, image in zip(reader[10:30], images[10:30]):
+            np.testing.assert_array_equal(got, image)
+        assert check_core_data(nc['imager_1']) == []
+
+
+@pytest.mark.parametrize('encoding', ENCODINGS)
+def test_make_spif(tmp_path, encoding):
+    filename = str(tmp_path / 'synthetic.nc')
+    make_spif(filename, 300, n_imagers=2, width=(1, 40), height=(0, 20),
+              image_chunk=64, pixel_chunk=256, block_size=100, seed=3,
+              encoding=encoding)
+
+    with netCDF4.Dataset(filename) as nc:
+        assert nc.imager_groups.split() == ['imager_1', 'imager_2']
+        for name in ('imager_1', 'imager_2'):
+            imager = nc[name]
+            assert check_core_data(imager) == []
+            reader = ImageReader(imager)
+            assert len(reader) == 300
+            timestamps = imager['core/timestamp'][:]
+            assert np.all(np.diff(timestamps.astype(np.int64)) >= 0)
+            for n in (0, 150, 299):
+                image = reader[n]
+                assert image.shape == (reader.height[n], reader.width[n])
+                assert set(np.unique(image)) <= {0, 1}
+
+
+def test_packed_matches_plain(tmp_path):
+    filenames = {}
+    for encoding in ENCODINGS:
+        filenames[encoding] = str(tmp_path / f'{encoding}.nc')
+        make_spif(filenames[encoding], 200, width=(1, 30), pixel_chunk=128,
+                  seed=5, encoding=encoding)
+
+    with netCDF4.Dataset(filenames[None]) as nc:
+        expected = ImageReader(nc['imager_1'])[:]
+    for encoding in ('bitpack', 'rle'):
+        with netCDF4.Dataset(filenames[encoding]) as nc:
+            for got, image in zip(ImageReader(nc['imager_1'])[:], expected):
+                np.testing.assert_array_equal(got, image)
+
+
+def _imager(writer, **kwargs):
+    return writer.create_imager(
+        'imager_1', color_level=[0, 0.5], array_size=[64], resolution=[10.],
+        wavelength=785., pathlength=63.,
+        timestamp_units='nanoseconds since 2024-01-01 00:00:00 +0000',
+        **kwargs
+    )
+
+
+def _buffered(imager):
+    """Return the number of values buffered for each index variable"""
+    return {name: buffer.used for name, buffer in imager._index.items()}
+
+
+@pytest.mark.parametrize('image, timestamp, overload', [
+    (np.ones((1, 300), np.uint8), 1, 0),    # width beyond u1
+    (np.ones((300, 2), np.uint8), 1, 0),    # height beyond u1
+    (np.ones((1, 2), np.uint8), -1, 0),     # negative timestamp
+    (np.ones((1, 2), np.uint8), 2 ** 70, 0),
+    (np.ones((1, 2), np.uint8), 1, 300),    # overload beyond i1
+])
+def test_append_is_atomic(tmp_path, image, timestamp, overload):
+    filename = str(tmp_path / 'append.nc')
+    with SpifWriter(filename) as writer:
+        imager = _imager(writer)
+        imager.append(np.ones((2, 8), np.uint8), 0)
+        with pytest.raises(ValueError):
+            imager.append(image, timestamp, overload)
+        assert set(_buffered(imager).values()) == {1}
+        assert imager.n_images == 1
+        imager.append(np.zeros((3, 8), np.uint8), 5)
+
+    with netCDF4.Dataset(filename) as nc:
+        assert check_core_data(nc['imager_1']) == []
+        assert list(nc['imager_1/core/timestamp'][:]) == [0, 5]
+        assert list(nc['imager_1/core/startpixel'][:]) == [0, 16]
+
+
+@pytest.mark.parametrize('kwargs', [
+    # startpixel beyond u1 part way through the block
+    dict(pixels=np.ones(16 * 20, np.uint8), width=[8] * 20,
+         height=[2] * 20, timestamp=range(20)),
+    dict(pixels=np.ones(16, np.uint8), width=[8], height=[2],
+         timestamp=[-1]),
+    dict(pixels=np.ones(16, np.uint8), width=[8], height=[2],
+         timestamp=[1, 2]),
+    dict(pixels=np.ones(15, np.uint8), width=[8], height=[2],
+         timestamp=[1]),
+])
+def test_extend_is_atomic(tmp_path, kwargs):
+    filename = str(tmp_path / 'extend.nc')
+    with SpifWriter(filename) as writer:
+        imager = _imager(writer, startpixel_type='u1')
+        imager.extend(np.ones(16, np.uint8), [8], [2], [0])
+        with pytest.raises(ValueError):
+            imager.extend(**kwargs)
+        assert set(_buffered(imager).values()) == {1}
+        assert imager.n_pixels == 16
+        imager.extend(np.zeros(16, np.uint8), [8], [2], [3])
+
+    with netCDF4.Dataset(filename) as nc:
+        assert check_core_data(nc['imager_1']) == []
+        assert list(nc['imager_1/core/startpixel'][:]) == [0, 16]
+
+
+@pytest.mark.parametrize('encoding', ['bitpack', 'rle'])
+def test_packed_rejects_non_binary(tmp_path, encoding):
+    filename = str(tmp_path / 'packed.nc')
+    with SpifWriter(filename) as writer:
+        imager = _imager(writer, encoding=encoding)
+        imager.append(np.ones((2, 8), np.uint8), 0)
+        with pytest.raises(ValueError):
+            imager.append(np.full((2, 8), 2, np.uint8), 1)
+        with pytest.raises(ValueError):
+            imager.extend(np.full(16, 2, np.uint8), [8], [2], [1])
+        assert imager.n_images == 1
+
+    with netCDF4.Dataset(filename) as nc:
+        assert check_core_data(nc['imager_1']) == []
+
+
+def test_empty_imager(tmp_path):
+    filename = str(tmp_path / 'empty.nc')
+    write_spif(filename, [])
+    with netCDF4.Dataset(filename) as nc:
+        assert len(ImageReader(nc['imager_1'])) == 0
+        assert check_core_data(nc['imager_1']) == []